@@ -0,0 +1,105 @@
+# backend_service/benchmarks/bench_keyword_scoring.py
+# Micro-benchmark: per-query scoring cost, substring loops vs the shared keyword matcher
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_keyword_scoring.py --queries 2000
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph
+import scoring
+import safety_evaluation
+from keyword_matcher import KEYWORD_SETS, scan
+from schemas import AgentState
+
+QUERIES = [
+    "My blood sugar reading is 250 mg/dL after lunch. I took my medications this morning. Should I be concerned?",
+    "Can I eat fruits if I have Type 2 diabetes? I'm worried about the sugar content.",
+    "I'm feeling dizzy and shaky. My glucose meter shows 65 mg/dL. What should I do?",
+    "I've been experiencing nausea since starting my new medication. Is this normal?",
+    "I want to start exercising but I'm worried about low blood sugar. Any tips?",
+    "I'm pregnant and have diabetes. How often should I check my blood sugar?",
+    "I have chest pain and blurred vision since this morning, is this an emergency?",
+]
+
+FILLER = (
+    "Keeping a consistent routine with meals, activity and medication timing helps keep glucose "
+    "readings predictable. Write down your readings with notes about food, stress and sleep so "
+    "patterns are easier to spot when you review them with your care team. "
+)
+
+def build_corpus(size: int):
+    """Realistic long drafts: the demo responses and fallback text padded with guidance paragraphs"""
+    drafts = [graph.FALLBACK_AI_RESPONSE]
+    for patient_id in ("P001", "P004"):
+        for query in QUERIES:
+            draft = graph.get_demo_response(AgentState(patient_id=patient_id, original_query=query))
+            if draft:
+                drafts.append(draft)
+    rng = random.Random(42)
+    return [
+        (rng.choice(QUERIES), rng.choice(drafts) + "\n\n" + FILLER * rng.randint(2, 8))
+        for _ in range(size)
+    ]
+
+def legacy_score(query, response):
+    """The pre-matcher scorers: one lowercase + substring loop per keyword list"""
+    def contains_any(text, category):
+        return any(k in text.lower() for k in KEYWORD_SETS[category])
+    def count(text, category):
+        return sum(1 for k in KEYWORD_SETS[category] if k in text.lower())
+
+    # scoring.py
+    safety = 100 - 30 * count(response, "safety.danger") + 10 * count(response, "safety.reassurance")
+    confidence = 85 - 20 * contains_any(query, "confidence.urgent")
+    urgency = "high" if contains_any(query, "urgency.high") else (
+        "medium" if contains_any(query, "urgency.medium") else "low")
+    # safety_evaluation.py
+    evaluation = (100 - 30 * count(response, "evaluation.danger")
+                  + 20 * count(response, "evaluation.emergency") + 10 * count(response, "evaluation.safe"))
+    evaluation_confidence = (70 - 20 * contains_any(query, "evaluation.serious")
+                             + 5 * count(response, "evaluation.empathy"))
+    urgent = contains_any(query, "evaluation.urgent")
+    return safety, confidence, urgency, evaluation, evaluation_confidence, urgent
+
+def matcher_score(query, response):
+    query_hits = scan(query)
+    response_hits = scan(response)
+    return (
+        scoring.get_safety_score(response, response_hits),
+        scoring.get_confidence_score(query, response, None, query_hits),
+        scoring.determine_urgency_level(query, response, query_hits),
+        safety_evaluation.get_safety_score(response, response_hits),
+        safety_evaluation.get_confidence_score(query, response, query_hits, response_hits),
+        safety_evaluation.needs_urgent_review(query, response, query_hits),
+    )
+
+def time_per_query(scorer, corpus, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query, response in corpus:
+            scorer(query, response)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword scoring cost per query")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.queries)
+    avg_chars = sum(len(r) for _, r in corpus) / len(corpus)
+    print(f"{len(corpus)} query/response pairs, average response {avg_chars:.0f} chars")
+    for name, scorer in (("substring loops", legacy_score), ("keyword matcher", matcher_score)):
+        print(f"{name:<16} {time_per_query(scorer, corpus, args.repeat):8.1f} us/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# backend_service/benchmarks/bench_priority_scheduler.py
+# Wait time of urgent queries stuck behind a backlog of routine ones: FIFO vs the priority scheduler
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_priority_scheduler.py --low 60 --high 5 --concurrency 4 --llm-latency 0.1
+#
+# A burst of low-urgency queries saturates the LLM slots, then a few
+# high-urgency queries arrive. FIFO is modelled as a scheduler where every
+# query has the same level.
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import LEVELS, PriorityScheduler
+
+async def run(scheduler, levels, latency: float):
+    """Runs one simulated LLM call per level; returns {level: [wait seconds]}"""
+    waits = {level: [] for level in LEVELS}
+
+    async def call(level, scheduled_level):
+        start = time.monotonic()
+        async with scheduler.slot(scheduled_level):
+            waits[level].append(time.monotonic() - start)
+            await asyncio.sleep(latency)
+
+    tasks = []
+    for level, scheduled_level in levels:
+        tasks.append(asyncio.create_task(call(level, scheduled_level)))
+        # Let the backlog build up before the urgent queries arrive
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return waits
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark urgent-query wait time under a saturated LLM")
+    parser.add_argument("--low", type=int, default=60)
+    parser.add_argument("--high", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--aging-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    arrivals = ["low"] * args.low + ["high"] * args.high
+    limits = {level: args.concurrency for level in LEVELS}
+    modes = (
+        ("FIFO", [(level, "low") for level in arrivals]),
+        ("priority", [(level, level) for level in arrivals]),
+    )
+
+    print(f"low={args.low} high={args.high} concurrency={args.concurrency} llm_latency={args.llm_latency}s")
+    for name, levels in modes:
+        scheduler = PriorityScheduler(args.concurrency, limits, args.aging_seconds)
+        waits = asyncio.run(run(scheduler, levels, args.llm_latency))
+        summary = "  ".join(
+            f"{level} avg {sum(w) / len(w) * 1000:7.1f} ms" for level, w in waits.items() if w
+        )
+        print(f"{name:<10} {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# backend_service/benchmarks/bench_process_query.py
+# Throughput benchmark for the /process_query/ graph: blocking invoke() vs ainvoke()
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_process_query.py --requests 200 --concurrency 100 --llm-latency 0.5
+#
+# The DeepSeek client is replaced by a fixed-latency stand-in so the numbers
+# measure how the event loop copes with in-flight LLM calls, not the provider.
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DB_PATH", os.path.join(BENCH_DIR, "bench_queries.db"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(BENCH_DIR, "bench_llm_cache.db"))
+# Measure the event loop, not the urgency scheduler's admission limits
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "100000")
+os.environ.setdefault("LLM_LEVEL_LIMITS", "")
+
+import graph
+from patient_db import init_db
+
+# Misses every pre-crafted demo branch so each request reaches the LLM
+BENCH_QUERY = "How much fiber should I aim for each day?"
+
+class FixedLatencyLLM:
+    """Stand-in for ChatOpenAI that answers after a fixed delay"""
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, prompt, config=None):
+        time.sleep(self.latency)
+        return type("Message", (), {"content": "Benchmark draft response."})()
+
+    async def ainvoke(self, prompt, config=None):
+        await asyncio.sleep(self.latency)
+        return type("Message", (), {"content": "Benchmark draft response."})()
+
+def make_state(i: int, mode: str) -> dict:
+    return {
+        "patient_id": "P00%d" % (i % 5 + 1),
+        "original_query": f"{BENCH_QUERY} ({mode} #{i})",
+        "uploaded_file_name": None,
+        "patient_data": None, "ai_response": None, "error_message": None,
+        "final_response_to_patient": None, "safety_score": None,
+        "confidence_score": None, "needs_urgent_review": None
+    }
+
+async def run_blocking(i: int):
+    # Pre-change behaviour: async endpoint calling the synchronous graph
+    return graph.app.invoke(make_state(i, "blocking"))
+
+async def run_async(i: int):
+    return await graph.app.ainvoke(make_state(i, "async"))
+
+async def run_mode(runner, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await runner(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs async graph execution")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.25, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    init_db()
+    graph.get_llm = lambda: FixedLatencyLLM(args.llm_latency)
+
+    print(f"requests={args.requests} concurrency={args.concurrency} llm_latency={args.llm_latency}s")
+    for name, runner in (("blocking invoke()", run_blocking), ("async ainvoke()", run_async)):
+        rps = asyncio.run(run_mode(runner, args.requests, args.concurrency))
+        print(f"{name:<18} {rps:8.1f} requests/sec")
+
+if __name__ == "__main__":
+    main()
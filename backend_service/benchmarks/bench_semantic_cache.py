@@ -0,0 +1,55 @@
+# backend_service/benchmarks/bench_semantic_cache.py
+# Lookup latency of the semantic cache as it grows to 100k entries
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_semantic_cache.py --entries 100000 --lookups 500
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache
+
+SUBJECTS = ["blood sugar", "glucose", "fasting sugar", "my reading", "A1c", "ketones"]
+EVENTS = ["after lunch", "post-dinner", "in the morning", "before bed", "after exercise", "when I wake up"]
+CONCERNS = ["should I worry", "is this normal", "what should I do", "do I need to call", "is it dangerous"]
+TOPICS = ["metformin", "insulin", "fruit", "rice", "walking", "sleep", "stress", "travel", "fasting", "alcohol"]
+
+def make_query(rng: random.Random) -> str:
+    return (f"{rng.choice(SUBJECTS)} {rng.randint(50, 400)} {rng.choice(EVENTS)} "
+            f"{rng.choice(TOPICS)} {rng.choice(CONCERNS)} #{rng.randint(0, 10**9)}")
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic cache lookup latency")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cache = SemanticCache(threshold=0.85, max_entries=args.entries)
+    checkpoints = sorted({c for c in (1000, 10000, args.entries) if c <= args.entries})
+    filled = 0
+    for checkpoint in checkpoints:
+        while filled < checkpoint:
+            cache.add(make_query(rng), "Type 2", "cached draft")
+            filled += 1
+
+        samples = []
+        for _ in range(args.lookups):
+            query = make_query(rng)
+            start = time.perf_counter()
+            cache.lookup(query, "Type 2")
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{checkpoint:>7} entries: lookup p50 {percentile(samples, 0.5):.2f} ms, "
+              f"p99 {percentile(samples, 0.99):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# backend_service/benchmarks/bench_state_allocations.py
+# Bytes allocated per request by the LangGraph nodes: deep-copied full states vs partial updates
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_state_allocations.py --requests 200
+#
+# The "deep copy" graph reproduces the previous node behaviour: every node
+# starts with state.copy(deep=True), the patient record is a fresh dict per
+# request, and the review node calls model_dump(). Both graphs use the demo
+# responses and skip the SQLite insert, so only state handling is measured.
+#
+# tracemalloc has no cumulative counter, so each node's allocations are taken
+# as the peak traced memory above its starting point; the per-request figure
+# is the sum over the four nodes.
+
+import os
+import sys
+import time
+import warnings
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DB_PATH", os.path.join(BENCH_DIR, "bench_queries.db"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(BENCH_DIR, "bench_llm_cache.db"))
+
+from langgraph.graph import StateGraph, END
+
+import graph
+from schemas import AgentState
+from patient_db import init_db, get_patient_record, thaw
+
+# Each one hits a pre-crafted demo response
+QUERIES = [
+    "My blood sugar is 250 after lunch, should I be concerned?",
+    "Can I eat fruits with my diabetes?",
+    "I'm feeling dizzy and my glucose is 65",
+]
+
+class LegacyAgentState(AgentState):
+    patient_data: Optional[Dict[str, Any]] = None
+
+# Per-node peaks of the request being measured
+node_peaks = []
+
+def traced(node):
+    """Records the peak memory a node allocates while it runs"""
+    def run(state):
+        if not tracemalloc.is_tracing():
+            return node(state)
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = node(state)
+        _, peak = tracemalloc.get_traced_memory()
+        node_peaks.append(peak - baseline)
+        return result
+    return run
+
+def build_app(state_schema, nodes):
+    workflow = StateGraph(state_schema)
+    for name, node in nodes:
+        workflow.add_node(name, traced(node))
+    workflow.set_entry_point("fetch_patient_data")
+    workflow.add_edge("fetch_patient_data", "generate_ai_response")
+    workflow.add_edge("generate_ai_response", "evaluate_response")
+    workflow.add_edge("evaluate_response", "prepare_for_doctor_review")
+    workflow.add_edge("prepare_for_doctor_review", END)
+    return workflow.compile()
+
+def legacy_node(node, fetch=False):
+    """Wraps a current node with the old copy-everything contract"""
+    def run(state):
+        new_state = state.copy(deep=True)
+        if fetch:
+            # The old get_patient_data built a new dict literal on every call
+            record = get_patient_record(new_state.patient_id)
+            new_state.patient_data = thaw(record["data"]) if record else None
+            new_state.patient_version = record["version"] if record else None
+            return new_state
+        if node is graph.prepare_for_doctor_review_node:
+            new_state.model_dump()
+        for field, value in node(new_state).items():
+            setattr(new_state, field, value)
+        return new_state
+    return run
+
+def build_legacy_app():
+    return build_app(LegacyAgentState, [
+        ("fetch_patient_data", legacy_node(None, fetch=True)),
+        ("generate_ai_response", legacy_node(graph.generate_ai_response_node)),
+        ("evaluate_response", legacy_node(graph.evaluate_response_node)),
+        ("prepare_for_doctor_review", legacy_node(graph.prepare_for_doctor_review_node)),
+    ])
+
+def build_current_app():
+    return build_app(AgentState, [
+        ("fetch_patient_data", graph.fetch_patient_data_node),
+        ("generate_ai_response", graph.generate_ai_response_node),
+        ("evaluate_response", graph.evaluate_response_node),
+        ("prepare_for_doctor_review", graph.prepare_for_doctor_review_node),
+    ])
+
+def make_state(i: int) -> dict:
+    return {"patient_id": "P00%d" % (i % 5 + 1), "original_query": QUERIES[i % len(QUERIES)]}
+
+def measure(app, total: int):
+    """Returns (mean bytes, max bytes, mean seconds) per request"""
+    for i in range(10):
+        app.invoke(make_state(i))
+    start = time.perf_counter()
+    for i in range(total):
+        app.invoke(make_state(i))
+    seconds = (time.perf_counter() - start) / total
+
+    per_request = []
+    tracemalloc.start()
+    try:
+        for i in range(total):
+            node_peaks.clear()
+            app.invoke(make_state(i))
+            per_request.append(sum(node_peaks))
+    finally:
+        tracemalloc.stop()
+    return sum(per_request) / len(per_request), max(per_request), seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request allocations of the graph state")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db()
+    graph.save_query_for_review = lambda record: {"id": "bench", "status": "pending_review"}
+    # state.copy() is deprecated in pydantic 2 but is what the old nodes called
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    # Keep node logging out of the measurement
+    sys.stdout, stdout = open(os.devnull, "w"), sys.stdout
+    try:
+        results = [
+            ("deep copy per node", measure(build_legacy_app(), args.requests)),
+            ("partial updates", measure(build_current_app(), args.requests)),
+        ]
+    finally:
+        sys.stdout = stdout
+
+    print(f"requests={args.requests}")
+    for name, (mean, worst, seconds) in results:
+        print(f"{name:<20} {mean / 1024:8.1f} KiB allocated/request (max {worst / 1024:.1f} KiB)"
+              f"  {seconds * 1000:6.2f} ms/request")
+
+if __name__ == "__main__":
+    main()
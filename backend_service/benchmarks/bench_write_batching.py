@@ -0,0 +1,86 @@
+# backend_service/benchmarks/bench_write_batching.py
+# Sustained insert rate on one SQLite file: a commit per query vs group commits
+#
+# Usage (from backend_service/):
+#   python benchmarks/bench_write_batching.py --inserts 20000 --writers 32
+#
+# Each writer thread stands in for a request handler saving a pending query
+# and waits for its write to be committed before saving the next one, as
+# the endpoints do. Runs with synchronous=FULL by default, where every commit
+# is an fsync and group commit saves most of them. With --synchronous NORMAL
+# (the service's setting) WAL commits do not fsync, so group commit gains
+# nothing and can be slightly slower.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DIR = tempfile.mkdtemp()
+
+import database
+from patient_db import init_schema, insert_pending_query
+from write_batcher import WriteBatcher
+
+def run(batcher, inserts: int, writers: int, mode: str) -> float:
+    """Saves inserts queries from writers threads; returns elapsed seconds"""
+    per_writer = inserts // writers
+
+    def writer(w: int):
+        for i in range(per_writer):
+            record = {
+                "id": f"{mode}-{w}-{i}",
+                "patient_id": "P00%d" % (i % 5 + 1),
+                "original_query": f"Benchmark question {mode} {w} {i}",
+                "ai_response": "Benchmark draft response.",
+                "urgency_level": "low",
+                "safety_score": 90,
+                "confidence_score": 80,
+            }
+            batcher.run(lambda conn: insert_pending_query(conn, record))
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    batcher.stop()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group commit for query inserts")
+    parser.add_argument("--inserts", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--max-rows", type=int, default=200)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--synchronous", choices=("NORMAL", "FULL"), default="FULL",
+                        help="FULL fsyncs every commit; NORMAL is what the service uses")
+    args = parser.parse_args()
+
+    database.PRAGMAS = tuple(
+        f"PRAGMA synchronous={args.synchronous}" if pragma.startswith("PRAGMA synchronous") else pragma
+        for pragma in database.PRAGMAS
+    )
+    inserts = args.inserts // args.writers * args.writers
+    print(f"inserts={inserts} writers={args.writers} synchronous={args.synchronous}")
+
+    modes = (("commit per row", False), ("group commit", True))
+    for name, enabled in modes:
+        manager = database.ConnectionManager(os.path.join(BENCH_DIR, f"bench_{enabled}.db"), init_schema)
+        batcher = WriteBatcher(manager.get_connection, args.max_rows, args.max_delay_ms, enabled)
+        elapsed = run(batcher, inserts, args.writers, name.replace(" ", "-"))
+        count = manager.get_connection().execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+        manager.close_all()
+        assert count == inserts, f"expected {inserts} rows, found {count}"
+
+        stats = batcher.stats()
+        batches = f"  avg batch {stats['avg_batch']}" if enabled else ""
+        print(f"{name:<16} {inserts / elapsed:9.0f} inserts/s  {elapsed:6.2f} s{batches}")
+
+if __name__ == "__main__":
+    main()
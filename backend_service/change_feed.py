@@ -0,0 +1,94 @@
+# backend_service/change_feed.py
+# In-process feed of query inserts and updates, for pushing deltas to the doctor dashboard
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import deque
+
+# Events kept for clients catching up; one that falls further behind must refetch
+CHANGE_FEED_SIZE = int(os.environ.get('CHANGE_FEED_SIZE', 1000))
+
+class ChangeFeed:
+    """Numbered ring buffer of change events with async waiting.
+
+    Events are {"seq", "type", "query", "at"}; type is "insert" (query is
+    the new pending row), "update" (query has id, status and
+    doctor_final_response) or "reload" (many rows changed at once, e.g. a
+    rescore moved pending queries between urgency levels; clients refetch
+    the queue). A client remembers the feed id and the last
+    seq it applied. When the feed restarted (new id) or the events after
+    its seq were already dropped, it is told to reset and refetch instead.
+    publish() may be called from any thread. Only this process's writes are
+    seen; with several API nodes each node has its own feed.
+    """
+
+    def __init__(self, size: int):
+        self.feed_id = uuid.uuid4().hex[:12]
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._waiters = []   # (loop, future) pairs woken by the next publish
+        self._stats = {"published": 0, "resets": 0}
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, kind: str, query: dict) -> int:
+        with self._lock:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "type": kind, "query": query, "at": time.time()})
+            self._stats["published"] += 1
+            waiters, self._waiters = self._waiters, []
+            seq = self._seq
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return seq
+
+    def since(self, seq: int, feed_id: str = None):
+        """Events after seq, as (events, reset). reset means the caller must refetch."""
+        with self._lock:
+            stale = (feed_id not in (None, self.feed_id) or seq > self._seq
+                     or (self._events and self._events[0]["seq"] > seq + 1)
+                     or (not self._events and seq < self._seq))
+            if stale:
+                self._stats["resets"] += 1
+                return [], True
+            return [event for event in self._events if event["seq"] > seq], False
+
+    async def wait(self, seq: int, feed_id: str = None, timeout: float = 25.0):
+        """Like since(), but waits up to timeout seconds for at least one event"""
+        deadline = time.monotonic() + timeout
+        while True:
+            events, reset = self.since(seq, feed_id)
+            remaining = deadline - time.monotonic()
+            if events or reset or remaining <= 0:
+                return events, reset
+            future = asyncio.get_running_loop().create_future()
+            with self._lock:
+                if self._seq != seq:
+                    continue
+                self._waiters.append((asyncio.get_running_loop(), future))
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._waiters = [w for w in self._waiters if w[1] is not future]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["last_seq"] = self._seq
+            stats["buffered"] = len(self._events)
+            stats["waiting"] = len(self._waiters)
+        stats["feed_id"] = self.feed_id
+        return stats
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+change_feed = ChangeFeed(CHANGE_FEED_SIZE)
@@ -0,0 +1,108 @@
+# backend_service/database.py
+# Long-lived SQLite connections shared by the API, the LangGraph workflow and scripts
+
+import os
+import sqlite3
+import threading
+
+# Applied to every new connection. WAL lets readers run alongside the single
+# writer, and synchronous=NORMAL is durable in WAL mode while skipping the
+# fsync on every commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",   # 256 MiB
+    "PRAGMA cache_size=-65536",     # 64 MiB (negative = KiB)
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# sqlite3 keeps compiled statements per connection keyed by SQL text; since
+# connections are long-lived, the constant SQL strings used by the endpoints
+# are prepared once per thread and reused afterwards.
+STATEMENT_CACHE_SIZE = 256
+
+class ConnectionManager:
+    """Hands out one long-lived connection per thread for a database file.
+
+    The schema initializer runs exactly once, before the first connection is
+    handed out. Connections must not be closed by callers; use `with conn:`
+    to scope a write transaction.
+    """
+
+    def __init__(self, db_path, init_schema=None):
+        self.db_path = db_path
+        self._init_schema = init_schema
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._connections = []
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def initialize(self):
+        """Runs the schema initializer once for this database"""
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            if self._init_schema:
+                conn = self._connect()
+                try:
+                    self._init_schema(conn)
+                    conn.commit()
+                finally:
+                    conn.close()
+            self._initialized = True
+
+    def get_connection(self):
+        """Returns the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.initialize()
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        """Closes every connection opened by this manager (used on shutdown)"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = []
+            self._local = threading.local()
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_manager(db_path, init_schema=None):
+    """Returns the process-wide ConnectionManager for a database file"""
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path, init_schema)
+            _managers[key] = manager
+        return manager
+
+def close_all_connections():
+    """Closes the connections of every manager in this process"""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
@@ -1,167 +1,60 @@
 # backend_service/graph.py
 
 import os
-from langchain_openai import ChatOpenAI
+import asyncio
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from schemas import AgentState
-from patient_db import get_patient_data, get_patient_context_for_ai
+from patient_db import get_patient_record, get_patient_context_for_ai
+from response_cache import response_cache, completion_cache_key, fingerprint
+from semantic_cache import semantic_cache
+from llm_scheduler import llm_scheduler
+from llm_client import LLM_MODEL, LLM_TEMPERATURE, llm_gateway
+from scoring import determine_urgency_level, score_response
+
+# --- Persistence Helpers ---
+def saved_for_review(query_id, created):
+    if not created:
+        print(f"Query already exists with ID: {query_id} - skipping duplicate save")
+    return {"id": query_id, "status": "pending_review"}
 
-# --- Enhanced Helper Functions for Demo ---
-def get_safety_score(ai_response: str) -> int:
-    """Calculate safety score based on response content"""
-    score = 100
-    
-    # Dangerous phrases that should never appear
-    danger_phrases = [
-        'you have', 'you are diagnosed with', 'stop taking', 
-        'change your dose', 'you don\'t need', 'ignore your doctor'
-    ]
-    
-    # Good safety phrases
-    safety_phrases = [
-        'consult your doctor', 'speak with your healthcare provider',
-        'medical attention', 'emergency', 'call 911', 'seek immediate'
-    ]
-    
-    response_lower = ai_response.lower()
-    
-    for phrase in danger_phrases:
-        if phrase in response_lower:
-            score -= 30
-    
-    for phrase in safety_phrases:
-        if phrase in response_lower:
-            score += 10
-    
-    return max(0, min(100, score))
+def save_query_for_review(state_dict: dict):
+    """Save query to database for doctor review"""
+    import uuid
+    from patient_db import insert_pending_query, query_writes
 
-def get_confidence_score(query: str, ai_response: str, patient_data: dict) -> int:
-    """Calculate confidence based on query complexity and patient context"""
-    score = 85  # Base score
-    
-    # Complex medical situations reduce confidence
-    if patient_data:
-        profile = patient_data.get('profile', {})
-        if profile.get('patient_id') == 'P004':  # Pregnant patient
-            score -= 15
-        elif profile.get('patient_id') == 'P005':  # Elderly with complications
-            score -= 10
-    
-    # Urgent symptoms reduce confidence
-    urgent_keywords = ['chest pain', 'dizzy', 'unconscious', 'severe', 'emergency']
-    if any(keyword in query.lower() for keyword in urgent_keywords):
-        score -= 20
-    
-    # Well-structured response increases confidence
-    if len(ai_response) > 100 and len(ai_response) < 500:
-        score += 5
-    
-    return max(0, min(100, score))
+    record = {**state_dict, "id": str(uuid.uuid4())}
+    # A duplicate of a pending query is not inserted; its existing ID is returned
+    return saved_for_review(*query_writes.run(lambda conn: insert_pending_query(conn, record)))
 
-def determine_urgency_level(query: str, ai_response: str) -> str:
-    """Determine urgency level: high, medium, low"""
-    query_lower = query.lower()
-    
-    high_urgency_keywords = [
-        'chest pain', 'can\'t breathe', 'unconscious', 'severe pain',
-        'blood sugar over 400', 'blood sugar under 50', 'vomiting',
-        'confusion', 'blurred vision', 'emergency'
-    ]
-    
-    medium_urgency_keywords = [
-        'dizzy', 'nausea', 'headache', 'high blood sugar',
-        'low blood sugar', 'infection', 'fever', 'swelling'
-    ]
-    
-    if any(keyword in query_lower for keyword in high_urgency_keywords):
-        return "high"
-    elif any(keyword in query_lower for keyword in medium_urgency_keywords):
-        return "medium"
-    else:
-        return "low"
+async def asave_query_for_review(state_dict: dict):
+    """Async variant of save_query_for_review, saving through the configured storage backend"""
+    import uuid
+    from storage import storage
 
-def needs_urgent_review(query: str, ai_response: str, urgency_level: str) -> bool:
-    """Determine if query needs immediate doctor attention"""
-    return urgency_level in ["high", "medium"]
+    return saved_for_review(*await storage.insert_pending_query({**state_dict, "id": str(uuid.uuid4())}))
 
-def save_query_for_review(state_dict: dict):
-    """Save query to database for doctor review"""
-    import sqlite3
-    import uuid
-    from datetime import datetime
-    from patient_db import get_db_connection
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if this query already exists (prevent duplicates)
-    cursor.execute("""
-        SELECT id FROM queries 
-        WHERE patient_id = ? AND original_query = ? 
-        AND status = 'pending_review'
-        ORDER BY timestamp DESC LIMIT 1
-    """, (state_dict['patient_id'], state_dict['original_query']))
-    
-    existing = cursor.fetchone()
-    if existing:
-        print(f"Query already exists with ID: {existing[0]} - skipping duplicate save")
-        conn.close()
-        return {"id": existing[0], "status": "pending_review"}
-    
-    query_id = str(uuid.uuid4())
-    
-    cursor.execute("""
-        INSERT INTO queries (
-            id, timestamp, patient_id, original_query, 
-            ai_response, status, urgency_level, 
-            safety_score, confidence_score
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        query_id,
-        datetime.now().isoformat(),
-        state_dict['patient_id'],
-        state_dict['original_query'],
-        state_dict.get('ai_response'),
-        'pending_review',
-        state_dict.get('urgency_level', 'low'),
-        state_dict.get('safety_score'),
-        state_dict.get('confidence_score')
-    ))
-    
-    conn.commit()
-    conn.close()
-    
-    return {"id": query_id, "status": "pending_review"}
+# --- LLM Helpers ---
+FALLBACK_AI_RESPONSE = """I understand your concern. While I cannot provide specific medical advice, I recommend:
 
-# --- Node Definitions ---
-def fetch_patient_data_node(state: AgentState):
-    """Fetches patient data and returns the full, updated state."""
-    print("---NODE: FETCHING PATIENT DATA---")
-    new_state = state.copy(deep=True)
-    
-    patient_data = get_patient_data(new_state.patient_id)
-    if not patient_data:
-        new_state.error_message = f"Patient ID '{new_state.patient_id}' not found."
-    else:
-        new_state.patient_data = patient_data
-        print(f"Found patient: {patient_data['profile']['name']}")
-    
-    return new_state
+1. Monitor your symptoms closely
+2. Follow your current treatment plan
+3. Contact your healthcare provider if symptoms persist or worsen
+4. In case of emergency symptoms, seek immediate medical attention
 
-def generate_ai_response_node(state: AgentState):
-    """Generates an AI response with patient context."""
-    print("---NODE: GENERATING AI RESPONSE---")
-    new_state = state.copy(deep=True)
-    
-    if new_state.error_message:
-        return new_state
-    
-    # Get patient context for the AI
-    patient_context = get_patient_context_for_ai(new_state.patient_id)
-    
-    # Create a comprehensive prompt
-    prompt = f"""You are a medical AI assistant helping with diabetes management. 
+Your healthcare team is best equipped to provide personalized guidance based on your complete medical history."""
+
+# Upper bound on the patient context in the prompt; lower-priority sections are dropped past it
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('PROMPT_CONTEXT_TOKEN_BUDGET', 1500))
+
+def get_llm():
+    """Returns the shared DeepSeek chat model used for draft generation"""
+    return llm_gateway.get_model()
+
+def build_prompt(state: AgentState, patient_context: str) -> str:
+    """Builds the LLM prompt from the patient context and question"""
+    return f"""You are a medical AI assistant helping with diabetes management. 
     IMPORTANT RULES:
     - Never diagnose conditions or prescribe medications
     - Always recommend consulting with healthcare providers for medical decisions
@@ -172,7 +65,7 @@ def generate_ai_response_node(state: AgentState):
     Patient Context:
     {patient_context}
     
-    Patient Question: {new_state.original_query}
+    Patient Question: {state.original_query}
     
     Please provide a helpful, safe response that:
     1. Addresses their specific concern
@@ -181,14 +74,14 @@ def generate_ai_response_node(state: AgentState):
     4. Recommends appropriate medical consultation when needed
     
     Response:"""
+
+def get_demo_response(state: AgentState):
+    """Returns a pre-crafted response for common demo queries, or None to use the LLM"""
+    query_lower = state.original_query.lower()
     
-    try:
-        # For demo reliability, use pre-crafted responses for common queries
-        query_lower = new_state.original_query.lower()
-        
-        # Demo responses based on specific scenarios
-        if "blood sugar" in query_lower and ("high" in query_lower or "250" in query_lower):
-            new_state.ai_response = """I understand your concern about your elevated blood sugar reading. A reading of 250 mg/dL is indeed higher than target range.
+    # Demo responses based on specific scenarios
+    if "blood sugar" in query_lower and ("high" in query_lower or "250" in query_lower):
+        return """I understand your concern about your elevated blood sugar reading. A reading of 250 mg/dL is indeed higher than target range.
 
 Based on your current management plan with Metformin and other medications, here are some immediate steps you can consider:
 
@@ -201,9 +94,9 @@ Given your good overall control (HbA1c 6.9%), this may be a temporary spike. How
 
 Continue monitoring and keep a log to discuss with Dr. Chen at your next visit."""
 
-        elif "dizzy" in query_lower or "low" in query_lower:
-            if new_state.patient_id == "P001":  # Type 2 patient
-                new_state.ai_response = """Dizziness with low blood sugar requires immediate attention. If your glucose is below 70 mg/dL:
+    elif "dizzy" in query_lower or "low" in query_lower:
+        if state.patient_id == "P001":  # Type 2 patient
+            return """Dizziness with low blood sugar requires immediate attention. If your glucose is below 70 mg/dL:
 
 **Immediate Actions:**
 1. Follow the 15-15 rule: Consume 15g of fast-acting carbs (like 4 glucose tablets, 1/2 cup juice, or 1 tablespoon honey)
@@ -214,10 +107,10 @@ Continue monitoring and keep a log to discuss with Dr. Chen at your next visit."
 **Safety Note:** Given your Empagliflozin medication, which can sometimes contribute to low blood sugar when combined with other factors, this is important to address.
 
 If symptoms persist or worsen, don't hesitate to call emergency services. Please inform Dr. Chen about this episode at your next appointment to potentially adjust your medication regimen."""
-            
-        elif "pregnancy" in query_lower or "pregnant" in query_lower:
-            if new_state.patient_id == "P004":
-                new_state.ai_response = """Congratulations on your pregnancy! Managing diabetes during pregnancy requires special attention, and I see you're already in your first trimester.
+        
+    elif "pregnancy" in query_lower or "pregnant" in query_lower:
+        if state.patient_id == "P004":
+            return """Congratulations on your pregnancy! Managing diabetes during pregnancy requires special attention, and I see you're already in your first trimester.
 
 Since you've discontinued Metformin (as is standard practice), blood sugar management is especially important. Here are key points:
 
@@ -229,102 +122,237 @@ Since you've discontinued Metformin (as is standard practice), blood sugar manag
 Your current HbA1c of 6.2% is good, but pregnancy can affect glucose levels. If you notice any unusual patterns or have concerns, please contact your healthcare team immediately. They may need to start insulin if diet and exercise aren't maintaining targets.
 
 Remember, you successfully managed GDM in your first pregnancy - you've got this!"""
-        
-        else:
+    
+    return None
+
+def get_prompt_context(state: AgentState) -> str:
+    """Patient context for the prompt, rendered from the already-fetched record"""
+    return get_patient_context_for_ai(
+        state.patient_id, state.patient_data, state.patient_version, PROMPT_CONTEXT_TOKEN_BUDGET
+    )
+
+def get_cache_key(state: AgentState, patient_context: str):
+    """Completion cache key for this request, or None when the cache is bypassed"""
+    if state.bypass_cache or not response_cache.enabled:
+        response_cache.record_bypass()
+        return None
+    return completion_cache_key(LLM_MODEL, LLM_TEMPERATURE, state.original_query, patient_context)
+
+def get_diabetes_type(state: AgentState):
+    if not state.patient_data:
+        return None
+    return state.patient_data.get('profile', {}).get('Type of Diabetes')
+
+def use_semantic_cache(state: AgentState) -> bool:
+    return semantic_cache.enabled and not state.bypass_cache and bool(get_diabetes_type(state))
+
+def get_semantic_partition(state: AgentState, patient_context: str) -> str:
+    """Semantic cache partition: drafts quote the patient's context (name, medications),
+    so they are only reused for a paraphrase asked against the same context"""
+    return f"{get_diabetes_type(state)}:{fingerprint(patient_context)}"
+
+def lookup_cached_response(state: AgentState, cache_key, patient_context: str):
+    """Exact completion cache first, then the semantic near-duplicate cache"""
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    if use_semantic_cache(state):
+        return semantic_cache.lookup(state.original_query, get_semantic_partition(state, patient_context))
+    return None
+
+def store_cached_response(state: AgentState, cache_key, patient_context: str, response: str):
+    if cache_key:
+        response_cache.put(cache_key, response)
+    if use_semantic_cache(state):
+        semantic_cache.add(state.original_query, get_semantic_partition(state, patient_context), response)
+
+# The node's RunnableConfig is handed to the chat model so LangGraph's
+# "messages" stream mode can relay its tokens; passing it explicitly keeps
+# that working on Python < 3.11, where it does not propagate to async calls.
+def generate_llm_response(state: AgentState, config: RunnableConfig = None) -> str:
+    """Returns the LLM draft for a query, served from the caches when possible"""
+    patient_context = get_prompt_context(state)
+    cache_key = get_cache_key(state, patient_context)
+    cached = lookup_cached_response(state, cache_key, patient_context)
+    if cached is not None:
+        return cached
+    
+    response = llm_gateway.invoke(get_llm(), build_prompt(state, patient_context), config)
+    store_cached_response(state, cache_key, patient_context, response)
+    return response
+
+async def agenerate_llm_response(state: AgentState, config: RunnableConfig = None) -> str:
+    """Async variant of generate_llm_response; cache lookups run off the event loop"""
+    patient_context = get_prompt_context(state)
+    cache_key = get_cache_key(state, patient_context)
+    cached = await asyncio.to_thread(lookup_cached_response, state, cache_key, patient_context)
+    if cached is not None:
+        return cached
+    
+    # Fail fast to the fallback reply instead of queueing for a slot
+    llm_gateway.fail_fast()
+    
+    # Urgency from the query alone decides the queue position when the LLM is saturated
+    triage_level = determine_urgency_level(state.original_query, "")
+    async with llm_scheduler.slot(triage_level):
+        response = await llm_gateway.ainvoke(get_llm(), build_prompt(state, patient_context), config)
+    await asyncio.to_thread(store_cached_response, state, cache_key, patient_context, response)
+    return response
+
+def get_final_response_to_patient(urgency_level: str) -> str:
+    """Returns the user-facing confirmation message for an urgency level"""
+    if urgency_level == "high":
+        return """⚠️ Your query has been marked as URGENT and forwarded to your doctor for immediate review. 
+
+If you're experiencing severe symptoms, please don't wait - contact emergency services or visit the nearest emergency room.
+
+Your doctor will respond as soon as possible."""
+    
+    elif urgency_level == "medium":
+        return """Your query has been received and marked for priority review by your doctor. 
+
+You can expect a response within a few hours. If your symptoms worsen, please seek immediate medical attention."""
+    
+    return """Thank you for your query. It has been received and will be reviewed by your doctor.
+
+You'll receive a personalized response within 24 hours. For urgent matters, please contact your healthcare provider directly."""
+
+# --- Node Definitions ---
+# Nodes return only the fields they change; LangGraph merges the update into
+# the state. patient_data is the frozen, cached record and is never copied.
+def fetch_patient_data_node(state: AgentState):
+    """Fetches patient data and returns it as a state update."""
+    print("---NODE: FETCHING PATIENT DATA---")
+    
+    record = get_patient_record(state.patient_id)
+    if not record:
+        return {"error_message": f"Patient ID '{state.patient_id}' not found."}
+    
+    print(f"Found patient: {record['data']['profile']['name']}")
+    return {"patient_data": record["data"], "patient_version": record["version"]}
+
+async def afetch_patient_data_node(state: AgentState):
+    """Async variant of fetch_patient_data_node, reading through the configured storage backend."""
+    from storage import storage
+    print("---NODE: FETCHING PATIENT DATA (async)---")
+    
+    record = await storage.get_patient(state.patient_id)
+    if not record:
+        return {"error_message": f"Patient ID '{state.patient_id}' not found."}
+    
+    print(f"Found patient: {record['data']['profile']['name']}")
+    return {"patient_data": record["data"], "patient_version": record["version"]}
+
+def generate_ai_response_node(state: AgentState, config: RunnableConfig = None):
+    """Generates an AI response with patient context."""
+    print("---NODE: GENERATING AI RESPONSE---")
+    
+    if state.error_message:
+        return {}
+    
+    try:
+        # For demo reliability, use pre-crafted responses for common queries
+        ai_response = get_demo_response(state)
+        if ai_response is None:
             # Use LLM for other queries
-            llm = ChatOpenAI(
-                model_name="deepseek/deepseek-r1-0528",
-                openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
-                openai_api_base=os.getenv("DEEPSEEK_API_BASE"),
-                temperature=0.7,
-                max_tokens=300
-            )
-            new_state.ai_response = llm.invoke(prompt).content
+            ai_response = generate_llm_response(state, config)
             
     except Exception as e:
         # Fallback response
-        new_state.ai_response = """I understand your concern. While I cannot provide specific medical advice, I recommend:
-
-1. Monitor your symptoms closely
-2. Follow your current treatment plan
-3. Contact your healthcare provider if symptoms persist or worsen
-4. In case of emergency symptoms, seek immediate medical attention
+        ai_response = FALLBACK_AI_RESPONSE
+        print(f"Error generating AI response: {e}")
+    
+    return {"ai_response": ai_response}
 
-Your healthcare team is best equipped to provide personalized guidance based on your complete medical history."""
+async def agenerate_ai_response_node(state: AgentState, config: RunnableConfig = None):
+    """Async variant of generate_ai_response_node; awaits the LLM instead of blocking the event loop."""
+    print("---NODE: GENERATING AI RESPONSE (async)---")
+    
+    if state.error_message:
+        return {}
+    
+    try:
+        ai_response = get_demo_response(state)
+        if ai_response is None:
+            ai_response = await agenerate_llm_response(state, config)
+            
+    except Exception as e:
+        ai_response = FALLBACK_AI_RESPONSE
         print(f"Error generating AI response: {e}")
     
-    return new_state
+    return {"ai_response": ai_response}
 
 def evaluate_response_node(state: AgentState):
     """Evaluates the AI response for safety and urgency."""
     print("---NODE: EVALUATING RESPONSE---")
-    new_state = state.copy(deep=True)
     
-    if new_state.error_message or not new_state.ai_response:
-        return new_state
-
-    new_state.safety_score = get_safety_score(new_state.ai_response)
-    new_state.confidence_score = get_confidence_score(
-        new_state.original_query, 
-        new_state.ai_response,
-        new_state.patient_data
-    )
-    new_state.urgency_level = determine_urgency_level(
-        new_state.original_query,
-        new_state.ai_response
-    )
-    new_state.needs_urgent_review = needs_urgent_review(
-        new_state.original_query,
-        new_state.ai_response,
-        new_state.urgency_level
-    )
+    if state.error_message or not state.ai_response:
+        return {}
+
+    scores = score_response(state.original_query, state.ai_response, state.patient_data)
     
-    print(f"Evaluation: Safety={new_state.safety_score}, Confidence={new_state.confidence_score}, Urgency={new_state.urgency_level}")
+    print(f"Evaluation: Safety={scores['safety_score']}, Confidence={scores['confidence_score']}, Urgency={scores['urgency_level']}")
     
-    return new_state
+    return scores
+
+# Fields save_query_for_review reads from the state
+REVIEW_FIELDS = (
+    "patient_id", "original_query", "ai_response",
+    "urgency_level", "safety_score", "confidence_score"
+)
+
+def get_review_record(state: AgentState) -> dict:
+    return {field: getattr(state, field) for field in REVIEW_FIELDS}
 
 def prepare_for_doctor_review_node(state: AgentState):
     """Saves the query and prepares the final user-facing message."""
     print("---NODE: PREPARING FOR DOCTOR REVIEW---")
-    new_state = state.copy(deep=True)
     
-    if new_state.error_message:
-        return new_state
+    if state.error_message:
+        return {}
     
     try:
-        save_query_for_review(new_state.model_dump())
+        saved = save_query_for_review(get_review_record(state))
         
         # Customize message based on urgency
-        if new_state.urgency_level == "high":
-            new_state.final_response_to_patient = """⚠️ Your query has been marked as URGENT and forwarded to your doctor for immediate review. 
-
-If you're experiencing severe symptoms, please don't wait - contact emergency services or visit the nearest emergency room.
-
-Your doctor will respond as soon as possible."""
-        
-        elif new_state.urgency_level == "medium":
-            new_state.final_response_to_patient = """Your query has been received and marked for priority review by your doctor. 
-
-You can expect a response within a few hours. If your symptoms worsen, please seek immediate medical attention."""
-        
-        else:
-            new_state.final_response_to_patient = """Thank you for your query. It has been received and will be reviewed by your doctor.
-
-You'll receive a personalized response within 24 hours. For urgent matters, please contact your healthcare provider directly."""
+        return {
+            "query_id": saved["id"],
+            "final_response_to_patient": get_final_response_to_patient(state.urgency_level)
+        }
             
     except Exception as e:
-        new_state.error_message = f"Failed to save query for review: {e}"
+        return {"error_message": f"Failed to save query for review: {e}"}
+
+async def aprepare_for_doctor_review_node(state: AgentState):
+    """Async variant of prepare_for_doctor_review_node; saves the query off the event loop."""
+    print("---NODE: PREPARING FOR DOCTOR REVIEW (async)---")
+    
+    if state.error_message:
+        return {}
     
-    return new_state
+    try:
+        saved = await asave_query_for_review(get_review_record(state))
+        return {
+            "query_id": saved["id"],
+            "final_response_to_patient": get_final_response_to_patient(state.urgency_level)
+        }
+            
+    except Exception as e:
+        return {"error_message": f"Failed to save query for review: {e}"}
 
 # --- Graph Assembly ---
 workflow = StateGraph(AgentState)
 
 # Add all nodes to the workflow
-workflow.add_node("fetch_patient_data", fetch_patient_data_node)
-workflow.add_node("generate_ai_response", generate_ai_response_node)
+# Nodes that do I/O carry both a sync and an async implementation, so the
+# compiled graph supports app.invoke() for scripts and app.ainvoke() for the API.
+# The async ones go through storage.storage (SQLite or PostgreSQL); the sync
+# ones always use the local SQLite database.
+workflow.add_node("fetch_patient_data", RunnableLambda(fetch_patient_data_node, afunc=afetch_patient_data_node))
+workflow.add_node("generate_ai_response", RunnableLambda(generate_ai_response_node, afunc=agenerate_ai_response_node))
 workflow.add_node("evaluate_response", evaluate_response_node)
-workflow.add_node("prepare_for_doctor_review", prepare_for_doctor_review_node)
+workflow.add_node("prepare_for_doctor_review", RunnableLambda(prepare_for_doctor_review_node, afunc=aprepare_for_doctor_review_node))
 
 # Define the sequence of edges
 workflow.set_entry_point("fetch_patient_data")
@@ -0,0 +1,168 @@
+# backend_service/job_queue.py
+# Durable SQLite job queue and the asyncio worker pool that drains it
+
+import os
+import json
+import time
+import uuid
+import asyncio
+from datetime import datetime
+
+from patient_db import get_db_connection
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 2.0))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 1.0))
+
+NEXT_JOB_SQL = """
+    SELECT id, kind, payload, attempts, max_attempts FROM jobs
+    WHERE status = 'queued' AND run_after <= ?
+    ORDER BY run_after LIMIT 1
+"""
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix"""
+
+def enqueue_job(kind: str, payload: dict, max_attempts: int = None) -> str:
+    """Persists a job and returns its ID"""
+    job_id = str(uuid.uuid4())
+    now = datetime.now().isoformat()
+    conn = get_db_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO jobs (id, kind, payload, max_attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, kind, json.dumps(payload), max_attempts or JOB_MAX_ATTEMPTS, time.time(), now, now))
+    return job_id
+
+def claim_next_job():
+    """Marks the oldest due job as running and returns it, or None if nothing is due"""
+    conn = get_db_connection()
+    while True:
+        with conn:
+            row = conn.execute(NEXT_JOB_SQL, (time.time(),)).fetchone()
+            if row is None:
+                return None
+            # Another worker may have claimed it between the SELECT and here
+            claimed = conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ?
+                WHERE id = ? AND status = 'queued'
+            """, (datetime.now().isoformat(), row["id"])).rowcount
+        if claimed:
+            return {
+                "id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"]),
+                "attempt": row["attempts"] + 1, "max_attempts": row["max_attempts"]
+            }
+
+def complete_job(job_id: str, result: dict):
+    conn = get_db_connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (json.dumps(result), datetime.now().isoformat(), job_id)
+        )
+
+def fail_job(job: dict, error: str, retry: bool = True):
+    """Requeues a job with exponential backoff, or marks it failed once attempts run out"""
+    conn = get_db_connection()
+    now = datetime.now().isoformat()
+    with conn:
+        if retry and job["attempt"] < job["max_attempts"]:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempt"] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', run_after = ?, error = ?, updated_at = ? WHERE id = ?",
+                (time.time() + delay, error, now, job["id"])
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (error, now, job["id"])
+            )
+
+def requeue_interrupted_jobs() -> int:
+    """Returns jobs left running by a previous process to the queue"""
+    conn = get_db_connection()
+    with conn:
+        return conn.execute(
+            "UPDATE jobs SET status = 'queued', run_after = ?, updated_at = ? WHERE status = 'running'",
+            (time.time(), datetime.now().isoformat())
+        ).rowcount
+
+def get_job(job_id: str):
+    row = get_db_connection().execute("""
+        SELECT id, kind, status, attempts, max_attempts, result, error, created_at, updated_at
+        FROM jobs WHERE id = ?
+    """, (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def get_job_counts() -> dict:
+    rows = get_db_connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+    return {status: count for status, count in rows}
+
+class JobWorkerPool:
+    """Runs queued jobs on a fixed number of asyncio tasks.
+
+    handlers maps a job kind to an async function taking the payload and
+    returning a JSON-serializable result. Handlers raise PermanentJobError
+    for failures that should not be retried.
+    """
+
+    def __init__(self, handlers: dict, workers: int = JOB_WORKERS):
+        self.handlers = handlers
+        self.workers = workers
+        self._tasks = []
+        self._wakeup = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes idle workers after a job is enqueued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            # Cleared before claiming so an enqueue during the claim is not missed
+            self._wakeup.clear()
+            job = await asyncio.to_thread(claim_next_job)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind '{job['kind']}'")
+            result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            # Shutting down: requeue_interrupted_jobs picks it up on the next start
+            raise
+        except PermanentJobError as e:
+            print(f"Job {job['id']} failed: {e}")
+            await asyncio.to_thread(fail_job, job, str(e), False)
+        except Exception as e:
+            print(f"Job {job['id']} attempt {job['attempt']} failed: {e}")
+            await asyncio.to_thread(fail_job, job, str(e))
+        else:
+            await asyncio.to_thread(complete_job, job["id"], result)
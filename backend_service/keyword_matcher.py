@@ -0,0 +1,136 @@
+# backend_service/keyword_matcher.py
+# Shared single-pass keyword matcher for the safety, confidence and urgency scorers
+
+import string
+from typing import Dict, Iterable, Set
+
+# Every keyword set used by graph.py and safety_evaluation.py, by category
+KEYWORD_SETS = {
+    # graph.get_safety_score (scanned over the AI response)
+    "safety.danger": [
+        'you have', 'you are diagnosed with', 'stop taking',
+        'change your dose', 'you don\'t need', 'ignore your doctor'
+    ],
+    "safety.reassurance": [
+        'consult your doctor', 'speak with your healthcare provider',
+        'medical attention', 'emergency', 'call 911', 'seek immediate'
+    ],
+    # graph.get_confidence_score (scanned over the query)
+    "confidence.urgent": ['chest pain', 'dizzy', 'unconscious', 'severe', 'emergency'],
+    # graph.determine_urgency_level (scanned over the query)
+    "urgency.high": [
+        'chest pain', 'can\'t breathe', 'unconscious', 'severe pain',
+        'blood sugar over 400', 'blood sugar under 50', 'vomiting',
+        'confusion', 'blurred vision', 'emergency'
+    ],
+    "urgency.medium": [
+        'dizzy', 'nausea', 'headache', 'high blood sugar',
+        'low blood sugar', 'infection', 'fever', 'swelling'
+    ],
+    # safety_evaluation.get_safety_score (scanned over the response)
+    "evaluation.danger": [
+        'diagnose', 'diagnosis', 'you have', 'take this medication',
+        'prescribed', 'dosage', 'treatment plan'
+    ],
+    "evaluation.emergency": ['emergency', 'call 911', 'hospital', 'immediately'],
+    "evaluation.safe": ['consult', 'healthcare provider', 'doctor', 'medical professional'],
+    # safety_evaluation.get_confidence_score
+    "evaluation.serious": ['chest pain', 'difficulty breathing', 'severe'],
+    "evaluation.empathy": ['understand', 'sorry', 'help', 'care'],
+    # safety_evaluation.needs_urgent_review
+    "evaluation.urgent": [
+        'chest pain', 'can\'t breathe', 'severe pain', 'emergency',
+        'suicide', 'overdose', 'accident', 'bleeding'
+    ],
+}
+
+# Lowercased text is mapped to space-separated word tokens: punctuation
+# becomes a space and apostrophes are dropped, so "can't" and "cant" match.
+_WORD_CHARS = set(string.ascii_lowercase + string.digits)
+_TOKEN_TABLE = {i: " " for i in range(128) if chr(i) not in _WORD_CHARS}
+_TOKEN_TABLE.update({ord("'"): None, ord("’"): None})
+
+# Distinct tokens whose prefix hits are remembered; drafts reuse a small vocabulary
+TOKEN_MEMO_SIZE = 50000
+
+def tokenize(text: str) -> list:
+    return text.lower().translate(_TOKEN_TABLE).split()
+
+class KeywordMatcher:
+    """Finds every keyword from every category in a single pass over a text.
+
+    A keyword must start at a word boundary but its last word may run on, so
+    'headache' matches 'headaches' and 'fever' matches 'feverish' while 'care'
+    does not fire inside 'healthcare'. Single-word keywords are looked up by
+    each token's first letters and remembered per token, so a scan of familiar
+    words is two set operations; multi-word phrases are only checked when their
+    first word occurs in the text.
+    """
+
+    def __init__(self, keyword_sets: Dict[str, Iterable[str]]):
+        self._categories = {}   # normalized phrase -> set of categories
+        self._phrases = {}      # normalized phrase -> keyword as written
+        single_words = set()
+        self._multi_word = {}   # first token -> [" phrase"]
+        for category, keywords in keyword_sets.items():
+            for keyword in keywords:
+                tokens = tokenize(keyword)
+                normalized = " ".join(tokens)
+                self._categories.setdefault(normalized, set()).add(category)
+                self._phrases.setdefault(normalized, keyword)
+                if len(tokens) == 1:
+                    single_words.add(normalized)
+                else:
+                    # Leading space only: the last word may be a prefix
+                    padded = f" {normalized}"
+                    phrases = self._multi_word.setdefault(tokens[0], [])
+                    if padded not in phrases:
+                        phrases.append(padded)
+        # Single words indexed by their first _prefix_len letters (the shortest keyword)
+        self._prefix_len = min(map(len, single_words), default=1)
+        self._by_prefix = {}
+        for word in single_words:
+            self._by_prefix.setdefault(word[:self._prefix_len], []).append(word)
+        self._token_words = {}  # token -> tuple of single-word keywords it starts with
+        self._hit_tokens = set()  # tokens with at least one
+
+    def _remember(self, token: str):
+        candidates = self._by_prefix.get(token[:self._prefix_len], ())
+        words = tuple(word for word in candidates if token.startswith(word))
+        if len(self._token_words) >= TOKEN_MEMO_SIZE:
+            # Replaced rather than cleared so concurrent scans never see half a reset
+            self._token_words, self._hit_tokens = {}, set()
+        self._token_words[token] = words
+        if words:
+            self._hit_tokens.add(token)
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Returns {category: {keywords found}} for every category with at least one hit"""
+        tokens = tokenize(text or "")
+        token_set = set(tokens)
+        for token in token_set.difference(self._token_words):
+            self._remember(token)
+        found = set()
+        token_words = self._token_words
+        for token in token_set & self._hit_tokens:
+            found.update(token_words.get(token, ()))
+        first_words = token_set & self._multi_word.keys()
+        if first_words:
+            padded_text = f" {' '.join(tokens)} "
+            for first_word in first_words:
+                for padded in self._multi_word[first_word]:
+                    if padded in padded_text:
+                        found.add(padded.strip())
+
+        hits = {}
+        for normalized in found:
+            for category in self._categories[normalized]:
+                hits.setdefault(category, set()).add(self._phrases[normalized])
+        return hits
+
+# Built once at import and shared by every scorer
+MATCHER = KeywordMatcher(KEYWORD_SETS)
+
+def scan(text: str) -> Dict[str, Set[str]]:
+    """Scans text with the shared matcher"""
+    return MATCHER.scan(text)
@@ -0,0 +1,219 @@
+# backend_service/llm_client.py
+# Shared DeepSeek chat model with call deadlines, a concurrency bound and a circuit breaker
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+
+try:
+    from langchain_openai import ChatOpenAI
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    # The breaker and stats still work; only creating the model needs LangChain
+    ChatOpenAI = None
+    LANGCHAIN_AVAILABLE = False
+
+LLM_MODEL = "deepseek/deepseek-r1-0528"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_TOKENS = 300
+
+# Per HTTP request to the provider, and for the whole call including retries
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', 20))
+LLM_DEADLINE_SECONDS = float(os.environ.get('LLM_DEADLINE_SECONDS', 45))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 1))
+# Blocking callers (scripts, app.invoke) share this bound; async requests are
+# bounded by llm_scheduler instead
+LLM_SYNC_CONCURRENCY = int(os.environ.get('LLM_SYNC_CONCURRENCY', 8))
+
+# The circuit opens when at least LLM_CIRCUIT_ERROR_RATE of the last
+# LLM_CIRCUIT_WINDOW calls failed (and at least LLM_CIRCUIT_MIN_CALLS were
+# made). After LLM_CIRCUIT_COOLDOWN_SECONDS one probe call is let through;
+# its outcome closes the circuit or opens it for another cooldown.
+LLM_CIRCUIT_WINDOW = int(os.environ.get('LLM_CIRCUIT_WINDOW', 20))
+LLM_CIRCUIT_MIN_CALLS = int(os.environ.get('LLM_CIRCUIT_MIN_CALLS', 5))
+LLM_CIRCUIT_ERROR_RATE = float(os.environ.get('LLM_CIRCUIT_ERROR_RATE', 0.5))
+LLM_CIRCUIT_COOLDOWN_SECONDS = float(os.environ.get('LLM_CIRCUIT_COOLDOWN_SECONDS', 30))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with a single half-open probe"""
+
+    def __init__(self, window: int, min_calls: int, error_rate: float, cooldown_seconds: float):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)   # True for success
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._stats["opened"] += 1
+
+    def available(self) -> bool:
+        """True when a call would currently be let through, without claiming the probe"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                return time.monotonic() - self._opened_at >= self.cooldown_seconds
+            return not self._probe_in_flight
+
+    def allow(self) -> bool:
+        """Claims permission for one call; in half-open state only the probe is allowed"""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_rejection(self):
+        with self._lock:
+            self._stats["rejected"] += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+                self._probe_in_flight = False
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def release_probe(self):
+        """Lets another probe through after one ended without an outcome"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == "half_open":
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self.state == "closed" and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_rate):
+                self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            stats["recent_calls"] = len(self._outcomes)
+            stats["recent_failures"] = self._outcomes.count(False)
+        return stats
+
+def create_chat_model():
+    """The DeepSeek chat model, with request timeouts and bounded retries"""
+    if not LANGCHAIN_AVAILABLE:
+        raise ImportError("langchain_openai is required to create the chat model")
+    return ChatOpenAI(
+        model_name=LLM_MODEL,
+        openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
+        openai_api_base=os.getenv("DEEPSEEK_API_BASE"),
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS,
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=LLM_MAX_RETRIES
+    )
+
+class LLMGateway:
+    """Owns the shared chat model and guards every call with the circuit breaker.
+
+    One model instance is reused for the life of the process so its HTTP
+    connection pool is too.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, deadline_seconds: float, sync_concurrency: int):
+        self.breaker = breaker
+        self.deadline_seconds = deadline_seconds
+        self._sync_slots = threading.BoundedSemaphore(sync_concurrency)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "timeouts": 0}
+
+    def get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = create_chat_model()
+        return self._model
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def fail_fast(self):
+        """Raises CircuitOpenError when a call would be rejected, before waiting for a slot"""
+        if not self.breaker.available():
+            self.breaker.record_rejection()
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+    def _check_circuit(self):
+        self._count("calls")
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+    def _record_failure(self, stat: str = "failures"):
+        self._count(stat)
+        self.breaker.record_failure()
+
+    def invoke(self, model, prompt: str, config=None) -> str:
+        """Blocking completion; relies on the model's own request timeout"""
+        self._check_circuit()
+        with self._sync_slots:
+            try:
+                content = model.invoke(prompt, config=config).content
+            except Exception:
+                self._record_failure()
+                raise
+        self.breaker.record_success()
+        return content
+
+    async def ainvoke(self, model, prompt: str, config=None) -> str:
+        """Async completion bounded by deadline_seconds"""
+        self._check_circuit()
+        try:
+            message = await asyncio.wait_for(model.ainvoke(prompt, config=config), self.deadline_seconds)
+        except asyncio.TimeoutError:
+            self._record_failure("timeouts")
+            raise TimeoutError(f"LLM call exceeded the {self.deadline_seconds}s deadline")
+        except asyncio.CancelledError:
+            # The caller went away; this says nothing about provider health
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self._record_failure()
+            raise
+        self.breaker.record_success()
+        return message.content
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.stats()
+        return stats
+
+llm_gateway = LLMGateway(
+    CircuitBreaker(
+        LLM_CIRCUIT_WINDOW, LLM_CIRCUIT_MIN_CALLS,
+        LLM_CIRCUIT_ERROR_RATE, LLM_CIRCUIT_COOLDOWN_SECONDS
+    ),
+    LLM_DEADLINE_SECONDS,
+    LLM_SYNC_CONCURRENCY
+)
@@ -0,0 +1,132 @@
+# backend_service/llm_scheduler.py
+# Urgency-aware admission control for LLM calls: urgent queries get the next free slot
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+LEVELS = ("high", "medium", "low")
+LEVEL_RANK = {level: rank for rank, level in enumerate(LEVELS)}
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+# Per-level caps below the total keep headroom for urgent queries when the
+# queue is full of routine ones, e.g. "high=8,medium=6,low=4"
+LLM_LEVEL_LIMITS = os.environ.get('LLM_LEVEL_LIMITS', 'high=8,medium=6,low=4')
+# Each this many seconds of waiting counts as one urgency level of promotion
+LLM_AGING_SECONDS = float(os.environ.get('LLM_AGING_SECONDS', 30))
+
+# Recent wait times kept per level for the percentile metrics
+WAIT_SAMPLES = 1000
+
+def parse_level_limits(spec: str, default: int) -> dict:
+    limits = {level: default for level in LEVELS}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, value = item.partition("=")
+        if level.strip() not in limits:
+            raise ValueError(f"Unknown urgency level in LLM_LEVEL_LIMITS: {level!r}")
+        limits[level.strip()] = int(value)
+    return limits
+
+class PriorityScheduler:
+    """Grants LLM slots by urgency, with per-level concurrency caps and aging.
+
+    Waiters queue FIFO per level. Whenever a slot frees up, the head of
+    each level that is under its cap competes on rank minus time waited
+    divided by aging_seconds, so a low-urgency query that has waited long
+    enough outranks fresh high-urgency ones. Must be used from one event loop.
+    """
+
+    def __init__(self, max_concurrency: int, level_limits: dict, aging_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.level_limits = level_limits
+        self.aging_seconds = aging_seconds
+        self._waiting = {level: deque() for level in LEVELS}
+        self._running = {level: 0 for level in LEVELS}
+        self._dispatched = {level: 0 for level in LEVELS}
+        self._waits = {level: deque(maxlen=WAIT_SAMPLES) for level in LEVELS}
+
+    def _priority(self, level: str, enqueued_at: float, now: float) -> float:
+        waited = now - enqueued_at
+        aging = waited / self.aging_seconds if self.aging_seconds > 0 else 0.0
+        return LEVEL_RANK[level] - aging
+
+    def _has_capacity(self, level: str) -> bool:
+        return (sum(self._running.values()) < self.max_concurrency
+                and self._running[level] < self.level_limits[level])
+
+    def _start(self, level: str, waited: float):
+        self._running[level] += 1
+        self._dispatched[level] += 1
+        self._waits[level].append(waited)
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while True:
+            candidates = [
+                (self._priority(level, queue[0][0], now), level)
+                for level, queue in self._waiting.items()
+                if queue and self._has_capacity(level)
+            ]
+            if not candidates:
+                return
+            _, level = min(candidates)
+            enqueued_at, future = self._waiting[level].popleft()
+            self._start(level, now - enqueued_at)
+            future.set_result(None)
+
+    async def acquire(self, level: str):
+        level = level if level in LEVEL_RANK else "low"
+        entry = (time.monotonic(), asyncio.get_running_loop().create_future())
+        self._waiting[level].append(entry)
+        # Resolves the future right away when a slot is free for this level
+        self._dispatch()
+        try:
+            await entry[1]
+        except asyncio.CancelledError:
+            if entry[1].done() and not entry[1].cancelled():
+                # Granted a slot just as the caller went away: hand it on
+                self.release(level)
+            else:
+                self._waiting[level].remove(entry)
+            raise
+        return level
+
+    def release(self, level: str):
+        self._running[level] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, level: str):
+        """Holds one LLM slot for the duration of the block"""
+        level = await self.acquire(level)
+        try:
+            yield
+        finally:
+            self.release(level)
+
+    def stats(self) -> dict:
+        stats = {}
+        now = time.monotonic()
+        for level in LEVELS:
+            waits = sorted(self._waits[level])
+            queue = self._waiting[level]
+            stats[level] = {
+                "queued": len(queue),
+                "running": self._running[level],
+                "limit": self.level_limits[level],
+                "dispatched": self._dispatched[level],
+                "oldest_wait_ms": round((now - queue[0][0]) * 1000, 1) if queue else 0.0,
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+            }
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+llm_scheduler = PriorityScheduler(
+    LLM_MAX_CONCURRENCY,
+    parse_level_limits(LLM_LEVEL_LIMITS, LLM_MAX_CONCURRENCY),
+    LLM_AGING_SECONDS
+)
@@ -1,36 +1,82 @@
 import os
+import json
 import uuid
-from datetime import datetime
+import base64
+import asyncio
+from datetime import date
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
 from pydantic import BaseModel
 
+# --- Environment Variable Loading & App Setup ---
+dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
+load_dotenv(dotenv_path=dotenv_path)
+
+# "full" drafts answers with LangGraph and the LLM; "lite" (what main_simple.py
+# starts) only stores queries for the doctors and needs no API keys
+BACKEND_MODE = os.environ.get("BACKEND_MODE", "full").lower()
+
 # Import your project's modules
-from schemas import PatientQueryInput, AgentState
-try:
-    from graph import app as langgraph_app
-    LANGGRAPH_AVAILABLE = True
-except ImportError as e:
-    print(f"Warning: LangGraph not available: {e}")
+from schemas import PatientQueryInput
+if BACKEND_MODE == "lite":
     LANGGRAPH_AVAILABLE = False
     langgraph_app = None
-from patient_db import get_db_connection
+else:
+    try:
+        from graph import app as langgraph_app
+        LANGGRAPH_AVAILABLE = True
+    except ImportError as e:
+        print(f"Warning: LangGraph not available: {e}")
+        LANGGRAPH_AVAILABLE = False
+        langgraph_app = None
+from patient_db import (
+    init_db, patient_cache, context_cache, thaw, summarize_patient, query_writes, QUERY_FIELDS,
+    SIMPLE_STATUSES, UNIFIED_STATUSES, normalize_query
+)
+from storage import storage
+from change_feed import change_feed
+from database import close_all_connections
+import rescore
+import job_queue
+from single_flight import SingleFlight
+# LLM-side modules; lite mode never calls the LLM and must run without LangChain
+if BACKEND_MODE != "lite":
+    from response_cache import response_cache
+    from semantic_cache import semantic_cache
+    from llm_scheduler import llm_scheduler
+    from llm_client import llm_gateway
 
-# --- Environment Variable Loading & App Setup ---
-dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
-load_dotenv(dotenv_path=dotenv_path)
+if BACKEND_MODE != "lite":
+    if not os.getenv("DEEPSEEK_API_KEY"): 
+        raise ValueError("DEEPSEEK_API_KEY not found in environment variables.")
+    if not os.getenv("DEEPSEEK_API_BASE"): 
+        raise ValueError("DEEPSEEK_API_BASE not found in environment variables.")
 
-if not os.getenv("DEEPSEEK_API_KEY"): 
-    raise ValueError("DEEPSEEK_API_KEY not found in environment variables.")
-if not os.getenv("DEEPSEEK_API_BASE"): 
-    raise ValueError("DEEPSEEK_API_BASE not found in environment variables.")
+# "sync" runs the graph inside the /process_query/ request; "queue" stores the
+# query as a job, answers 202 straight away and lets the worker pool run it
+QUERY_INGESTION_MODE = os.environ.get("QUERY_INGESTION_MODE", "sync").lower()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the schema once at startup instead of on every request
+    init_db()
+    await storage.open()
+    job_workers.start()
+    yield
+    await job_workers.stop()
+    await storage.close()
+    query_writes.stop()
+    close_all_connections()
 
 app = FastAPI(
     title="Assist AI Backend Service",
     description="Processes patient queries and provides endpoints for review.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -39,113 +85,614 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Total-Count", "X-Urgency-Counts", "X-Next-Cursor", "X-Change-Feed", "X-Change-Seq",
+        "ETag", "X-Row-Version", "X-Sync",
+    ],
 )
 
 class DoctorAction(BaseModel):
     new_status: str
     doctor_response: Optional[str] = None
 
+FALLBACK_DEMO_RESPONSE = "Demo AI response: Thank you for your query. A doctor will review and respond soon."
+
+async def save_fallback_query(query_input: PatientQueryInput):
+    """Stores a query with the canned demo response when LangGraph is unavailable"""
+    query_id, _ = await storage.insert_pending_query({
+        "id": str(uuid.uuid4()),
+        "patient_id": query_input.patient_id,
+        "original_query": query_input.query,
+        "ai_response": FALLBACK_DEMO_RESPONSE,
+        "urgency_level": "medium",
+        "safety_score": 85,
+        "confidence_score": 80
+    })
+    return query_id
+
+def get_fallback_result(query_input: PatientQueryInput, query_id: str) -> dict:
+    return {
+        "patient_id": query_input.patient_id,
+        "original_query": query_input.query,
+        "query_id": query_id,
+        "ai_response": FALLBACK_DEMO_RESPONSE,
+        "urgency_level": "medium",
+        "safety_score": 85,
+        "confidence_score": 80,
+        "final_response_to_patient": "Your query has been received and will be reviewed by your doctor. You'll receive a personalized response within 24 hours."
+    }
+
+def get_initial_state(query_input: PatientQueryInput) -> dict:
+    return {
+        "patient_id": query_input.patient_id,
+        "original_query": query_input.query,
+        "uploaded_file_name": query_input.uploaded_file_name,
+        "bypass_cache": query_input.bypass_cache,
+        "patient_data": None, "ai_response": None, "error_message": None,
+        "final_response_to_patient": None, "safety_score": None,
+        "confidence_score": None, "needs_urgent_review": None
+    }
+
+# Concurrent identical submissions (double clicks, Streamlit reruns) share one
+# graph run and therefore one LLM call and one saved query ID
+query_flights = SingleFlight()
+
+def get_flight_key(query_input: PatientQueryInput):
+    return (query_input.patient_id, normalize_query(query_input.query), query_input.bypass_cache)
+
+async def run_graph(query_input: PatientQueryInput) -> dict:
+    """Runs the graph for a query, coalesced with identical in-flight runs"""
+    return await query_flights.run(
+        get_flight_key(query_input),
+        lambda: langgraph_app.ainvoke(get_initial_state(query_input))
+    )
+
 # --- API Endpoints ---
+# Endpoints doing blocking SQLite work are plain `def` so FastAPI runs them in
+# its threadpool instead of on the event loop shared with /process_query/.
+# Query and patient endpoints go through the async storage backend instead.
 
 @app.get("/", tags=["Health Check"])
 async def root():
     return {"message": "Backend service is operational."}
 
 @app.post("/process_query/", response_model=dict, tags=["Agent Processing"])
-async def process_query(query_input: PatientQueryInput) -> dict:
+async def process_query(query_input: PatientQueryInput, response: Response) -> dict:
+    if QUERY_INGESTION_MODE == "queue":
+        job_id = await asyncio.to_thread(
+            job_queue.enqueue_job, "process_query", query_input.model_dump()
+        )
+        job_workers.notify()
+        response.status_code = 202
+        return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+    
     try:
         if not LANGGRAPH_AVAILABLE:
             # Fallback behavior when LangGraph is not available
-            import uuid
-            from datetime import datetime
-            
-            query_id = str(uuid.uuid4())
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO queries (
-                    id, timestamp, patient_id, original_query, 
-                    ai_response, status, urgency_level, 
-                    safety_score, confidence_score
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                query_id,
-                datetime.now().isoformat(),
-                query_input.patient_id,
-                query_input.query,
-                "Demo AI response: Thank you for your query. A doctor will review and respond soon.",
-                'pending_review',
-                'medium',
-                85,
-                80
-            ))
-            conn.commit()
-            conn.close()
-            
-            return {
-                "patient_id": query_input.patient_id,
-                "original_query": query_input.query,
-                "ai_response": "Demo AI response: Thank you for your query. A doctor will review and respond soon.",
-                "urgency_level": "medium",
-                "safety_score": 85,
-                "confidence_score": 80,
-                "final_response_to_patient": "Your query has been received and will be reviewed by your doctor. You'll receive a personalized response within 24 hours."
-            }
+            query_id = await save_fallback_query(query_input)
+            return get_fallback_result(query_input, query_id)
         
-        initial_state = {
-            "patient_id": query_input.patient_id,
-            "original_query": query_input.query,
-            "uploaded_file_name": query_input.uploaded_file_name,
-            "patient_data": None, "ai_response": None, "error_message": None,
-            "final_response_to_patient": None, "safety_score": None,
-            "confidence_score": None, "needs_urgent_review": None
-        }
-        final_state = langgraph_app.invoke(initial_state)
+        final_state = await run_graph(query_input)
         if final_state.get("error_message"):
             raise HTTPException(status_code=400, detail=final_state["error_message"])
         
         # Query is already saved by the LangGraph workflow in save_query_for_review()
         # No need to save it again here to avoid duplicates
         
-        return final_state
+        # patient_data is the frozen shared record; return a plain copy for serialization
+        return {**final_state, "patient_data": thaw(final_state.get("patient_data"))}
     except Exception as e:
         print(f"FATAL ERROR in /process_query/ endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"An unexpected server error occurred: {e}")
 
+# --- Background Jobs ---
+async def run_query_job(payload: dict) -> dict:
+    """Job handler for queued /process_query/ submissions"""
+    query_input = PatientQueryInput(**payload)
+    if not LANGGRAPH_AVAILABLE:
+        query_id = await save_fallback_query(query_input)
+        return {"query_id": query_id}
+    
+    final_state = await run_graph(query_input)
+    error = final_state.get("error_message")
+    if error:
+        if not final_state.get("patient_data"):
+            # Unknown patient: retrying will not help
+            raise job_queue.PermanentJobError(error)
+        raise RuntimeError(error)
+    return {
+        "query_id": final_state.get("query_id"),
+        "urgency_level": final_state.get("urgency_level"),
+        "final_response_to_patient": final_state.get("final_response_to_patient"),
+    }
+
+job_workers = job_queue.JobWorkerPool({"process_query": run_query_job})
+
+@app.get("/jobs/{job_id}", tags=["Agent Processing"])
+def get_job_endpoint(job_id: str):
+    job = job_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --- Streaming ---
+# /process_query/stream runs the same graph but reports progress as
+# server-sent events while it runs, so clients see the patient lookup and
+# the draft being written instead of waiting for the whole completion.
+# Events, in order: patient, token (repeated), draft, evaluation, saved;
+# or error, which ends the stream.
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def get_stream_event(node: str, update: dict):
+    """Maps a node's state update to an (event, data) pair"""
+    if update.get("error_message"):
+        return "error", {"detail": update["error_message"]}
+    if node == "fetch_patient_data":
+        profile = update["patient_data"]["profile"]
+        return "patient", {"name": profile.get("name"), "diabetes_type": profile.get("Type of Diabetes")}
+    if node == "generate_ai_response":
+        return "draft", {"length": len(update["ai_response"])}
+    if node == "evaluate_response":
+        return "evaluation", update
+    if node == "prepare_for_doctor_review":
+        return "saved", update
+    return None
+
+async def run_graph_streaming(query_input: PatientQueryInput, events: asyncio.Queue) -> dict:
+    """Runs the graph, putting (event, data) pairs on events as it goes; returns the final state.
+    A None on the queue marks the end of the stream."""
+    final_state = get_initial_state(query_input)
+    try:
+        async for mode, chunk in langgraph_app.astream(
+            final_state, stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "generate_ai_response" and message.content:
+                    events.put_nowait(("token", {"text": message.content}))
+                continue
+            for node, update in chunk.items():
+                final_state.update(update or {})
+                event = get_stream_event(node, update or {})
+                if event:
+                    events.put_nowait(event)
+                    if event[0] == "error":
+                        return final_state
+        return final_state
+    finally:
+        events.put_nowait(None)
+
+def get_final_state_events(final_state: dict):
+    """The events of a finished run, for callers that joined it late"""
+    if final_state.get("error_message"):
+        return [("error", {"detail": final_state["error_message"]})]
+    events = [get_stream_event("fetch_patient_data", final_state)]
+    events.append(get_stream_event("generate_ai_response", final_state))
+    events.append(("evaluation", {
+        key: final_state.get(key)
+        for key in ("safety_score", "confidence_score", "urgency_level", "needs_urgent_review")
+    }))
+    events.append(("saved", {
+        key: final_state.get(key) for key in ("query_id", "final_response_to_patient")
+    }))
+    return events
+
+async def stream_query_events(query_input: PatientQueryInput):
+    try:
+        if not LANGGRAPH_AVAILABLE:
+            query_id = await save_fallback_query(query_input)
+            yield format_sse("saved", get_fallback_result(query_input, query_id))
+            return
+        
+        key = get_flight_key(query_input)
+        task = query_flights.get(key)
+        if task is not None:
+            # An identical query is already running: report its outcome
+            for event in get_final_state_events(await query_flights.join(task)):
+                yield format_sse(*event)
+            return
+        
+        events = asyncio.Queue()
+        task = query_flights.start(key, run_graph_streaming(query_input, events))
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield format_sse(*event)
+        # Surfaces an exception raised by the graph run
+        await asyncio.shield(task)
+    except Exception as e:
+        print(f"ERROR in /process_query/stream: {e}")
+        yield format_sse("error", {"detail": "An unexpected server error occurred."})
+
+@app.post("/process_query/stream", tags=["Agent Processing"])
+async def process_query_stream(query_input: PatientQueryInput):
+    return StreamingResponse(
+        stream_query_events(query_input),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+URGENCY_LEVELS = ("high", "medium", "low")
+
+def encode_cursor(row) -> str:
+    """Opaque keyset cursor for the position just after `row`"""
+    key = [row["urgency_rank"], row["timestamp"], row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        rank, timestamp, query_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [int(rank), str(timestamp), str(query_id)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# --- Conditional and Delta Reads ---
+# List endpoints are versioned by the highest row_version behind them. The
+# version is read before the rows, so a response is never older than its
+# ETag / X-Row-Version; at worst a client re-reads a row it already has.
+def get_etag(scope: str, version: int) -> str:
+    return f'W/"{scope}-{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.replace("W/", "", 1) == etag.replace("W/", "", 1) for tag in tags)
+
+def set_version_headers(response: Response, etag: str, version: int):
+    response.headers["ETag"] = etag
+    response.headers["X-Row-Version"] = str(version)
+
+def not_modified(response: Response) -> Response:
+    """A 304 carrying the ETag and X- headers already set on response"""
+    headers = {name: value for name, value in response.headers.items() if name.startswith(("etag", "x-"))}
+    return Response(status_code=304, headers=headers)
+
+def is_delta(since: Optional[int], version: int) -> bool:
+    # A since ahead of the table (e.g. the database was replaced) gets a full read
+    return since is not None and since <= version
+
 @app.get("/pending_queries/", response_model=List[dict], tags=["Doctor Dashboard"])
-async def get_pending_queries_endpoint():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM queries WHERE status = 'pending_review'")
-    queries = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return queries
+async def get_pending_queries_endpoint(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; omit to return every pending query"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,patient_id,urgency_level"),
+    since: Optional[int] = Query(None, ge=0, description="X-Row-Version of an earlier full read; return only rows changed after it"),
+    include: Optional[str] = Query(None, description="patient: embed each query's patient summary"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Pending queries ordered by urgency then age, with keyset pagination.
+
+    Headers: X-Total-Count and X-Urgency-Counts describe the whole queue;
+    X-Next-Cursor is set when another page is available. X-Change-Feed and
+    X-Change-Seq give the /changes position to follow from: every change
+    after it is reported there, some may already be reflected here.
+
+    ETag / If-None-Match answer 304 when no query changed. With since, the
+    response is X-Sync: delta and lists every query written after that
+    version, pending or not (with id and status), oldest change first;
+    clients upsert the pending ones and drop the rest. X-Sync: full means
+    the result replaces what the client had.
+
+    include=patient adds a "patient" summary (as /patients/batch) to each
+    row, or null for an unknown patient, from one lookup of the distinct
+    patients on the page.
+    """
+    response.headers["X-Change-Feed"] = change_feed.feed_id
+    response.headers["X-Change-Seq"] = str(change_feed.last_seq)
+    if since is not None and (limit or cursor):
+        raise HTTPException(status_code=400, detail="since cannot be combined with limit or cursor")
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in QUERY_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        selected = list(QUERY_FIELDS)
+    if include not in (None, "patient"):
+        raise HTTPException(status_code=400, detail=f"Unknown include: {include}")
+    
+    version = await storage.get_queries_version()
+    set_version_headers(response, get_etag("pending", version), version)
+    # With patients embedded the ETag also depends on their records; see below
+    if not include and etag_matches(if_none_match, response.headers["ETag"]):
+        return not_modified(response)
+    
+    if is_delta(since, version):
+        response.headers["X-Sync"] = "delta"
+        selected = list(dict.fromkeys(selected + ["id", "status"]))
+        rows = await storage.list_changed_queries(selected, since)
+    else:
+        response.headers["X-Sync"] = "full"
+        # The keyset columns are always read so the next cursor can be built
+        columns = list(dict.fromkeys(selected + ["id", "timestamp", "urgency_rank"]))
+        after = decode_cursor(cursor) if cursor else None
+        rows = await storage.list_pending_queries(columns, after, limit + 1 if limit else None)
+        
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    
+    summaries = None
+    if include:
+        patients = await storage.get_patients([row["patient_id"] for row in rows])
+        # The same rows mean the same patients, whose versions only go up
+        patients_version = sum(record["version"] for record in patients.values())
+        set_version_headers(response, get_etag("pending", f"{version}.{patients_version}"), version)
+        if etag_matches(if_none_match, response.headers["ETag"]):
+            return not_modified(response)
+        summaries = {patient_id: summarize_patient(record["data"]) for patient_id, record in patients.items()}
+    
+    counts = await storage.count_pending_by_rank()
+    response.headers["X-Total-Count"] = str(sum(counts.values()))
+    response.headers["X-Urgency-Counts"] = ",".join(
+        f"{level}={counts.get(rank, 0)}" for rank, level in enumerate(URGENCY_LEVELS)
+    )
+    
+    if summaries is not None:
+        return [
+            {**{field: row[field] for field in selected}, "patient": summaries.get(row["patient_id"])}
+            for row in rows
+        ]
+    return [{field: row[field] for field in selected} for row in rows]
 
 @app.post("/update_query/{query_id}", tags=["Doctor Dashboard"])
 async def update_query_endpoint(query_id: str, action: DoctorAction):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE queries SET status = ?, doctor_final_response = ? WHERE id = ?", (action.new_status, action.doctor_response, query_id))
-    conn.commit()
-    if cursor.rowcount == 0:
-        conn.close()
+    if not await storage.update_query(query_id, action.new_status, action.doctor_response):
         raise HTTPException(status_code=404, detail="Query not found")
-    conn.close()
     return {"status": "success", "message": "Query updated successfully"}
 
+# --- Change Feed ---
+# Query inserts and updates made through the storage backend, for dashboards
+# to apply as deltas instead of refetching the queue
+CHANGE_STREAM_KEEPALIVE_SECONDS = 15
+
+def get_changes_result(events: list, reset: bool) -> dict:
+    return {
+        "feed": change_feed.feed_id,
+        "last_seq": change_feed.last_seq,
+        "reset": reset,
+        "events": events,
+    }
+
+@app.get("/changes", tags=["Doctor Dashboard"])
+async def get_changes_endpoint(
+    since: Optional[int] = Query(None, ge=0, description="Last seq applied; omit to get the current position"),
+    feed: Optional[str] = Query(None, description="Feed id the seq belongs to"),
+    timeout: float = Query(25.0, ge=0, le=60, description="Seconds to wait for a change (long poll)"),
+):
+    """Changes after since, waiting up to timeout seconds for one.
+
+    reset=true means the feed restarted or dropped events the caller had not
+    seen; refetch /pending_queries/ and continue from last_seq.
+    """
+    if since is None:
+        return get_changes_result([], False)
+    events, reset = await change_feed.wait(since, feed, timeout)
+    return get_changes_result(events, reset)
+
+async def stream_changes(since: Optional[int], feed: Optional[str]):
+    seq = change_feed.last_seq if since is None else since
+    yield format_sse("hello", get_changes_result([], False))
+    while True:
+        events, reset = await change_feed.wait(seq, feed, CHANGE_STREAM_KEEPALIVE_SECONDS)
+        if reset:
+            yield format_sse("reset", get_changes_result([], True))
+            seq, feed = change_feed.last_seq, change_feed.feed_id
+            continue
+        if not events:
+            # Comment line: keeps proxies from closing an idle connection
+            yield ": keepalive\n\n"
+            continue
+        for event in events:
+            yield format_sse("change", event)
+        seq = events[-1]["seq"]
+
+@app.get("/changes/stream", tags=["Doctor Dashboard"])
+async def stream_changes_endpoint(
+    since: Optional[int] = Query(None, ge=0, description="Last seq applied; omit to start from now"),
+    feed: Optional[str] = Query(None, description="Feed id the seq belongs to"),
+):
+    """Server-sent events: hello, then one change event per insert or update
+    (reset if the client has to refetch)"""
+    return StreamingResponse(
+        stream_changes(since, feed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/queries/by_patient/{patient_id}", response_model=List[dict], tags=["Patient Portal"])
-async def get_patient_queries_endpoint(patient_id: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM queries WHERE patient_id = ? ORDER BY timestamp DESC", (patient_id,))
-    queries = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return queries
+async def get_patient_queries_endpoint(
+    patient_id: str,
+    response: Response,
+    since: Optional[int] = Query(None, ge=0, description="X-Row-Version of an earlier read; return only rows changed after it"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """A patient's queries, newest first.
+
+    Conditional (ETag / If-None-Match, 304) and delta (since, X-Sync) reads
+    work as for /pending_queries/; a delta lists the changed rows oldest
+    change first, to be upserted by id.
+    """
+    version = await storage.get_queries_version(patient_id)
+    etag = get_etag(f"patient-{patient_id}", version)
+    set_version_headers(response, etag, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(response)
+    if is_delta(since, version):
+        response.headers["X-Sync"] = "delta"
+        return await storage.list_patient_queries(patient_id, since)
+    response.headers["X-Sync"] = "full"
+    return await storage.list_patient_queries(patient_id)
+
+# Largest patient_ids list accepted by /patients/batch
+PATIENT_BATCH_LIMIT = 500
+
+class PatientBatchRequest(BaseModel):
+    patient_ids: List[str]
+
+@app.post("/patients/batch", tags=["Doctor Dashboard"])
+async def get_patient_summaries_endpoint(request: PatientBatchRequest):
+    """Summaries (name, diabetes type, HbA1c, ...) of up to PATIENT_BATCH_LIMIT patients in
+    one request; unknown IDs are listed under missing"""
+    patient_ids = list(dict.fromkeys(request.patient_ids))
+    if len(patient_ids) > PATIENT_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {PATIENT_BATCH_LIMIT} patient IDs per request")
+    patients = await storage.get_patients(patient_ids)
+    return {
+        "patients": {patient_id: summarize_patient(record["data"]) for patient_id, record in patients.items()},
+        "missing": [patient_id for patient_id in patient_ids if patient_id not in patients],
+    }
 
 @app.get("/patient/{patient_id}", response_model=dict, tags=["Patient Portal"])
 async def get_patient_data_endpoint(patient_id: str):
-    from patient_db import get_patient_data
-    patient_data = get_patient_data(patient_id)
-    if not patient_data:
+    record = await storage.get_patient(patient_id)
+    if not record:
         raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    return patient_data
\ No newline at end of file
+    return thaw(record["data"])
+
+# --- Lite Portal API ---
+# The endpoints of the simplified portals (patient_simple.py, doctor_simple.py),
+# served from the same queries table as everything else. Rows are translated
+# to the field names and statuses those portals use.
+class SimpleQuery(BaseModel):
+    patient_id: str
+    query: str
+    urgency: Optional[str] = "low"
+
+class DoctorResponse(BaseModel):
+    question_id: str
+    doctor_response: str
+    status: str
+
+# Patient name mapping for demo
+PATIENT_NAMES = {
+    "P001": "Sarah Johnson",
+    "P002": "Michael Thompson", 
+    "P003": "Carlos Rodriguez",
+    "P004": "Priya Patel",
+    "P005": "Eleanor Williams"
+}
+
+def get_simple_question(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "patient_id": row["patient_id"],
+        "patient_name": PATIENT_NAMES.get(row["patient_id"], "Unknown Patient"),
+        "question": row["original_query"],
+        "doctor_response": row["doctor_final_response"],
+        "status": SIMPLE_STATUSES.get(row["status"], row["status"]),
+        "urgency": row["urgency_level"],
+        "date": row["timestamp"],
+    }
+
+@app.post("/simple_query/", tags=["Lite Portal"])
+async def submit_simple_query(query: SimpleQuery):
+    """Submit a simple patient query"""
+    query_id, _ = await storage.insert_pending_query({
+        "id": str(uuid.uuid4()),
+        "patient_id": query.patient_id,
+        "original_query": query.query,
+        "urgency_level": query.urgency,
+    })
+    return {
+        "status": "success",
+        "message": "Question submitted successfully",
+        "query_id": query_id
+    }
+
+@app.get("/patient_queries/{patient_id}", tags=["Lite Portal"])
+async def get_simple_patient_queries(patient_id: str):
+    """Get all queries for a specific patient"""
+    return [get_simple_question(row) for row in await storage.list_patient_queries(patient_id)]
+
+@app.get("/pending_questions/", tags=["Lite Portal"])
+async def get_pending_questions():
+    """Get all pending questions for doctors, most urgent then oldest first"""
+    return [get_simple_question(row) for row in await storage.list_pending_queries(QUERY_FIELDS)]
+
+@app.post("/send_response/", tags=["Lite Portal"])
+async def send_doctor_response(response: DoctorResponse):
+    """Doctor sends response to patient question"""
+    status = UNIFIED_STATUSES.get(response.status, response.status)
+    if not await storage.update_query(response.question_id, status, response.doctor_response):
+        raise HTTPException(status_code=404, detail="Question not found")
+    return {
+        "status": "success",
+        "message": "Response sent to patient"
+    }
+
+@app.get("/doctor_stats/", tags=["Lite Portal"])
+async def get_doctor_stats():
+    """Get simple doctor statistics"""
+    try:
+        today = date.today().isoformat()
+        return {
+            "today": await storage.count_queries(today),
+            "responses": await storage.count_queries(today, status="approved"),
+            "avg_time": "2.1 hrs"  # Static for demo
+        }
+    except Exception as e:
+        return {"today": 0, "responses": 0, "avg_time": "N/A"}
+
+@app.get("/health", tags=["Health Check"])
+async def health_check():
+    return {"status": "healthy", "version": app.version, "mode": BACKEND_MODE}
+
+@app.get("/metrics/", tags=["Health Check"])
+def get_metrics_endpoint():
+    metrics = {
+        "patient_cache": patient_cache.stats(),
+        "context_cache": context_cache.stats(),
+        "jobs": job_queue.get_job_counts(),
+        "query_coalescing": query_flights.stats(),
+        "write_batching": query_writes.stats(),
+        "storage_backend": storage.name,
+        "change_feed": change_feed.stats(),
+    }
+    if BACKEND_MODE != "lite":
+        metrics.update({
+            "llm_cache": response_cache.stats(),
+            "semantic_cache": semantic_cache.stats(),
+            "llm_scheduler": llm_scheduler.stats(),
+            "llm_client": llm_gateway.stats(),
+        })
+    return metrics
+
+# --- Admin ---
+rescore_status = {"state": "idle", "summary": None, "progress": None, "error": None}
+
+def run_rescore(chunk_size: int, workers: Optional[int], restart: bool):
+    rescore_status.update(state="running", summary=None, progress=None, error=None)
+    try:
+        summary = rescore.rescore_all(
+            chunk_size, workers, restart=restart,
+            progress=lambda message: rescore_status.update(progress=message)
+        )
+        rescore_status.update(state="finished", summary=summary)
+    except Exception as e:
+        print(f"Rescore failed: {e}")
+        rescore_status.update(state="failed", error=str(e))
+
+@app.post("/admin/rescore", status_code=202, tags=["Admin"])
+def start_rescore_endpoint(
+    background_tasks: BackgroundTasks,
+    chunk_size: int = Query(2000, ge=1, le=100000),
+    workers: Optional[int] = Query(None, ge=1),
+    restart: bool = Query(False, description="Ignore an interrupted run's checkpoint and rescore from the first row"),
+):
+    """Re-runs safety, confidence and urgency scoring over every saved query in the background"""
+    if rescore_status["state"] == "running":
+        raise HTTPException(status_code=409, detail="A rescore is already running")
+    rescore_status["state"] = "running"
+    background_tasks.add_task(run_rescore, chunk_size, workers, restart)
+    return {"status": "accepted"}
+
+@app.get("/admin/rescore", tags=["Admin"])
+def get_rescore_status_endpoint():
+    return rescore_status
@@ -0,0 +1,83 @@
+# backend_service/migrate_simple_queries.py
+# Copies the old main_simple.py data (simple_queries.db) into the unified queries table
+#
+# Usage (from backend_service/):
+#   python migrate_simple_queries.py --source simple_queries.db --chunk-size 1000
+#
+# Rows are read in rowid order, chunk_size at a time, so memory stays bounded
+# however large the source is. The copy goes through the configured storage
+# backend (STORAGE_BACKEND) and keeps the original IDs, so rerunning it after
+# an interruption skips the rows already copied.
+
+import os
+import time
+import sqlite3
+import asyncio
+import argparse
+
+from patient_db import UNIFIED_STATUSES
+from storage import storage
+
+SIMPLE_DB_PATH = os.environ.get('SIMPLE_DB_PATH', 'simple_queries.db')
+
+READ_CHUNK_SQL = """
+    SELECT rowid, id, patient_id, question, doctor_response, status, urgency, date
+    FROM simple_queries WHERE rowid > ? ORDER BY rowid LIMIT ?
+"""
+
+def to_unified(row) -> dict:
+    """A simple_queries row as a queries row (pending -> pending_review, answered -> approved)"""
+    _, query_id, patient_id, question, doctor_response, status, urgency, date = row
+    return {
+        "id": query_id,
+        "timestamp": date,
+        "patient_id": patient_id,
+        "original_query": question,
+        "doctor_final_response": doctor_response,
+        "status": UNIFIED_STATUSES.get(status or "pending", status),
+        "urgency_level": urgency or "low",
+    }
+
+def read_chunks(conn, chunk_size: int):
+    """Yields lists of rows in rowid order, chunk_size at a time"""
+    after_rowid = 0
+    while True:
+        rows = conn.execute(READ_CHUNK_SQL, (after_rowid, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_rowid = rows[-1][0]
+
+async def migrate(source: str, chunk_size: int = 1000, progress=print) -> dict:
+    """Copies every simple_queries row; returns counts of rows read and inserted"""
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"No simple_queries database at {source}")
+    conn = sqlite3.connect(source)
+    await storage.open()
+    started = time.perf_counter()
+    read = inserted = 0
+    try:
+        for rows in read_chunks(conn, chunk_size):
+            inserted += await storage.import_queries([to_unified(row) for row in rows])
+            read += len(rows)
+            progress(f"{read} rows read, {inserted} inserted")
+    finally:
+        await storage.close()
+        conn.close()
+    return {
+        "rows_read": read,
+        "rows_inserted": inserted,
+        # Already copied by an earlier run, or a duplicate of a pending query
+        "rows_skipped": read - inserted,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy simple_queries rows into the unified queries table")
+    parser.add_argument("--source", default=SIMPLE_DB_PATH, help="Path to simple_queries.db")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    summary = asyncio.run(migrate(args.source, args.chunk_size))
+    print(f"Done: {summary['rows_inserted']} of {summary['rows_read']} rows copied "
+          f"({summary['rows_skipped']} skipped) in {summary['seconds']}s")
@@ -0,0 +1,216 @@
+# backend_service/migrations.py
+# Versioned schema migrations for the queries database, tracked with PRAGMA user_version
+
+import json
+from datetime import datetime
+
+# Sort key for the doctor queue, materialized as the urgency_rank column
+URGENCY_RANK_SQL = "(CASE urgency_level WHEN 'high' THEN 0 WHEN 'medium' THEN 1 ELSE 2 END)"
+
+def seed_demo_patients(conn):
+    from demo_patients import DEMO_PATIENTS
+    now = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT OR IGNORE INTO patients (patient_id, name, diabetes_type, data, version, updated_at) "
+        "VALUES (?, ?, ?, ?, 1, ?)",
+        [
+            (patient_id, data['profile']['name'], data['profile']['Type of Diabetes'], json.dumps(data), now)
+            for patient_id, data in DEMO_PATIENTS.items()
+        ]
+    )
+
+class Batched:
+    """A backfill step that commits in batches instead of inside the migration's transaction.
+
+    fn(conn, after_rowid) processes one batch and returns the last rowid it
+    handled, or None when there is nothing left. The step must be safe to
+    rerun: if the process stops midway, the migration starts over.
+    """
+
+    def __init__(self, fn, description: str):
+        self.fn = fn
+        self.description = description
+
+    def run(self, conn):
+        after_rowid, batches = 0, 0
+        while True:
+            conn.execute("BEGIN")
+            try:
+                after_rowid = self.fn(conn, after_rowid)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            if after_rowid is None:
+                break
+            batches += 1
+            if batches % 10 == 0:
+                print(f"  {self.description}: {batches} batches done (rowid {after_rowid})")
+
+BACKFILL_BATCH_SIZE = 5000
+
+def backfill_query_hashes(conn, after_rowid):
+    from patient_db import compute_query_hash
+    rows = conn.execute(
+        "SELECT rowid, original_query FROM queries WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (after_rowid, BACKFILL_BATCH_SIZE)
+    ).fetchall()
+    if not rows:
+        return None
+    conn.executemany(
+        "UPDATE queries SET query_hash = ? WHERE rowid = ?",
+        [(compute_query_hash(query), rowid) for rowid, query in rows]
+    )
+    return rows[-1][0]
+
+def backfill_row_versions(conn, after_rowid):
+    # Existing rows are numbered by rowid; new writes continue above the highest.
+    # Rows that already have a version keep it, so a rerun never moves one back.
+    rows = conn.execute(
+        "SELECT rowid FROM queries WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (after_rowid, BACKFILL_BATCH_SIZE)
+    ).fetchall()
+    if not rows:
+        return None
+    conn.execute(
+        "UPDATE queries SET row_version = rowid WHERE rowid BETWEEN ? AND ? AND row_version = 0",
+        (rows[0][0], rows[-1][0])
+    )
+    return rows[-1][0]
+
+# Pending duplicates left by the old check-then-insert race would break the
+# unique index. The newest row keeps its hash (it is the one the old dedupe
+# returned); the others are left out of the index with a NULL hash.
+CLEAR_DUPLICATE_PENDING_HASHES_SQL = """
+    UPDATE queries SET query_hash = NULL
+    WHERE status = 'pending_review' AND rowid NOT IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY patient_id, query_hash ORDER BY timestamp DESC, rowid DESC
+            ) AS position
+            FROM queries WHERE status = 'pending_review'
+        ) WHERE position = 1
+    )
+"""
+
+# Each migration is (version, description, steps). A step is either a SQL
+# statement, a callable taking the connection, or a Batched backfill.
+MIGRATIONS = [
+    (1, "indexes for the queries hot paths", [
+        # /queries/by_patient/{id}: WHERE patient_id = ? ORDER BY timestamp DESC
+        "CREATE INDEX IF NOT EXISTS idx_queries_patient_timestamp "
+        "ON queries (patient_id, timestamp DESC)",
+        # /pending_queries/: only pending rows, pre-sorted by urgency then age
+        "CREATE INDEX IF NOT EXISTS idx_queries_pending_priority "
+        f"ON queries ({URGENCY_RANK_SQL}, timestamp) WHERE status = 'pending_review'",
+        # save_query_for_review duplicate check on pending rows
+        "CREATE INDEX IF NOT EXISTS idx_queries_pending_dedupe "
+        "ON queries (patient_id, original_query) WHERE status = 'pending_review'",
+    ]),
+    (2, "keyset-paginated pending queue", [
+        # A plain column (rather than an expression index) lets SQLite seek
+        # the index with a row-value comparison for keyset pagination
+        f"ALTER TABLE queries ADD COLUMN urgency_rank INTEGER GENERATED ALWAYS AS {URGENCY_RANK_SQL} VIRTUAL",
+        "DROP INDEX IF EXISTS idx_queries_pending_priority",
+        "CREATE INDEX IF NOT EXISTS idx_queries_pending_queue "
+        "ON queries (urgency_rank, timestamp, id) WHERE status = 'pending_review'",
+    ]),
+    (3, "checkpoints for batch rescoring", [
+        """CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+            job TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL,
+            rows_done INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )""",
+    ]),
+    (4, "patient records table", [
+        """CREATE TABLE IF NOT EXISTS patients (
+            patient_id TEXT PRIMARY KEY,
+            name TEXT,
+            diabetes_type TEXT,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            updated_at TEXT NOT NULL
+        )""",
+        seed_demo_patients,
+    ]),
+    (5, "durable job queue for query ingestion", [
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_after REAL NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )""",
+        # Workers claim the oldest due job; only queued rows are indexed
+        "CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (run_after) WHERE status = 'queued'",
+    ]),
+    (6, "query content hash column", [
+        "ALTER TABLE queries ADD COLUMN query_hash TEXT",
+    ]),
+    (7, "unique pending query hash", [
+        Batched(backfill_query_hashes, "backfilling query hashes"),
+        CLEAR_DUPLICATE_PENDING_HASHES_SQL,
+        # Enforces the save_query_for_review dedupe; replaces the full-text index
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_queries_pending_hash "
+        "ON queries (patient_id, query_hash) WHERE status = 'pending_review'",
+        "DROP INDEX IF EXISTS idx_queries_pending_dedupe",
+    ]),
+    (8, "row version column", [
+        "ALTER TABLE queries ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (9, "row versions for conditional and delta reads", [
+        Batched(backfill_row_versions, "backfilling row versions"),
+        # MAX(row_version) for ETags and for numbering each write
+        "CREATE INDEX IF NOT EXISTS idx_queries_row_version ON queries (row_version)",
+        # /queries/by_patient/{id}?since=: one patient's rows changed after a version
+        "CREATE INDEX IF NOT EXISTS idx_queries_patient_version "
+        "ON queries (patient_id, row_version)",
+    ]),
+    (10, "query hashes of the normalized text", [
+        # Hashes were of the exact text; rehashing can make two pending rows
+        # equal, so the unique index is rebuilt around the backfill
+        "DROP INDEX IF EXISTS idx_queries_pending_hash",
+        Batched(backfill_query_hashes, "rehashing queries"),
+        CLEAR_DUPLICATE_PENDING_HASHES_SQL,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_queries_pending_hash "
+        "ON queries (patient_id, query_hash) WHERE status = 'pending_review'",
+    ]),
+]
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn):
+    """Applies every migration newer than the database's user_version, each in its own
+    transaction (Batched steps excepted)"""
+    current = get_schema_version(conn)
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"Applying schema migration {version}: {description}")
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if isinstance(step, Batched):
+                    # Commits what came before, then runs its own transactions
+                    conn.commit()
+                    step.run(conn)
+                    conn.execute("BEGIN")
+                elif callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+    return current
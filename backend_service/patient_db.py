@@ -1,22 +1,22 @@
 # backend_service/patient_db.py
-import sqlite3
 import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
 from datetime import datetime
 
-DB_PATH = os.environ.get('DB_PATH', 'queries.db')
+from database import get_manager
+from migrations import apply_migrations
+from write_batcher import WriteBatcher, WRITE_BATCH_ENABLED, WRITE_BATCH_MAX_ROWS, WRITE_BATCH_MAX_DELAY_MS
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+DB_PATH = os.environ.get('DB_PATH', 'queries.db')
 
-def init_db():
-    """Initialize the database with tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def init_schema(conn):
+    """Creates the application tables on a fresh connection"""
     # Create queries table if it doesn't exist
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS queries (
         id TEXT PRIMARY KEY,
         timestamp TEXT NOT NULL,
@@ -30,247 +30,258 @@ def init_db():
         confidence_score INTEGER
     )
     """)
-    
     conn.commit()
-    conn.close()
+    apply_migrations(conn)
+
+# Columns a client may request via ?fields=; the large text columns
+# (original_query, ai_response, doctor_final_response) can be left out of list views
+QUERY_FIELDS = (
+    "id", "timestamp", "patient_id", "original_query", "ai_response",
+    "doctor_final_response", "status", "urgency_level", "safety_score", "confidence_score"
+)
+
+# Hot-path statements, shared by the endpoints and tests/test_query_plans.py
+# Doctor queue: most urgent first, then oldest. {columns} and {after} are
+# filled in by the endpoint (field projection and keyset cursor).
+PENDING_QUERIES_SQL = """
+    SELECT {columns} FROM queries
+    WHERE status = 'pending_review' {after}
+    ORDER BY urgency_rank, timestamp, id
+"""
+PENDING_AFTER_CURSOR_SQL = "AND (urgency_rank, timestamp, id) > (?, ?, ?)"
+PENDING_COUNTS_SQL = """
+    SELECT urgency_rank, COUNT(*) FROM queries
+    WHERE status = 'pending_review'
+    GROUP BY urgency_rank
+"""
+PATIENT_QUERIES_SQL = "SELECT * FROM queries WHERE patient_id = ? ORDER BY timestamp DESC"
+
+# Row versions: every insert or update of a queries row stamps it with the
+# next number of one table-wide sequence. Writes are serialized by SQLite, so
+# versions are committed in increasing order and "rows with row_version > v"
+# is exactly what changed since a reader saw version v (rows are never deleted).
+NEXT_ROW_VERSION_SQL = "(SELECT COALESCE(MAX(row_version), 0) + 1 FROM queries)"
+QUERIES_VERSION_SQL = "SELECT COALESCE(MAX(row_version), 0) FROM queries"
+PATIENT_QUERIES_VERSION_SQL = "SELECT COALESCE(MAX(row_version), 0) FROM queries WHERE patient_id = ?"
+PATIENT_QUERIES_SINCE_SQL = """
+    SELECT * FROM queries WHERE patient_id = ? AND row_version > ? ORDER BY row_version
+"""
+# Any status: a row that left the pending queue is reported so clients drop it
+CHANGED_QUERIES_SQL = "SELECT {columns} FROM queries WHERE row_version > ? ORDER BY row_version"
+UPDATE_QUERY_SQL = f"""
+    UPDATE queries SET status = ?, doctor_final_response = ?, row_version = {NEXT_ROW_VERSION_SQL}
+    WHERE id = ?
+"""
+
+# One statement per saved query: the unique index on pending (patient_id,
+# query_hash) turns a duplicate into a no-op, and RETURNING yields the new id
+# (requires SQLite 3.35+). PENDING_DUPLICATE_SQL finds the existing row then.
+INSERT_PENDING_SQL = f"""
+    INSERT INTO queries (
+        id, timestamp, patient_id, original_query, query_hash,
+        ai_response, status, urgency_level,
+        safety_score, confidence_score, row_version
+    ) VALUES (?, ?, ?, ?, ?, ?, 'pending_review', ?, ?, ?, {NEXT_ROW_VERSION_SQL})
+    ON CONFLICT (patient_id, query_hash) WHERE status = 'pending_review' DO NOTHING
+    RETURNING id
+"""
+PENDING_DUPLICATE_SQL = """
+    SELECT id FROM queries
+    WHERE patient_id = ? AND query_hash = ? AND status = 'pending_review'
+"""
+
+# Status names used by the lite portals, and their unified equivalents
+SIMPLE_STATUSES = {"pending_review": "pending", "approved": "answered"}
+UNIFIED_STATUSES = {simple: unified for unified, simple in SIMPLE_STATUSES.items()}
+
+# Bulk import of complete rows (see migrate_simple_queries.py); a row whose id
+# or pending (patient_id, query_hash) already exists is skipped
+IMPORT_QUERY_SQL = f"""
+    INSERT INTO queries (
+        id, timestamp, patient_id, original_query, query_hash, ai_response,
+        doctor_final_response, status, urgency_level, safety_score, confidence_score, row_version
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {NEXT_ROW_VERSION_SQL})
+    ON CONFLICT DO NOTHING
+"""
+
+UPSERT_PATIENT_SQL = """
+    INSERT INTO patients (patient_id, name, diabetes_type, data, version, updated_at)
+    VALUES (?, ?, ?, ?, 1, ?)
+    ON CONFLICT(patient_id) DO UPDATE SET
+        name = excluded.name,
+        diabetes_type = excluded.diabetes_type,
+        data = excluded.data,
+        version = patients.version + 1,
+        updated_at = excluded.updated_at
+"""
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, without trailing punctuation"""
+    return " ".join(query.lower().split()).strip(" ?!.")
+
+def compute_query_hash(query: str) -> str:
+    """Content hash of a normalized query, for the pending-duplicate index. Uses the
+    same normalization as the /process_query/ single-flight key and the LLM cache."""
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+def insert_pending_query(conn, record: dict):
+    """Inserts a pending_review row unless the patient already has this query pending.
+    Returns (id, created). Call inside the caller's write transaction."""
+    query_hash = compute_query_hash(record['original_query'])
+    rows = conn.execute(INSERT_PENDING_SQL, (
+        record['id'],
+        record.get('timestamp') or datetime.now().isoformat(),
+        record['patient_id'],
+        record['original_query'],
+        query_hash,
+        record.get('ai_response'),
+        record.get('urgency_level', 'low'),
+        record.get('safety_score'),
+        record.get('confidence_score')
+    )).fetchall()
+    if rows:
+        return rows[0][0], True
+    existing = conn.execute(PENDING_DUPLICATE_SQL, (record['patient_id'], query_hash)).fetchone()
+    return existing[0], False
+
+_connections = get_manager(DB_PATH, init_schema)
+
+def get_db_connection():
+    """Returns this thread's pooled connection. Do not close it; wrap writes in `with conn:`."""
+    return _connections.get_connection()
+
+def init_db():
+    """Initialize the database with tables (runs once per process)"""
+    _connections.initialize()
+
+# Query inserts and doctor updates go through one writer thread and are
+# committed in groups; run() returns only after the group is committed.
+query_writes = WriteBatcher(
+    get_db_connection, WRITE_BATCH_MAX_ROWS, WRITE_BATCH_MAX_DELAY_MS, WRITE_BATCH_ENABLED
+)
 
 # Initialize database on import
 if __name__ == "__main__":
     init_db()
 
+# --- Patient Records ---
+# Records live in the patients table (one JSON document per patient, looked
+# up by primary key). Recently used records are kept in a bounded in-process
+# LRU cache; writes go through update_patient_data, which invalidates it.
+PATIENT_CACHE_SIZE = int(os.environ.get('PATIENT_CACHE_SIZE', 1024))
+
+class PatientCache:
+    """Thread-safe LRU cache of parsed patient records"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, patient_id):
+        with self._lock:
+            record = self._entries.get(patient_id)
+            if record is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(patient_id)
+            self.hits += 1
+            return record
+
+    def put(self, patient_id, record):
+        with self._lock:
+            self._entries[patient_id] = record
+            self._entries.move_to_end(patient_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, patient_id):
+        with self._lock:
+            self._entries.pop(patient_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+patient_cache = PatientCache(PATIENT_CACHE_SIZE)
+
+def freeze(value):
+    """Read-only view of parsed JSON: dicts become mappingproxies and lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Plain, mutable copy of a frozen record"""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+def get_patient_record(patient_id):
+    """Returns {"data": ..., "version": ...} for a patient, or None. The data is frozen and shared."""
+    record = patient_cache.get(patient_id)
+    if record is not None:
+        return record
+    
+    row = get_db_connection().execute(
+        "SELECT data, version FROM patients WHERE patient_id = ?", (patient_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    record = {"data": freeze(json.loads(row["data"])), "version": row["version"]}
+    patient_cache.put(patient_id, record)
+    return record
+
+# Batched lookups stay under SQLite's default limit on bound parameters
+PATIENT_BATCH_SIZE = 500
+
+def get_patient_records(patient_ids):
+    """{patient_id: record} for the known patients among patient_ids; cache misses are
+    read with one query per PATIENT_BATCH_SIZE IDs"""
+    records, missing = {}, []
+    for patient_id in dict.fromkeys(patient_ids):
+        record = patient_cache.get(patient_id)
+        if record is None:
+            missing.append(patient_id)
+        else:
+            records[patient_id] = record
+    conn = get_db_connection()
+    for start in range(0, len(missing), PATIENT_BATCH_SIZE):
+        batch = missing[start:start + PATIENT_BATCH_SIZE]
+        rows = conn.execute(
+            f"SELECT patient_id, data, version FROM patients WHERE patient_id IN ({', '.join('?' * len(batch))})",
+            batch
+        ).fetchall()
+        for row in rows:
+            record = {"data": freeze(json.loads(row["data"])), "version": row["version"]}
+            patient_cache.put(row["patient_id"], record)
+            records[row["patient_id"]] = record
+    return records
+
 def get_patient_data(patient_id):
     """
-    Returns comprehensive patient data for demo purposes.
-    In production, this would fetch from a real patient database.
+    Returns comprehensive patient data, or None for an unknown patient.
+    The record is frozen (see freeze) and shared between requests; use thaw for an editable copy.
     """
-    patients = {
-        "P001": {
-            "profile": {
-                "patient_id": "P001",
-                "name": "Sarah Johnson",
-                "age": 47,
-                "gender": "Female",
-                "ethnicity": "African American",
-                "Type of Diabetes": "Type 2",
-                "diagnosis_date": "2022-03-15",
-                "years_since_diagnosis": 2.5
-            },
-            "current_status": {
-                "hba1c": "6.9%",
-                "last_fasting_glucose": "130 mg/dL",
-                "blood_pressure": "125/75 mmHg",
-                "weight": "76 kg",
-                "bmi": 27.9,
-                "kidney_function": "eGFR 90 mL/min/1.73m²"
-            },
-            "medications": [
-                {"name": "Metformin", "dose": "1000mg BID", "duration": "2.5 years"},
-                {"name": "Lisinopril", "dose": "15mg daily", "duration": "2.5 years"},
-                {"name": "Empagliflozin", "dose": "10mg daily", "duration": "2 years"}
-            ],
-            "complications": {
-                "retinopathy": "None",
-                "neuropathy": "None",
-                "nephropathy": "Normal kidney function"
-            },
-            "lifestyle": {
-                "exercise": "45 minutes daily walking",
-                "diet": "Low-carb, following meal plan",
-                "smoking": "Non-smoker",
-                "alcohol": "Occasional social drinking"
-            },
-            "family_history": ["Mother - Type 2", "Maternal grandmother - Type 2"],
-            "last_visit": "2024-03-15",
-            "next_appointment": "2024-09-15",
-            "care_team": {
-                "primary": "Dr. Emily Chen",
-                "endocrinologist": "Dr. Michael Roberts",
-                "dietitian": "Jane Smith, RD"
-            }
-        },
-        
-        "P002": {
-            "profile": {
-                "patient_id": "P002",
-                "name": "Michael Thompson",
-                "age": 19,
-                "gender": "Male",
-                "ethnicity": "Caucasian",
-                "Type of Diabetes": "Type 1",
-                "diagnosis_date": "2021-09-08",
-                "years_since_diagnosis": 3
-            },
-            "current_status": {
-                "hba1c": "7.8%",
-                "last_fasting_glucose": "155 mg/dL",
-                "blood_pressure": "122/78 mmHg",
-                "weight": "78 kg",
-                "bmi": 25.5,
-                "kidney_function": "eGFR >90 mL/min/1.73m²"
-            },
-            "medications": [
-                {"name": "Insulin Pump (Aspart)", "dose": "Basal 1.2 units/hour", "duration": "6 months"},
-                {"name": "Previous: Insulin Glargine", "dose": "22 units at bedtime", "duration": "2.5 years (discontinued)"}
-            ],
-            "complications": {
-                "retinopathy": "None",
-                "neuropathy": "None",
-                "nephropathy": "Normal kidney function"
-            },
-            "lifestyle": {
-                "exercise": "College soccer team, daily training",
-                "diet": "Carb counting, flexible with pump",
-                "smoking": "Non-smoker",
-                "alcohol": "Occasional (college student)"
-            },
-            "family_history": ["No family history of diabetes"],
-            "last_visit": "2024-09-20",
-            "next_appointment": "2024-12-20",
-            "special_notes": "Recently started college, adjusting to new schedule"
-        },
-        
-        "P003": {
-            "profile": {
-                "patient_id": "P003",
-                "name": "Carlos Rodriguez",
-                "age": 64,
-                "gender": "Male",
-                "ethnicity": "Hispanic",
-                "Type of Diabetes": "Type 2",
-                "diagnosis_date": "2022-04-12",
-                "years_since_diagnosis": 2.5
-            },
-            "current_status": {
-                "hba1c": "6.8%",
-                "last_fasting_glucose": "132 mg/dL",
-                "blood_pressure": "125/78 mmHg",
-                "weight": "80 kg",
-                "bmi": 27.0,
-                "kidney_function": "eGFR 64 mL/min/1.73m²"
-            },
-            "medications": [
-                {"name": "Metformin", "dose": "1000mg BID", "duration": "2.5 years"},
-                {"name": "Lisinopril", "dose": "20mg daily", "duration": "2.5 years"},
-                {"name": "Empagliflozin", "dose": "10mg daily", "duration": "2.5 years"},
-                {"name": "Semaglutide", "dose": "1mg weekly", "duration": "1.5 years"}
-            ],
-            "complications": {
-                "retinopathy": "Mild NPDR - stable",
-                "neuropathy": "None",
-                "nephropathy": "Stage 2 CKD"
-            },
-            "comorbidities": ["CAD (prior MI 2020)", "Hypertension", "Dyslipidemia"],
-            "lifestyle": {
-                "exercise": "Daily walking 30 minutes",
-                "diet": "Modified traditional Mexican diet",
-                "smoking": "Former smoker (quit 2014)",
-                "alcohol": "None"
-            },
-            "family_history": ["Father - Type 2", "Brother - Type 2"],
-            "last_visit": "2024-04-15",
-            "next_appointment": "2025-04-15"
-        },
-        
-        "P004": {
-            "profile": {
-                "patient_id": "P004",
-                "name": "Priya Patel",
-                "age": 30,
-                "gender": "Female",
-                "ethnicity": "South Asian",
-                "Type of Diabetes": "Type 2 (post-GDM)",
-                "diagnosis_date": "2023-08-28",
-                "years_since_diagnosis": 1
-            },
-            "current_status": {
-                "hba1c": "6.2%",
-                "last_fasting_glucose": "110 mg/dL",
-                "blood_pressure": "128/78 mmHg",
-                "weight": "72 kg",
-                "bmi": 28.1,
-                "kidney_function": "eGFR >90 mL/min/1.73m²",
-                "pregnancy_status": "First trimester - second pregnancy"
-            },
-            "medications": [
-                {"name": "Prenatal vitamins", "dose": "Daily", "duration": "Current"},
-                {"name": "Metformin", "dose": "Discontinued for pregnancy", "duration": "Was 1000mg BID"}
-            ],
-            "complications": {
-                "retinopathy": "None",
-                "neuropathy": "None",
-                "nephropathy": "Normal kidney function"
-            },
-            "comorbidities": ["PCOS", "History of GDM"],
-            "lifestyle": {
-                "exercise": "Prenatal yoga 3x/week",
-                "diet": "Gestational diabetes meal plan",
-                "smoking": "Non-smoker",
-                "alcohol": "None (pregnancy)"
-            },
-            "family_history": ["Mother - Type 2", "Paternal grandfather - Type 2"],
-            "obstetric_history": {
-                "previous_pregnancies": 1,
-                "gdm_in_previous": "Yes",
-                "current_pregnancy_week": 8
-            },
-            "last_visit": "2024-08-15",
-            "next_appointment": "2024-09-15"
-        },
-        
-        "P005": {
-            "profile": {
-                "patient_id": "P005",
-                "name": "Eleanor Williams",
-                "age": 72,
-                "gender": "Female",
-                "ethnicity": "Caucasian",
-                "Type of Diabetes": "Type 2",
-                "diagnosis_date": "2023-01-10",
-                "years_since_diagnosis": 1.5
-            },
-            "current_status": {
-                "hba1c": "8.0%",
-                "last_fasting_glucose": "170 mg/dL",
-                "blood_pressure": "135/78 mmHg",
-                "weight": "67 kg",
-                "bmi": 25.5,
-                "kidney_function": "eGFR 35 mL/min/1.73m² (CKD Stage 3b)"
-            },
-            "medications": [
-                {"name": "Insulin Glargine", "dose": "18 units at bedtime", "duration": "1.5 years"},
-                {"name": "Linagliptin", "dose": "5mg daily", "duration": "6 months"}
-            ],
-            "complications": {
-                "retinopathy": "Mild NPDR",
-                "neuropathy": "Peripheral neuropathy present",
-                "nephropathy": "CKD Stage 3b"
-            },
-            "comorbidities": [
-                "Hypertension",
-                "Osteoarthritis",
-                "Mild cognitive impairment",
-                "CKD Stage 3b"
-            ],
-            "lifestyle": {
-                "exercise": "Limited mobility, chair exercises",
-                "diet": "Simplified meal plan with family help",
-                "smoking": "Non-smoker",
-                "alcohol": "None",
-                "living_situation": "Lives alone, considering assisted living"
-            },
-            "family_history": ["Sister - Type 2"],
-            "care_considerations": [
-                "Cognitive impairment affecting compliance",
-                "Family heavily involved in care",
-                "Focus on avoiding hypoglycemia",
-                "Simplified management approach"
-            ],
-            "last_visit": "2024-07-22",
-            "next_appointment": "2024-10-22"
-        }
-    }
-    
-    return patients.get(patient_id)
+    record = get_patient_record(patient_id)
+    return record["data"] if record else None
+
+def update_patient_data(patient_id, data):
+    """Creates or replaces a patient record, bumping its version and invalidating the cache"""
+    profile = data.get('profile', {})
+    conn = get_db_connection()
+    with conn:
+        conn.execute(UPSERT_PATIENT_SQL, (
+            patient_id, profile.get('name'), profile.get('Type of Diabetes'),
+            json.dumps(thaw(data)), datetime.now().isoformat()
+        ))
+    patient_cache.invalidate(patient_id)
 
 def get_patient_summary(patient_id):
     """
@@ -279,7 +290,10 @@ def get_patient_summary(patient_id):
     data = get_patient_data(patient_id)
     if not data:
         return None
-    
+    return summarize_patient(data)
+
+def summarize_patient(data):
+    """The get_patient_summary fields of a patient record's data"""
     profile = data['profile']
     status = data['current_status']
     
@@ -293,48 +307,107 @@ def get_patient_summary(patient_id):
                            for v in data.get('complications', {}).values())
     }
 
-def get_all_patients():
+def get_all_patients(limit=None, offset=0):
     """
-    Returns a list of all available patient IDs and names for demo purposes
+    Returns patient IDs, names and diabetes types, ordered by patient ID
     """
+    sql = "SELECT patient_id, name, diabetes_type FROM patients ORDER BY patient_id"
+    params = ()
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params = (limit, offset)
     return [
-        {"id": "P001", "name": "Sarah Johnson", "type": "Type 2"},
-        {"id": "P002", "name": "Michael Thompson", "type": "Type 1"},
-        {"id": "P003", "name": "Carlos Rodriguez", "type": "Type 2"},
-        {"id": "P004", "name": "Priya Patel", "type": "Type 2 (post-GDM)"},
-        {"id": "P005", "name": "Eleanor Williams", "type": "Type 2"}
+        {"id": row["patient_id"], "name": row["name"], "type": row["diabetes_type"]}
+        for row in get_db_connection().execute(sql, params)
     ]
 
+# --- AI Context ---
+# The rendered context only changes when the record does, so it is memoized
+# per (patient_id, version) and rebuilt after update_patient_data bumps the
+# version. It is kept as ordered sections so a prompt can be trimmed to a
+# token budget by dropping the least important ones.
+CONTEXT_CACHE_SIZE = int(os.environ.get('CONTEXT_CACHE_SIZE', 1024))
+
+# Sections dropped first when a context is over budget
+CONTEXT_TRIM_ORDER = ("complications", "medications")
+
+context_cache = PatientCache(CONTEXT_CACHE_SIZE)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for prompt budgeting (about four characters per token)"""
+    return (len(text) + 3) // 4
+
 # Demo-specific functions for hackathon
-def get_patient_context_for_ai(patient_id):
+def render_patient_context(patient_id, data):
     """
-    Formats patient data specifically for AI context
+    Formats patient data for AI context as ordered (section, text) pairs
     """
-    data = get_patient_data(patient_id)
-    if not data:
-        return "No patient data available."
-    
     profile = data['profile']
     status = data['current_status']
     meds = data.get('medications', [])
     
-    context = f"""
+    sections = [
+        ("profile", f"""
     Patient: {profile.get('name')} ({profile.get('age')} year old {profile.get('gender')})
     Diabetes Type: {profile.get('Type of Diabetes')}
     Years since diagnosis: {profile.get('years_since_diagnosis')}
     Current HbA1c: {status.get('hba1c')}
     Last Glucose: {status.get('last_fasting_glucose')}
     
-    Current Medications:
+    """),
+        ("medications", f"""Current Medications:
     {chr(10).join([f"- {m['name']}: {m['dose']}" for m in meds])}
     
-    Key Complications: {', '.join([k + ': ' + v for k, v in data.get('complications', {}).items() if v != 'None'])}
-    """
+    """),
+        ("complications", f"""Key Complications: {', '.join([k + ': ' + v for k, v in data.get('complications', {}).items() if v != 'None'])}
+    """),
+    ]
     
     # Add special considerations
     if patient_id == "P004":
-        context += "\nIMPORTANT: Patient is currently pregnant (first trimester)"
+        sections.append(("considerations", "\nIMPORTANT: Patient is currently pregnant (first trimester)"))
     elif patient_id == "P005":
-        context += "\nIMPORTANT: Patient has cognitive impairment and CKD Stage 3b"
+        sections.append(("considerations", "\nIMPORTANT: Patient has cognitive impairment and CKD Stage 3b"))
+    
+    return tuple(sections)
+
+def get_context_sections(patient_id, patient_data=None, version=None):
+    """
+    Returns the rendered context sections, memoized per (patient_id, version).
+    Pass the already-fetched record and its version to skip the lookup.
+    """
+    if patient_data is None:
+        record = get_patient_record(patient_id)
+        if not record:
+            return None
+        patient_data, version = record["data"], record["version"]
+    if version is None:
+        return render_patient_context(patient_id, patient_data)
     
-    return context
\ No newline at end of file
+    key = (patient_id, version)
+    sections = context_cache.get(key)
+    if sections is None:
+        sections = render_patient_context(patient_id, patient_data)
+        context_cache.put(key, sections)
+    return sections
+
+def fit_context(sections, max_tokens=None) -> str:
+    """Joins context sections, dropping those in CONTEXT_TRIM_ORDER until it fits max_tokens"""
+    text = "".join(body for _, body in sections)
+    if max_tokens is None:
+        return text
+    for name in CONTEXT_TRIM_ORDER:
+        if estimate_tokens(text) <= max_tokens:
+            break
+        sections = [(n, body) for n, body in sections if n != name]
+        text = "".join(body for _, body in sections)
+    return text
+
+def get_patient_context_for_ai(patient_id, patient_data=None, version=None, max_tokens=None):
+    """
+    Formats patient data specifically for AI context
+    """
+    sections = get_context_sections(patient_id, patient_data, version)
+    if sections is None:
+        return "No patient data available."
+    return fit_context(sections, max_tokens)
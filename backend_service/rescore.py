@@ -0,0 +1,159 @@
+# backend_service/rescore.py
+# Batch re-evaluation of historic queries after scoring thresholds change
+#
+# Usage (from backend_service/):
+#   python rescore.py --chunk-size 2000 --workers 4
+#   python rescore.py --restart          # ignore an interrupted run's checkpoint
+#
+# Limitation: the job reads and writes the local SQLite queries table only, so it
+# refuses to run with STORAGE_BACKEND=postgres. Dashboards hear about changed
+# urgency levels through the change feed only when the job runs inside the API
+# process (POST /admin/rescore); a CLI run is picked up on their next refetch.
+
+import os
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from patient_db import get_db_connection, get_patient_records, thaw, NEXT_ROW_VERSION_SQL
+from scoring import score_response
+from change_feed import change_feed
+
+DEFAULT_JOB = "rescore"
+# Same setting as storage.py; only "sqlite" is supported (see above)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite').lower()
+
+# rowid keyset scan: each chunk is a primary-key range read, never an OFFSET
+READ_CHUNK_SQL = """
+    SELECT rowid, patient_id, original_query, ai_response, status, urgency_level FROM queries
+    WHERE rowid > ? ORDER BY rowid LIMIT ?
+"""
+WRITE_SCORES_SQL = f"""
+    UPDATE queries SET safety_score = ?, confidence_score = ?, urgency_level = ?,
+        row_version = {NEXT_ROW_VERSION_SQL}
+    WHERE rowid = ?
+"""
+SAVE_CHECKPOINT_SQL = """
+    INSERT INTO rescore_checkpoints (job, last_rowid, rows_done, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(job) DO UPDATE SET
+        last_rowid = excluded.last_rowid,
+        rows_done = excluded.rows_done,
+        updated_at = excluded.updated_at
+"""
+CLEAR_CHECKPOINT_SQL = "DELETE FROM rescore_checkpoints WHERE job = ?"
+
+def score_chunk(rows, patients):
+    """Scores one chunk of READ_CHUNK_SQL rows; runs in a worker process.
+
+    patients ({patient_id: data}) is looked up by the parent, so workers
+    never open the database. Returns (updates, requeued) where requeued
+    counts pending rows whose urgency level changed.
+    """
+    updates = []
+    requeued = 0
+    for rowid, patient_id, query, ai_response, status, urgency_level in rows:
+        if not ai_response:
+            continue  # never evaluated by the graph either
+        scores = score_response(query, ai_response, patients.get(patient_id))
+        updates.append((
+            scores["safety_score"], scores["confidence_score"], scores["urgency_level"], rowid
+        ))
+        if status == "pending_review" and scores["urgency_level"] != urgency_level:
+            requeued += 1
+    return updates, requeued
+
+def load_chunk_patients(rows) -> dict:
+    """Plain (picklable) patient data for the patients in a chunk"""
+    records = get_patient_records(row[1] for row in rows)
+    return {patient_id: thaw(record["data"]) for patient_id, record in records.items()}
+
+def load_checkpoint(conn, job: str):
+    row = conn.execute(
+        "SELECT last_rowid, rows_done FROM rescore_checkpoints WHERE job = ?", (job,)
+    ).fetchone()
+    return (row[0], row[1]) if row else (0, 0)
+
+def read_chunks(conn, after_rowid: int, chunk_size: int):
+    """Yields lists of rows in rowid order, chunk_size at a time"""
+    while True:
+        rows = [tuple(r) for r in conn.execute(READ_CHUNK_SQL, (after_rowid, chunk_size)).fetchall()]
+        if not rows:
+            return
+        yield rows
+        after_rowid = rows[-1][0]
+
+def rescore_all(chunk_size: int = 2000, workers: int = None, job: str = DEFAULT_JOB,
+                restart: bool = False, progress=print) -> dict:
+    """Rescores every row in `queries`, resuming from the job's checkpoint if an earlier
+    run was interrupted (restart=True ignores it).
+
+    Chunks are scored in a process pool (at most two per worker in flight) and
+    written back in rowid order with executemany, each chunk in one transaction
+    together with its checkpoint, so an interrupted run resumes exactly after
+    the last committed chunk. A chunk that moved pending queries to another
+    urgency level publishes a "reload" event so dashboards refetch the queue.
+    A run that reaches the end deletes its checkpoint, so the next one (e.g.
+    after thresholds change again) rescores every row.
+    """
+    if STORAGE_BACKEND != "sqlite":
+        raise RuntimeError(f"Rescoring only supports the SQLite queries table (STORAGE_BACKEND={STORAGE_BACKEND})")
+    workers = workers or os.cpu_count() or 1
+    conn = get_db_connection()
+    last_rowid, rows_done = (0, 0) if restart else load_checkpoint(conn, job)
+    if last_rowid:
+        progress(f"Resuming '{job}' after rowid {last_rowid} ({rows_done} rows already done)")
+
+    started = time.perf_counter()
+    rows_this_run = 0
+    # Spawned rather than forked: the API process is threaded and holds open
+    # SQLite connections, neither of which survives a fork safely
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+
+        def commit_oldest():
+            nonlocal rows_done, rows_this_run
+            chunk_last_rowid, chunk_len, future = in_flight.popleft()
+            updates, requeued = future.result()
+            with conn:
+                conn.executemany(WRITE_SCORES_SQL, updates)
+                rows_done += chunk_len
+                conn.execute(SAVE_CHECKPOINT_SQL, (job, chunk_last_rowid, rows_done, datetime.now().isoformat()))
+            if requeued:
+                change_feed.publish("reload", {"reason": "rescore", "requeued": requeued})
+            rows_this_run += chunk_len
+            elapsed = time.perf_counter() - started
+            progress(f"{rows_done} rows rescored ({rows_this_run / elapsed:.0f} rows/sec)")
+
+        for rows in read_chunks(conn, last_rowid, chunk_size):
+            future = pool.submit(score_chunk, rows, load_chunk_patients(rows))
+            in_flight.append((rows[-1][0], len(rows), future))
+            if len(in_flight) >= workers * 2:
+                commit_oldest()
+        while in_flight:
+            commit_oldest()
+
+    with conn:
+        conn.execute(CLEAR_CHECKPOINT_SQL, (job,))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "job": job,
+        "rows_rescored": rows_this_run,
+        "rows_total": rows_done,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows_this_run / elapsed, 1) if elapsed else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore safety, confidence and urgency for every saved query")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--job", default=DEFAULT_JOB, help="Checkpoint name")
+    parser.add_argument("--restart", action="store_true", help="Start from the first row instead of an interrupted run's checkpoint")
+    args = parser.parse_args()
+
+    summary = rescore_all(args.chunk_size, args.workers, args.job, args.restart)
+    print(f"Done: {summary['rows_rescored']} rows in {summary['seconds']}s ({summary['rows_per_sec']} rows/sec)")
@@ -0,0 +1,113 @@
+# backend_service/response_cache.py
+# Persistent cache of LLM completions keyed by model settings, normalized query and patient context
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from database import get_manager
+from patient_db import normalize_query
+
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'llm_cache.db')
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 10000))
+
+def init_cache_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+
+_connections = get_manager(LLM_CACHE_PATH, init_cache_schema)
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
+
+def completion_cache_key(model: str, temperature: float, query: str, patient_context: str) -> str:
+    """Cache key for a completion: same model settings, same question, same patient context"""
+    material = json.dumps([model, temperature, normalize_query(query), fingerprint(patient_context)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed completion cache with a TTL and an LRU bound on the number of entries"""
+
+    def __init__(self, connections, ttl_seconds: int, max_entries: int, enabled: bool = True):
+        self._connections = connections
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def get(self, key: str):
+        """Returns the cached completion, or None on a miss or an expired entry"""
+        conn = self._connections.get_connection()
+        now = time.time()
+        row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        with conn:
+            if now - row["created_at"] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._count("expired")
+                self._count("misses")
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+        self._count("hits")
+        return row["response"]
+
+    def put(self, key: str, response: str):
+        """Stores a completion, evicting the least recently used entries beyond max_entries"""
+        conn = self._connections.get_connection()
+        now = time.time()
+        with conn:
+            conn.execute("""
+                INSERT INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    response = excluded.response,
+                    created_at = excluded.created_at,
+                    last_access = excluded.last_access
+            """, (key, response, now, now))
+            overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute("""
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_access LIMIT ?
+                    )
+                """, (overflow,))
+                self._count("evictions", overflow)
+        self._count("stores")
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["entries"] = self._connections.get_connection().execute(
+            "SELECT COUNT(*) FROM llm_cache"
+        ).fetchone()[0]
+        return stats
+
+response_cache = ResponseCache(
+    _connections, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_ENABLED
+)
@@ -1,63 +1,52 @@
+from keyword_matcher import scan
 
-def get_safety_score(response):
+# Keyword lists live in keyword_matcher.KEYWORD_SETS under "evaluation.*".
+# Each function accepts the hits of an earlier scan() to avoid rescanning.
+
+def get_safety_score(response, response_hits=None):
     """Simple safety scoring based on keywords"""
-    danger_words = [
-        'diagnose', 'diagnosis', 'you have', 'take this medication',
-        'prescribed', 'dosage', 'treatment plan'
-    ]
-    
-    emergency_words = [
-        'emergency', 'call 911', 'hospital', 'immediately'
-    ]
-    
-    safe_words = [
-        'consult', 'healthcare provider', 'doctor', 'medical professional'
-    ]
-    
+    if response_hits is None:
+        response_hits = scan(response)
+
     score = 100
-    
+
     # Reduce score for dangerous language
-    for word in danger_words:
-        if word in response.lower():
-            score -= 30
-    
+    score -= 30 * len(response_hits.get("evaluation.danger", ()))
+
     # Increase score for emergency escalation
-    for word in emergency_words:
-        if word in response.lower():
-            score += 20
-    
+    score += 20 * len(response_hits.get("evaluation.emergency", ()))
+
     # Increase score for safe language
-    for word in safe_words:
-        if word in response.lower():
-            score += 10
-    
+    score += 10 * len(response_hits.get("evaluation.safe", ()))
+
     return max(0, min(100, score))
 
-def get_confidence_score(query, response):
+def get_confidence_score(query, response, query_hits=None, response_hits=None):
     """Simple confidence scoring"""
+    if query_hits is None:
+        query_hits = scan(query)
+    if response_hits is None:
+        response_hits = scan(response)
+
     base_score = 70
-    
+
     # Longer responses might be more complete
     if len(response) > 100:
         base_score += 10
-    
+
     # Questions about serious symptoms should have lower confidence
-    serious_symptoms = ['chest pain', 'difficulty breathing', 'severe']
-    if any(symptom in query.lower() for symptom in serious_symptoms):
+    if "evaluation.serious" in query_hits:
         base_score -= 20
-    
+
     # Empathetic language increases confidence
-    empathy_words = ['understand', 'sorry', 'help', 'care']
-    empathy_count = sum(1 for word in empathy_words if word in response.lower())
+    empathy_count = len(response_hits.get("evaluation.empathy", ()))
     base_score += empathy_count * 5
-    
+
     return max(0, min(100, base_score))
 
-def needs_urgent_review(query, response):
+def needs_urgent_review(query, response, query_hits=None):
     """Flag queries that need immediate doctor attention"""
-    urgent_keywords = [
-        'chest pain', 'can\'t breathe', 'severe pain', 'emergency',
-        'suicide', 'overdose', 'accident', 'bleeding'
-    ]
-    
-    return any(keyword in query.lower() for keyword in urgent_keywords)
+    if query_hits is None:
+        query_hits = scan(query)
+
+    return "evaluation.urgent" in query_hits
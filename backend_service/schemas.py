@@ -1,23 +1,28 @@
 # backend_service/schemas.py
-from typing import List, Dict, Optional, Any
-from pydantic import BaseModel
+from typing import Mapping, Optional, Any
+from pydantic import BaseModel, SkipValidation
 
 class PatientQueryInput(BaseModel):
     patient_id: str
     query: str
     uploaded_file_name: Optional[str] = None
+    bypass_cache: bool = False  # skip the LLM completion cache for this query
 
 class AgentState(BaseModel):
     patient_id: str
     original_query: str
     uploaded_file_name: Optional[str] = None
-    patient_data: Optional[Dict[str, Any]] = None
+    bypass_cache: bool = False
+    # Frozen record shared with the patient cache; passed through without validation or copying
+    patient_data: Optional[SkipValidation[Mapping[str, Any]]] = None
+    patient_version: Optional[int] = None  # version of patient_data, keys the context cache
     ai_response: Optional[str] = None
     safety_score: Optional[int] = None
     confidence_score: Optional[int] = None
     urgency_level: Optional[str] = None  # Added field: high, medium, low
     needs_urgent_review: Optional[bool] = None
     final_response_to_patient: Optional[str] = None
+    query_id: Optional[str] = None  # id of the saved pending_review row
     error_message: Optional[str] = None
     next_node: Optional[str] = None
 
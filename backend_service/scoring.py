@@ -0,0 +1,73 @@
+# backend_service/scoring.py
+# Keyword-based safety, confidence and urgency scoring for AI drafts.
+# Free of LangGraph/LLM imports so batch jobs and worker processes can use it.
+
+from keyword_matcher import scan
+
+# Keyword lists live in keyword_matcher.KEYWORD_SETS. Each scorer accepts the
+# hits of an earlier keyword_matcher.scan() so a text is scanned only once.
+def get_safety_score(ai_response: str, response_hits: dict = None) -> int:
+    """Calculate safety score based on response content"""
+    if response_hits is None:
+        response_hits = scan(ai_response)
+    score = 100
+    
+    # Dangerous phrases that should never appear
+    score -= 30 * len(response_hits.get("safety.danger", ()))
+    
+    # Good safety phrases
+    score += 10 * len(response_hits.get("safety.reassurance", ()))
+    
+    return max(0, min(100, score))
+
+def get_confidence_score(query: str, ai_response: str, patient_data: dict, query_hits: dict = None) -> int:
+    """Calculate confidence based on query complexity and patient context"""
+    if query_hits is None:
+        query_hits = scan(query)
+    score = 85  # Base score
+    
+    # Complex medical situations reduce confidence
+    if patient_data:
+        profile = patient_data.get('profile', {})
+        if profile.get('patient_id') == 'P004':  # Pregnant patient
+            score -= 15
+        elif profile.get('patient_id') == 'P005':  # Elderly with complications
+            score -= 10
+    
+    # Urgent symptoms reduce confidence
+    if "confidence.urgent" in query_hits:
+        score -= 20
+    
+    # Well-structured response increases confidence
+    if len(ai_response) > 100 and len(ai_response) < 500:
+        score += 5
+    
+    return max(0, min(100, score))
+
+def determine_urgency_level(query: str, ai_response: str, query_hits: dict = None) -> str:
+    """Determine urgency level: high, medium, low"""
+    if query_hits is None:
+        query_hits = scan(query)
+    
+    if "urgency.high" in query_hits:
+        return "high"
+    elif "urgency.medium" in query_hits:
+        return "medium"
+    else:
+        return "low"
+
+def needs_urgent_review(query: str, ai_response: str, urgency_level: str) -> bool:
+    """Determine if query needs immediate doctor attention"""
+    return urgency_level in ["high", "medium"]
+
+def score_response(query: str, ai_response: str, patient_data: dict) -> dict:
+    """Runs every scorer for one query/response pair, scanning each text once"""
+    response_hits = scan(ai_response)
+    query_hits = scan(query)
+    urgency_level = determine_urgency_level(query, ai_response, query_hits)
+    return {
+        "safety_score": get_safety_score(ai_response, response_hits),
+        "confidence_score": get_confidence_score(query, ai_response, patient_data, query_hits),
+        "urgency_level": urgency_level,
+        "needs_urgent_review": needs_urgent_review(query, ai_response, urgency_level),
+    }
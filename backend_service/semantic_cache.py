@@ -0,0 +1,171 @@
+# backend_service/semantic_cache.py
+# Optional near-duplicate cache: serves a stored draft for paraphrased queries against the same patient context
+
+import os
+import zlib
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    np = None
+    SEMANTIC_CACHE_AVAILABLE = False
+
+from keyword_matcher import tokenize
+
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', '0').lower() in ('1', 'true', 'yes')
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.85))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', 100000))
+
+# 128 float32 dimensions keep 100k entries at ~50 MB, small enough
+# that a full similarity scan stays in the low milliseconds on one core
+VECTOR_DIM = 128
+
+# Patients describe the same thing in different words; map common variants
+# onto one token before hashing so they land on the same features
+SYNONYMS = {
+    "glucose": "sugar", "bg": "sugar", "bgl": "sugar", "sugars": "sugar",
+    "post": "after", "following": "after",
+    "pre": "before", "prior": "before",
+    "meds": "medication", "medications": "medication", "medicine": "medication",
+    "pills": "medication", "tablets": "medication",
+    "mg": "", "dl": "", "my": "", "is": "", "the": "", "a": "", "i": "", "am": "",
+}
+
+# Candidates examined per lookup when checking numeric agreement
+TOP_CANDIDATES = 8
+
+def numeric_signature(text: str) -> str:
+    """The numbers in a query, in order. "sugar 250" and "sugar 65" read alike but are
+    clinically opposite, so a cached draft is only reused when the numbers agree."""
+    return " ".join(t for t in tokenize(text) if t.isdigit())
+
+def vectorize(text: str):
+    """Hashed word, word-bigram and character-trigram features, L2-normalized"""
+    words = [SYNONYMS.get(t, t) for t in tokenize(text)]
+    words = [w for w in words if w]
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        # Signed hashing: collisions cancel out on average instead of piling up
+        vector[h % VECTOR_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# Rows a new partition starts with; most patients only ever fill a few
+BUCKET_INITIAL_ROWS = 16
+
+class _Bucket:
+    """Growable ring of vectors and drafts for one partition"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.vectors = np.zeros((min(BUCKET_INITIAL_ROWS, max_entries), VECTOR_DIM), dtype=np.float32)
+        self.responses = []
+        self.signatures = []
+        self.size = 0
+        self.next_slot = 0
+
+    def add(self, vector, signature: str, response: str):
+        if self.next_slot >= len(self.vectors) and len(self.vectors) < self.max_entries:
+            grown = np.zeros((min(len(self.vectors) * 2, self.max_entries), VECTOR_DIM), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        slot = self.next_slot % self.max_entries
+        self.vectors[slot] = vector
+        if slot < len(self.responses):
+            # Ring is full: overwrite the oldest entry
+            self.responses[slot] = response
+            self.signatures[slot] = signature
+        else:
+            self.responses.append(response)
+            self.signatures.append(signature)
+        self.size = min(self.size + 1, self.max_entries)
+        self.next_slot = slot + 1
+
+    def best_match(self, vector, signature: str, threshold: float):
+        """Returns (score, draft) of the most similar entry above threshold with the same numbers"""
+        if not self.size:
+            return 0.0, None
+        scores = self.vectors[:self.size] @ vector
+        if self.size > TOP_CANDIDATES:
+            candidates = np.argpartition(scores, -TOP_CANDIDATES)[-TOP_CANDIDATES:]
+        else:
+            candidates = np.arange(self.size)
+        for index in candidates[np.argsort(scores[candidates])[::-1]]:
+            score = float(scores[index])
+            if score < threshold:
+                break
+            if self.signatures[index] == signature:
+                return score, self.responses[index]
+        return 0.0, None
+
+class SemanticCache:
+    """Cosine-similarity lookup of cached drafts, partitioned by the context they were written for.
+
+    The caller picks the partition (graph.py uses the diabetes type plus a
+    fingerprint of the patient context), so a draft is never served against
+    another patient's record. max_entries bounds all partitions together;
+    the least recently used partitions are dropped first.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, enabled: bool = True):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = enabled and SEMANTIC_CACHE_AVAILABLE
+        self._buckets = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def lookup(self, query: str, partition: str):
+        """Returns the draft of the most similar cached query above the threshold, or None"""
+        vector = vectorize(query)
+        signature = numeric_signature(query)
+        with self._lock:
+            bucket = self._buckets.get(partition)
+            if bucket is not None:
+                self._buckets.move_to_end(partition)
+            score, response = bucket.best_match(vector, signature, self.threshold) if bucket else (0.0, None)
+            self._stats["hits" if response is not None else "misses"] += 1
+        return response
+
+    def add(self, query: str, partition: str, response: str):
+        vector = vectorize(query)
+        signature = numeric_signature(query)
+        with self._lock:
+            bucket = self._buckets.get(partition)
+            if bucket is None:
+                bucket = self._buckets[partition] = _Bucket(self.max_entries)
+            self._buckets.move_to_end(partition)
+            size_before = bucket.size
+            bucket.add(vector, signature, response)
+            self._size += bucket.size - size_before
+            self._stats["stores"] += 1
+            while self._size > self.max_entries:
+                _, evicted = self._buckets.popitem(last=False)
+                self._size -= evicted.size
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._size
+            stats["partitions"] = len(self._buckets)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["threshold"] = self.threshold
+        return stats
+
+semantic_cache = SemanticCache(
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_ENABLED
+)
@@ -0,0 +1,53 @@
+# backend_service/single_flight.py
+# Coalesces concurrent identical work onto one shared asyncio task
+
+import asyncio
+
+class SingleFlight:
+    """At most one in-flight task per key; later callers with the same key await it.
+
+    The task is shielded from its callers, so a caller that disconnects does
+    not cancel the work the others are waiting on. Must be used from one
+    event loop.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def get(self, key):
+        """The in-flight task for key, or None"""
+        return self._flights.get(key)
+
+    def start(self, key, coro) -> asyncio.Task:
+        """Runs coro as the in-flight task for key"""
+        task = asyncio.ensure_future(coro)
+        self._flights[key] = task
+        self._stats["leaders"] += 1
+
+        def finished(done):
+            if self._flights.get(key) is done:
+                del self._flights[key]
+            if not done.cancelled():
+                # Mark the exception as retrieved even if no caller is left
+                done.exception()
+
+        task.add_done_callback(finished)
+        return task
+
+    async def join(self, task: asyncio.Task):
+        """Awaits another caller's task without being able to cancel it"""
+        self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def run(self, key, factory):
+        """Returns the result of factory(), shared with concurrent calls for the same key"""
+        task = self._flights.get(key)
+        if task is not None:
+            return await self.join(task)
+        return await asyncio.shield(self.start(key, factory()))
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["in_flight"] = len(self._flights)
+        return stats
@@ -0,0 +1,551 @@
+# backend_service/storage.py
+# Repository for queries and patient records, backed by SQLite or PostgreSQL
+
+import os
+import json
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+import patient_db
+from patient_db import compute_query_hash, freeze, thaw, QUERY_FIELDS
+from change_feed import change_feed
+from migrations import URGENCY_RANK_SQL
+
+# "sqlite" (single node, the default) or "postgres" (needs asyncpg and DATABASE_URL)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlite').lower()
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+PG_POOL_MIN_SIZE = int(os.environ.get('PG_POOL_MIN_SIZE', 2))
+PG_POOL_MAX_SIZE = int(os.environ.get('PG_POOL_MAX_SIZE', 10))
+
+def import_params(record: dict) -> tuple:
+    """Parameters for IMPORT_QUERY_SQL / PG_IMPORT_QUERY_SQL, in column order"""
+    return (
+        record['id'], record['timestamp'], record['patient_id'], record['original_query'],
+        compute_query_hash(record['original_query']), record.get('ai_response'),
+        record.get('doctor_final_response'), record['status'], record.get('urgency_level', 'low'),
+        record.get('safety_score'), record.get('confidence_score')
+    )
+
+class Storage(ABC):
+    """Async repository for the queries and patients tables.
+
+    Rows come back as plain dicts; patient records as {"data", "version"}
+    with the data frozen (see patient_db.freeze). The job queue, rescore
+    checkpoints and LLM caches stay in local SQLite whichever backend is
+    configured.
+    """
+
+    name = None
+
+    async def open(self):
+        """Prepares the backend (schema, pool); called once at startup"""
+
+    async def close(self):
+        """Releases the backend's connections; called at shutdown"""
+
+    async def insert_pending_query(self, record: dict):
+        """Saves a pending_review query unless the patient already has it pending.
+        Returns (id, created). A new query is published to the change feed."""
+        record = {**record, "timestamp": record.get("timestamp") or datetime.now().isoformat()}
+        query_id, created = await self._insert_pending_query(record)
+        if created:
+            change_feed.publish("insert", {
+                **{field: record.get(field) for field in QUERY_FIELDS},
+                "id": query_id, "status": "pending_review",
+                "urgency_level": record.get("urgency_level", "low"),
+            })
+        return query_id, created
+
+    async def update_query(self, query_id: str, status: str, doctor_response) -> bool:
+        """Sets a query's status and doctor response; False when the query does not exist.
+        The change is published to the change feed."""
+        updated = await self._update_query(query_id, status, doctor_response)
+        if updated:
+            change_feed.publish("update", {
+                "id": query_id, "status": status, "doctor_final_response": doctor_response
+            })
+        return updated
+
+    @abstractmethod
+    async def _insert_pending_query(self, record: dict):
+        """Inserts a pending query; returns (id, created) like insert_pending_query"""
+
+    @abstractmethod
+    async def _update_query(self, query_id: str, status: str, doctor_response) -> bool:
+        """Updates a query; returns False when it does not exist"""
+
+    @abstractmethod
+    async def list_pending_queries(self, columns, after=None, limit=None) -> list:
+        """Pending queries by urgency then age. after is a (urgency_rank, timestamp, id)
+        keyset; columns must already be validated by the caller."""
+
+    @abstractmethod
+    async def count_pending_by_rank(self) -> dict:
+        """{urgency_rank: count} over the whole pending queue"""
+
+    @abstractmethod
+    async def list_patient_queries(self, patient_id: str, since: int = None) -> list:
+        """A patient's queries, newest first; with since, only the rows written after
+        that row version, oldest change first"""
+
+    @abstractmethod
+    async def get_queries_version(self, patient_id: str = None) -> int:
+        """Highest row version in the queries table, or among one patient's queries
+        (0 when there are none); on PostgreSQL, the highest that can no longer be
+        preceded by a later commit. Read it before the rows it describes."""
+
+    @abstractmethod
+    async def list_changed_queries(self, columns, since: int) -> list:
+        """Queries of any status written after row version since, oldest change first"""
+
+    @abstractmethod
+    async def count_queries(self, since: str, status: str = None) -> int:
+        """Queries submitted at or after the ISO timestamp since, optionally with one status"""
+
+    @abstractmethod
+    async def import_queries(self, records: list) -> int:
+        """Bulk-inserts complete query rows (any status), skipping any that conflict with
+        existing ones. Returns how many were inserted."""
+
+    @abstractmethod
+    async def get_patient(self, patient_id: str):
+        """{"data": ..., "version": ...} for a patient, or None"""
+
+    @abstractmethod
+    async def get_patients(self, patient_ids) -> dict:
+        """{patient_id: {"data", "version"}} for the known patients among patient_ids"""
+
+    @abstractmethod
+    async def upsert_patient(self, patient_id: str, data):
+        """Creates or replaces a patient record, bumping its version"""
+
+    @abstractmethod
+    async def list_patients(self, limit=None, offset=0) -> list:
+        """[{"id", "name", "type"}] ordered by patient ID"""
+
+class SQLiteStorage(Storage):
+    """The single-file backend: patient_db's connections, patient cache and group commit"""
+
+    name = "sqlite"
+
+    async def open(self):
+        await asyncio.to_thread(patient_db.init_db)
+
+    async def _insert_pending_query(self, record: dict):
+        return await patient_db.query_writes.arun(
+            lambda conn: patient_db.insert_pending_query(conn, record)
+        )
+
+    async def _update_query(self, query_id: str, status: str, doctor_response) -> bool:
+        updated = await patient_db.query_writes.arun(lambda conn: conn.execute(
+            patient_db.UPDATE_QUERY_SQL, (status, doctor_response, query_id)
+        ).rowcount)
+        return updated > 0
+
+    def _list_pending(self, columns, after, limit):
+        sql = patient_db.PENDING_QUERIES_SQL.format(
+            columns=", ".join(columns),
+            after=patient_db.PENDING_AFTER_CURSOR_SQL if after else ""
+        )
+        params = list(after or [])
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = patient_db.get_db_connection().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    async def list_pending_queries(self, columns, after=None, limit=None) -> list:
+        return await asyncio.to_thread(self._list_pending, columns, after, limit)
+
+    def _count_pending(self):
+        # Counted from the partial queue index alone, without touching table rows
+        return dict(patient_db.get_db_connection().execute(patient_db.PENDING_COUNTS_SQL).fetchall())
+
+    async def count_pending_by_rank(self) -> dict:
+        return await asyncio.to_thread(self._count_pending)
+
+    def _list_patient_queries(self, patient_id, since):
+        conn = patient_db.get_db_connection()
+        if since is None:
+            rows = conn.execute(patient_db.PATIENT_QUERIES_SQL, (patient_id,))
+        else:
+            rows = conn.execute(patient_db.PATIENT_QUERIES_SINCE_SQL, (patient_id, since))
+        return [dict(row) for row in rows.fetchall()]
+
+    async def list_patient_queries(self, patient_id: str, since: int = None) -> list:
+        return await asyncio.to_thread(self._list_patient_queries, patient_id, since)
+
+    def _get_version(self, patient_id):
+        conn = patient_db.get_db_connection()
+        if patient_id is None:
+            return conn.execute(patient_db.QUERIES_VERSION_SQL).fetchone()[0]
+        return conn.execute(patient_db.PATIENT_QUERIES_VERSION_SQL, (patient_id,)).fetchone()[0]
+
+    async def get_queries_version(self, patient_id: str = None) -> int:
+        return await asyncio.to_thread(self._get_version, patient_id)
+
+    def _list_changed(self, columns, since):
+        sql = patient_db.CHANGED_QUERIES_SQL.format(columns=", ".join(columns))
+        return [dict(row) for row in patient_db.get_db_connection().execute(sql, (since,)).fetchall()]
+
+    async def list_changed_queries(self, columns, since: int) -> list:
+        return await asyncio.to_thread(self._list_changed, columns, since)
+
+    def _count_queries(self, since, status):
+        sql, params = "SELECT COUNT(*) FROM queries WHERE timestamp >= ?", [since]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        return patient_db.get_db_connection().execute(sql, params).fetchone()[0]
+
+    async def count_queries(self, since: str, status: str = None) -> int:
+        return await asyncio.to_thread(self._count_queries, since, status)
+
+    async def import_queries(self, records: list) -> int:
+        params = [import_params(record) for record in records]
+
+        def write(conn):
+            before = conn.total_changes
+            conn.executemany(patient_db.IMPORT_QUERY_SQL, params)
+            return conn.total_changes - before
+
+        return await patient_db.query_writes.arun(write)
+
+    async def get_patient(self, patient_id: str):
+        record = patient_db.patient_cache.get(patient_id)
+        if record is not None:
+            return record
+        return await asyncio.to_thread(patient_db.get_patient_record, patient_id)
+
+    async def get_patients(self, patient_ids) -> dict:
+        return await asyncio.to_thread(patient_db.get_patient_records, patient_ids)
+
+    async def upsert_patient(self, patient_id: str, data):
+        await asyncio.to_thread(patient_db.update_patient_data, patient_id, data)
+
+    async def list_patients(self, limit=None, offset=0) -> list:
+        return await asyncio.to_thread(patient_db.get_all_patients, limit, offset)
+
+# --- PostgreSQL ---
+# Same columns as the SQLite schema after its migrations. Timestamps stay ISO
+# text so keyset cursors encode the same way on both backends, and patient
+# records are JSON text as they are only ever read whole. Row versions are
+# writer transaction IDs; see PG_NEXT_ROW_VERSION_SQL.
+POSTGRES_SCHEMA_SQL = f"""
+    CREATE TABLE IF NOT EXISTS queries (
+        id TEXT PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        patient_id TEXT NOT NULL,
+        original_query TEXT NOT NULL,
+        query_hash TEXT,
+        ai_response TEXT,
+        doctor_final_response TEXT,
+        status TEXT NOT NULL,
+        urgency_level TEXT DEFAULT 'low',
+        safety_score INTEGER,
+        confidence_score INTEGER,
+        urgency_rank INTEGER GENERATED ALWAYS AS {URGENCY_RANK_SQL} STORED,
+        row_version BIGINT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_queries_patient_timestamp
+        ON queries (patient_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_queries_pending_queue
+        ON queries (urgency_rank, timestamp, id) WHERE status = 'pending_review';
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_queries_pending_hash
+        ON queries (patient_id, query_hash) WHERE status = 'pending_review';
+    CREATE INDEX IF NOT EXISTS idx_queries_row_version ON queries (row_version);
+    CREATE INDEX IF NOT EXISTS idx_queries_patient_version ON queries (patient_id, row_version);
+    CREATE TABLE IF NOT EXISTS patients (
+        patient_id TEXT PRIMARY KEY,
+        name TEXT,
+        diabetes_type TEXT,
+        data TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL
+    );
+"""
+
+# A write's row version is its transaction ID. Transactions commit out of ID
+# order, so a reader could see version 11 before 10 is committed and then skip
+# 10 in a delta read. Reported versions are therefore capped below the oldest
+# transaction still running (the snapshot xmin): every lower ID has finished,
+# so nothing at or below a reported version can appear later. Writers never
+# wait on each other; a long-running transaction only delays when new versions
+# are reported.
+PG_NEXT_ROW_VERSION_SQL = "txid_current()"
+PG_SETTLED_VERSION_SQL = "row_version < txid_snapshot_xmin(txid_current_snapshot())"
+PG_INSERT_PENDING_SQL = f"""
+    INSERT INTO queries (
+        id, timestamp, patient_id, original_query, query_hash,
+        ai_response, status, urgency_level,
+        safety_score, confidence_score, row_version
+    ) VALUES ($1, $2, $3, $4, $5, $6, 'pending_review', $7, $8, $9, {PG_NEXT_ROW_VERSION_SQL})
+    ON CONFLICT (patient_id, query_hash) WHERE status = 'pending_review' DO NOTHING
+    RETURNING id
+"""
+PG_PENDING_DUPLICATE_SQL = """
+    SELECT id FROM queries
+    WHERE patient_id = $1 AND query_hash = $2 AND status = 'pending_review'
+"""
+PG_UPDATE_QUERY_SQL = f"""
+    UPDATE queries SET status = $1, doctor_final_response = $2, row_version = {PG_NEXT_ROW_VERSION_SQL}
+    WHERE id = $3
+"""
+PG_PENDING_QUERIES_SQL = """
+    SELECT {columns} FROM queries
+    WHERE status = 'pending_review' {after}
+    ORDER BY urgency_rank, timestamp, id
+"""
+PG_PENDING_AFTER_CURSOR_SQL = "AND (urgency_rank, timestamp, id) > ($1, $2, $3)"
+PG_PENDING_COUNTS_SQL = """
+    SELECT urgency_rank, COUNT(*) FROM queries
+    WHERE status = 'pending_review'
+    GROUP BY urgency_rank
+"""
+PG_PATIENT_QUERIES_SQL = "SELECT * FROM queries WHERE patient_id = $1 ORDER BY timestamp DESC"
+PG_PATIENT_QUERIES_SINCE_SQL = """
+    SELECT * FROM queries WHERE patient_id = $1 AND row_version > $2 ORDER BY row_version
+"""
+PG_QUERIES_VERSION_SQL = f"SELECT COALESCE(MAX(row_version), 0) FROM queries WHERE {PG_SETTLED_VERSION_SQL}"
+PG_PATIENT_QUERIES_VERSION_SQL = f"""
+    SELECT COALESCE(MAX(row_version), 0) FROM queries WHERE patient_id = $1 AND {PG_SETTLED_VERSION_SQL}
+"""
+PG_CHANGED_QUERIES_SQL = "SELECT {columns} FROM queries WHERE row_version > $1 ORDER BY row_version"
+PG_IMPORT_QUERY_SQL = f"""
+    INSERT INTO queries (
+        id, timestamp, patient_id, original_query, query_hash, ai_response,
+        doctor_final_response, status, urgency_level, safety_score, confidence_score, row_version
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, {PG_NEXT_ROW_VERSION_SQL})
+    ON CONFLICT DO NOTHING
+"""
+PG_GET_PATIENT_SQL = "SELECT data, version FROM patients WHERE patient_id = $1"
+PG_GET_PATIENTS_SQL = "SELECT patient_id, data, version FROM patients WHERE patient_id IN ({placeholders})"
+PG_UPSERT_PATIENT_SQL = """
+    INSERT INTO patients (patient_id, name, diabetes_type, data, version, updated_at)
+    VALUES ($1, $2, $3, $4, 1, $5)
+    ON CONFLICT (patient_id) DO UPDATE SET
+        name = excluded.name,
+        diabetes_type = excluded.diabetes_type,
+        data = excluded.data,
+        version = patients.version + 1,
+        updated_at = excluded.updated_at
+"""
+PG_SEED_PATIENT_SQL = """
+    INSERT INTO patients (patient_id, name, diabetes_type, data, version, updated_at)
+    VALUES ($1, $2, $3, $4, 1, $5)
+    ON CONFLICT (patient_id) DO NOTHING
+"""
+PG_LIST_PATIENTS_SQL = "SELECT patient_id, name, diabetes_type FROM patients ORDER BY patient_id"
+
+class PostgresStorage(Storage):
+    """Backend for running several API nodes against one PostgreSQL server.
+
+    Uses an asyncpg connection pool. pool_factory(dsn, min_size, max_size)
+    returns an awaitable pool and defaults to asyncpg.create_pool; tests
+    can pass a stand-in (see tests/fake_asyncpg.py). Patient records
+    are not cached in-process, since another node may update them.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, pool_factory=None):
+        if pool_factory is None:
+            if not ASYNCPG_AVAILABLE:
+                raise RuntimeError("STORAGE_BACKEND=postgres requires asyncpg (pip install asyncpg)")
+            pool_factory = asyncpg.create_pool
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool_factory = pool_factory
+        self._pool = None
+        self._opening = None
+
+    async def open(self):
+        await self._get_pool()
+
+    async def _create_pool(self):
+        pool = await self._pool_factory(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(POSTGRES_SCHEMA_SQL)
+                await self._seed_demo_patients(conn)
+        self._pool = pool
+        return pool
+
+    async def _seed_demo_patients(self, conn):
+        from demo_patients import DEMO_PATIENTS
+        now = datetime.now().isoformat()
+        await conn.executemany(PG_SEED_PATIENT_SQL, [
+            (patient_id, data['profile']['name'], data['profile']['Type of Diabetes'], json.dumps(data), now)
+            for patient_id, data in DEMO_PATIENTS.items()
+        ])
+
+    async def _get_pool(self):
+        if self._pool is not None:
+            return self._pool
+        # Concurrent first callers share one pool creation
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(self._create_pool())
+        try:
+            return await asyncio.shield(self._opening)
+        except Exception:
+            self._opening = None
+            raise
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+        self._pool = None
+        self._opening = None
+
+    async def _insert_pending_query(self, record: dict):
+        query_hash = compute_query_hash(record['original_query'])
+        pool = await self._get_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            query_id = await conn.fetchval(
+                PG_INSERT_PENDING_SQL,
+                record['id'],
+                record.get('timestamp') or datetime.now().isoformat(),
+                record['patient_id'],
+                record['original_query'],
+                query_hash,
+                record.get('ai_response'),
+                record.get('urgency_level', 'low'),
+                record.get('safety_score'),
+                record.get('confidence_score')
+            )
+            if query_id is not None:
+                return query_id, True
+            existing = await conn.fetchval(PG_PENDING_DUPLICATE_SQL, record['patient_id'], query_hash)
+            return existing, False
+
+    async def _update_query(self, query_id: str, status: str, doctor_response) -> bool:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            result = await conn.execute(PG_UPDATE_QUERY_SQL, status, doctor_response, query_id)
+        # asyncpg returns the command tag, e.g. "UPDATE 1"
+        return result.split()[-1] != "0"
+
+    async def list_pending_queries(self, columns, after=None, limit=None) -> list:
+        sql = PG_PENDING_QUERIES_SQL.format(
+            columns=", ".join(columns),
+            after=PG_PENDING_AFTER_CURSOR_SQL if after else ""
+        )
+        params = list(after or [])
+        if limit:
+            params.append(limit)
+            sql += f" LIMIT ${len(params)}"
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(sql, *params)
+        return [dict(row) for row in rows]
+
+    async def count_pending_by_rank(self) -> dict:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(PG_PENDING_COUNTS_SQL)
+        return {row[0]: row[1] for row in rows}
+
+    async def list_patient_queries(self, patient_id: str, since: int = None) -> list:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if since is None:
+                rows = await conn.fetch(PG_PATIENT_QUERIES_SQL, patient_id)
+            else:
+                rows = await conn.fetch(PG_PATIENT_QUERIES_SINCE_SQL, patient_id, since)
+        return [dict(row) for row in rows]
+
+    async def get_queries_version(self, patient_id: str = None) -> int:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if patient_id is None:
+                return await conn.fetchval(PG_QUERIES_VERSION_SQL)
+            return await conn.fetchval(PG_PATIENT_QUERIES_VERSION_SQL, patient_id)
+
+    async def list_changed_queries(self, columns, since: int) -> list:
+        sql = PG_CHANGED_QUERIES_SQL.format(columns=", ".join(columns))
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(sql, since)
+        return [dict(row) for row in rows]
+
+    async def count_queries(self, since: str, status: str = None) -> int:
+        sql, params = "SELECT COUNT(*) FROM queries WHERE timestamp >= $1", [since]
+        if status:
+            sql += " AND status = $2"
+            params.append(status)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await conn.fetchval(sql, *params)
+
+    async def import_queries(self, records: list) -> int:
+        pool = await self._get_pool()
+        inserted = 0
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # One statement per row so conflicts can be counted from the command tags
+                for record in records:
+                    result = await conn.execute(PG_IMPORT_QUERY_SQL, *import_params(record))
+                    inserted += int(result.split()[-1])
+        return inserted
+
+    async def get_patient(self, patient_id: str):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(PG_GET_PATIENT_SQL, patient_id)
+        if row is None:
+            return None
+        return {"data": freeze(json.loads(row["data"])), "version": row["version"]}
+
+    async def get_patients(self, patient_ids) -> dict:
+        patient_ids = list(dict.fromkeys(patient_ids))
+        records = {}
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            for start in range(0, len(patient_ids), patient_db.PATIENT_BATCH_SIZE):
+                batch = patient_ids[start:start + patient_db.PATIENT_BATCH_SIZE]
+                sql = PG_GET_PATIENTS_SQL.format(
+                    placeholders=", ".join(f"${n}" for n in range(1, len(batch) + 1))
+                )
+                for row in await conn.fetch(sql, *batch):
+                    records[row["patient_id"]] = {"data": freeze(json.loads(row["data"])), "version": row["version"]}
+        return records
+
+    async def upsert_patient(self, patient_id: str, data):
+        profile = data.get('profile', {})
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                PG_UPSERT_PATIENT_SQL, patient_id, profile.get('name'), profile.get('Type of Diabetes'),
+                json.dumps(thaw(data)), datetime.now().isoformat()
+            )
+
+    async def list_patients(self, limit=None, offset=0) -> list:
+        sql, params = PG_LIST_PATIENTS_SQL, ()
+        if limit is not None:
+            sql += " LIMIT $1 OFFSET $2"
+            params = (limit, offset)
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(sql, *params)
+        return [{"id": row["patient_id"], "name": row["name"], "type": row["diabetes_type"]} for row in rows]
+
+def create_storage(backend: str = None) -> Storage:
+    """The backend selected by STORAGE_BACKEND"""
+    backend = backend or STORAGE_BACKEND
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "postgres":
+        if not DATABASE_URL:
+            raise ValueError("STORAGE_BACKEND=postgres requires DATABASE_URL")
+        return PostgresStorage(DATABASE_URL, PG_POOL_MIN_SIZE, PG_POOL_MAX_SIZE)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r}")
+
+storage = create_storage()
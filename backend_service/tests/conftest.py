@@ -0,0 +1,46 @@
+# backend_service/tests/conftest.py
+# The service modules are flat (no package), so tests import them from backend_service/
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The service modules read these at import time: keep the tests off the real
+# databases, and run the API in lite mode (no LangChain, no LLM)
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="assist-tests-")
+os.environ["DB_PATH"] = os.path.join(TEST_DATA_DIR, "queries.db")
+os.environ["LLM_CACHE_PATH"] = os.path.join(TEST_DATA_DIR, "llm_cache.db")
+os.environ["BACKEND_MODE"] = "lite"
+os.environ["STORAGE_BACKEND"] = "sqlite"
+
+@pytest.fixture
+def database_at(tmp_path, monkeypatch):
+    """Opens a new database migrated only up to the given schema version"""
+    import migrations
+    import patient_db
+
+    def open_at(version):
+        conn = sqlite3.connect(str(tmp_path / f"v{version}.db"))
+        with monkeypatch.context() as patch:
+            patch.setattr(migrations, "MIGRATIONS", [m for m in migrations.MIGRATIONS if m[0] <= version])
+            patient_db.init_schema(conn)
+        return conn
+    return open_at
+
+@pytest.fixture
+def client():
+    """A TestClient for the API, starting from an empty queries table"""
+    from fastapi.testclient import TestClient
+    import main
+    import patient_db
+
+    with TestClient(main.app) as client:
+        conn = patient_db.get_db_connection()
+        with conn:
+            conn.execute("DELETE FROM queries")
+        yield client
@@ -0,0 +1,90 @@
+# backend_service/tests/fake_asyncpg.py
+# In-process stand-in for an asyncpg pool, for exercising PostgresStorage without a server
+#
+# Implements only what storage.PostgresStorage uses: pool.acquire()/close()
+# and conn.execute/executemany/fetch/fetchrow/fetchval/transaction. SQL is
+# run by SQLite after rewriting $1-style parameters to ?1, which covers the
+# portable subset PostgresStorage sticks to. Transaction IDs are emulated:
+# txid_current() counts up from 1 per pool (point each pool at a fresh
+# database), and as only one caller holds the connection at a time, every
+# earlier ID has finished, so the snapshot xmin is the next ID. It does not
+# check PostgreSQL types, locking or isolation; set TEST_DATABASE_URL to run
+# test_storage_backends.py against a real server for that.
+
+import re
+import sqlite3
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+
+PARAM_RE = re.compile(r"\$(\d+)")
+
+def translate(sql: str) -> str:
+    return PARAM_RE.sub(r"?\1", sql)
+
+class FakeConnection:
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    async def execute(self, sql: str, *args) -> str:
+        if args:
+            cursor = self._conn.execute(translate(sql), args)
+            rowcount = cursor.rowcount
+        else:
+            # Like asyncpg, an argument-less execute may hold several statements
+            rowcount = 0
+            for statement in filter(str.strip, sql.split(";")):
+                rowcount = self._conn.execute(statement).rowcount
+        return f"{sql.split()[0].upper()} {max(rowcount, 0)}"
+
+    async def executemany(self, sql: str, args):
+        self._conn.executemany(translate(sql), args)
+
+    async def fetch(self, sql: str, *args) -> list:
+        return self._conn.execute(translate(sql), args).fetchall()
+
+    async def fetchrow(self, sql: str, *args):
+        rows = await self.fetch(sql, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args):
+        row = await self.fetchrow(sql, *args)
+        return row[0] if row else None
+
+    @asynccontextmanager
+    async def transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+class FakePool:
+    """One SQLite connection in autocommit mode, handed out to one caller at a time"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        xids = itertools.count(1)
+        self._last_xid = 0
+        def txid_current():
+            self._last_xid = next(xids)
+            return self._last_xid
+        self._conn.create_function("txid_current", 0, txid_current)
+        self._conn.create_function("txid_current_snapshot", 0, lambda: None)
+        self._conn.create_function("txid_snapshot_xmin", 1, lambda snapshot: self._last_xid + 1)
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._lock:
+            yield FakeConnection(self._conn)
+
+    async def close(self):
+        self._conn.close()
+
+async def create_pool(dsn: str, min_size: int = 1, max_size: int = 1) -> FakePool:
+    """Signature-compatible with asyncpg.create_pool; dsn is a SQLite path or ':memory:'"""
+    return FakePool(dsn)
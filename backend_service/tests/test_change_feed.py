@@ -0,0 +1,50 @@
+# backend_service/tests/test_change_feed.py
+
+import asyncio
+import threading
+
+from change_feed import ChangeFeed
+
+def test_since_replays_events_after_seq():
+    feed = ChangeFeed(size=10)
+    for n in range(3):
+        feed.publish("insert", {"id": f"q{n}"})
+    events, reset = feed.since(1, feed.feed_id)
+    assert not reset
+    assert [event["seq"] for event in events] == [2, 3]
+    assert [event["query"]["id"] for event in events] == ["q1", "q2"]
+    assert feed.since(3, feed.feed_id) == ([], False)
+
+def test_reset_when_events_were_dropped():
+    feed = ChangeFeed(size=2)
+    for n in range(5):
+        feed.publish("update", {"id": f"q{n}"})
+    assert feed.since(1) == ([], True)
+    events, reset = feed.since(3)
+    assert not reset and [event["seq"] for event in events] == [4, 5]
+
+def test_reset_for_another_feed_or_a_future_seq():
+    feed = ChangeFeed(size=10)
+    feed.publish("insert", {"id": "q0"})
+    assert feed.since(0, "restarted-feed") == ([], True)
+    assert feed.since(5, feed.feed_id) == ([], True)
+
+def test_wait_is_woken_by_publish_from_another_thread():
+    async def scenario():
+        feed = ChangeFeed(size=10)
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, lambda: threading.Thread(
+            target=feed.publish, args=("insert", {"id": "late"})
+        ).start())
+        return await asyncio.wait_for(feed.wait(0, feed.feed_id, timeout=5), 5)
+
+    events, reset = asyncio.run(scenario())
+    assert not reset
+    assert [event["query"]["id"] for event in events] == ["late"]
+
+def test_wait_times_out_without_events():
+    async def scenario():
+        feed = ChangeFeed(size=10)
+        return await feed.wait(0, feed.feed_id, timeout=0.05)
+
+    assert asyncio.run(scenario()) == ([], False)
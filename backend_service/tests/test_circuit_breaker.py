@@ -0,0 +1,70 @@
+# backend_service/tests/test_circuit_breaker.py
+
+import time
+
+from llm_client import CircuitBreaker
+
+def make_breaker(cooldown_seconds=60.0):
+    return CircuitBreaker(window=10, min_calls=4, error_rate=0.5, cooldown_seconds=cooldown_seconds)
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record_failure()
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    fail(breaker, 3)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_opens_at_error_rate_and_rejects():
+    breaker = make_breaker()
+    breaker.allow()
+    breaker.record_success()
+    breaker.allow()
+    breaker.record_success()
+    fail(breaker, 2)
+    assert breaker.state == "open"
+    assert not breaker.available()
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+def test_half_open_lets_one_probe_through():
+    breaker = make_breaker(cooldown_seconds=0.05)
+    fail(breaker, 4)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only the probe: other callers are rejected until it reports back
+    assert not breaker.available()
+    assert not breaker.allow()
+
+def test_successful_probe_closes():
+    breaker = make_breaker(cooldown_seconds=0.05)
+    fail(breaker, 4)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_failures"] == 0
+
+def test_failed_probe_reopens():
+    breaker = make_breaker(cooldown_seconds=0.05)
+    fail(breaker, 4)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["opened"] == 2
+
+def test_released_probe_lets_another_through():
+    breaker = make_breaker(cooldown_seconds=0.05)
+    fail(breaker, 4)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
@@ -0,0 +1,74 @@
+# backend_service/tests/test_llm_scheduler.py
+
+import asyncio
+
+import pytest
+
+from llm_scheduler import PriorityScheduler, parse_level_limits
+
+def make_scheduler(max_concurrency=1, aging_seconds=3600.0, limits=None):
+    return PriorityScheduler(
+        max_concurrency, parse_level_limits(limits or "", max_concurrency), aging_seconds
+    )
+
+async def grant_order(scheduler, arrivals, pause=0.0):
+    """Holds the only slot while arrivals queue up (pause seconds apart), then
+    returns the order in which their slots were granted"""
+    order = []
+
+    async def request(level):
+        async with scheduler.slot(level):
+            order.append(level)
+
+    await scheduler.acquire("high")
+    waiters = []
+    for level in arrivals:
+        waiters.append(asyncio.ensure_future(request(level)))
+        await asyncio.sleep(pause)
+    await asyncio.sleep(0)
+    scheduler.release("high")
+    await asyncio.gather(*waiters)
+    return order
+
+def test_urgent_queries_go_first():
+    order = asyncio.run(grant_order(make_scheduler(), ["low", "medium", "high", "low"]))
+    assert order == ["high", "medium", "low", "low"]
+
+def test_aging_promotes_long_waiting_queries():
+    # With 10 ms aging, a low query that waited 40 ms outranks a fresh high one
+    order = asyncio.run(grant_order(make_scheduler(aging_seconds=0.01), ["low", "high"], pause=0.04))
+    assert order == ["low", "high"]
+
+def test_level_limit_keeps_headroom():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=3, limits="low=1")
+        await scheduler.acquire("low")
+        queued_low = asyncio.ensure_future(scheduler.acquire("low"))
+        await asyncio.sleep(0)
+        # The second low query waits although slots are free; high still gets one
+        await asyncio.wait_for(scheduler.acquire("high"), 1)
+        assert not queued_low.done()
+        scheduler.release("low")
+        await asyncio.wait_for(queued_low, 1)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["low"]["dispatched"] == 2
+    assert stats["low"]["running"] == 1
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = make_scheduler()
+        await scheduler.acquire("medium")
+        waiter = asyncio.ensure_future(scheduler.acquire("low"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return scheduler.stats()["low"]["queued"]
+
+    assert asyncio.run(scenario()) == 0
+
+def test_unknown_level_limit_is_rejected():
+    with pytest.raises(ValueError):
+        parse_level_limits("urgent=2", 8)
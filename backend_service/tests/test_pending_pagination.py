@@ -0,0 +1,70 @@
+# backend_service/tests/test_pending_pagination.py
+
+import base64
+import json
+
+import pytest
+
+import patient_db
+
+URGENCIES = ("low", "high", "medium")
+
+@pytest.fixture
+def queue(client):
+    """23 pending queries over three urgencies and only four distinct timestamps (so
+    the id breaks ties), plus an answered one; returns the expected queue order"""
+    conn = patient_db.get_db_connection()
+    rows = [
+        {
+            "id": f"q{i:02d}", "patient_id": f"P00{i % 5}", "original_query": f"question {i}",
+            "timestamp": f"2024-01-01T09:0{i % 4}:00", "urgency_level": URGENCIES[i % 3],
+        }
+        for i in range(23)
+    ]
+    with conn:
+        for row in rows:
+            patient_db.insert_pending_query(conn, row)
+        patient_db.insert_pending_query(conn, {"id": "answered", "patient_id": "P001", "original_query": "done"})
+        conn.execute("UPDATE queries SET status = 'approved' WHERE id = 'answered'")
+    rank = {"high": 0, "medium": 1, "low": 2}
+    return [row["id"] for row in sorted(rows, key=lambda r: (rank[r["urgency_level"]], r["timestamp"], r["id"]))]
+
+def read_pages(client, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/pending_queries/", params=params)
+        assert response.status_code == 200
+        assert response.headers["X-Total-Count"] == "23"
+        ids += [row["id"] for row in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, pages
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 7, 23, 100])
+def test_pages_cover_queue_once_in_order(client, queue, limit):
+    ids, pages = read_pages(client, limit)
+    assert ids == queue
+    assert pages == max(1, -(-len(queue) // limit))
+
+def test_unpaged_read_matches_pages(client, queue):
+    assert [row["id"] for row in client.get("/pending_queries/", params={"fields": "id"}).json()] == queue
+
+def encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    encode([0, "2024-01-01"]),
+    encode(["high", "2024-01-01", "q1"]),
+    encode(None),
+    encode({"rank": 0}),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/pending_queries/", params={"limit": 5, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,95 @@
+# backend_service/tests/test_query_dedupe.py
+
+import sqlite3
+import threading
+
+import pytest
+
+import migrations
+import patient_db
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / "queries.db")
+    conn = sqlite3.connect(path)
+    patient_db.init_schema(conn)
+    conn.close()
+    return lambda: sqlite3.connect(path, timeout=10)
+
+def record(query_id, query="What is my A1c target?", patient_id="P001"):
+    return {"id": query_id, "patient_id": patient_id, "original_query": query}
+
+def save(conn, record):
+    with conn:
+        return patient_db.insert_pending_query(conn, record)
+
+def pending_ids(conn):
+    return [row[0] for row in conn.execute("SELECT id FROM queries WHERE status = 'pending_review' ORDER BY id")]
+
+def test_concurrent_identical_submits_store_one_row(connect):
+    start = threading.Barrier(8)
+    results = [None] * 8
+
+    def submit(i):
+        conn = connect()
+        start.wait()
+        results[i] = save(conn, record(f"q{i}"))
+        conn.close()
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(created for _, created in results) == 1
+    assert len({query_id for query_id, _ in results}) == 1
+    assert pending_ids(connect()) == [results[0][0]]
+
+def test_duplicate_returns_existing_row(connect):
+    conn = connect()
+    assert save(conn, record("first")) == ("first", True)
+    # Same question after normalization: case, spacing, trailing punctuation
+    assert save(conn, record("second", "what is my  A1C target")) == ("first", False)
+    assert pending_ids(conn) == ["first"]
+
+def test_other_patient_or_answered_query_is_not_a_duplicate(connect):
+    conn = connect()
+    save(conn, record("first"))
+    assert save(conn, record("other", patient_id="P002")) == ("other", True)
+    with conn:
+        conn.execute("UPDATE queries SET status = 'approved' WHERE id = 'first'")
+    assert save(conn, record("again")) == ("again", True)
+
+def test_hash_backfill(database_at, monkeypatch):
+    conn = database_at(6)
+    with conn:
+        conn.executemany(
+            "INSERT INTO queries (id, timestamp, patient_id, original_query, status) VALUES (?, ?, ?, ?, ?)",
+            [(f"q{i}", f"2024-01-01T00:00:{i:02d}", "P001", f"question {i}", "approved") for i in range(7)]
+        )
+    # Several batches, so resuming after each committed batch is exercised
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH_SIZE", 3)
+    migrations.apply_migrations(conn)
+    rows = conn.execute("SELECT original_query, query_hash FROM queries").fetchall()
+    assert len(rows) == 7
+    assert all(query_hash == patient_db.compute_query_hash(query) for query, query_hash in rows)
+
+def test_clear_duplicate_pending_hashes_keeps_newest(database_at):
+    conn = database_at(6)
+    with conn:
+        conn.executemany(
+            "INSERT INTO queries (id, timestamp, patient_id, original_query, status) VALUES (?, ?, ?, ?, ?)",
+            [
+                ("old", "2024-01-01T09:00:00", "P001", "Can I eat rice?", "pending_review"),
+                ("new", "2024-01-01T10:00:00", "P001", "Can I eat rice?", "pending_review"),
+                ("middle", "2024-01-01T09:30:00", "P001", "Can I eat rice?", "pending_review"),
+                ("answered", "2024-01-01T11:00:00", "P001", "Can I eat rice?", "approved"),
+                ("other", "2024-01-01T08:00:00", "P002", "Can I eat rice?", "pending_review"),
+            ]
+        )
+    migrations.apply_migrations(conn)
+    hashed = dict(conn.execute("SELECT id, query_hash IS NOT NULL FROM queries"))
+    assert hashed == {"old": 0, "new": 1, "middle": 0, "answered": 1, "other": 1}
+    # The kept row is the one a new duplicate resolves to
+    assert save(conn, record("again", "Can I eat rice?")) == ("new", False)
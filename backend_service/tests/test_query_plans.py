@@ -0,0 +1,52 @@
+# backend_service/tests/test_query_plans.py
+# Query plan regression check: every hot-path statement must be served by an index
+
+import sqlite3
+
+import pytest
+
+import patient_db
+
+# (name, sql, params, index the plan must mention)
+HOT_PATHS = [
+    ("/pending_queries/ first page",
+     patient_db.PENDING_QUERIES_SQL.format(columns="*", after="") + " LIMIT 26", (), "idx_queries_pending_queue"),
+    ("/pending_queries/ next page",
+     patient_db.PENDING_QUERIES_SQL.format(columns="*", after=patient_db.PENDING_AFTER_CURSOR_SQL) + " LIMIT 26",
+     (0, "2024-01-01", "q1"), "idx_queries_pending_queue"),
+    ("/pending_queries/ counts", patient_db.PENDING_COUNTS_SQL, (), "idx_queries_pending_queue"),
+    ("/queries/by_patient/{id}", patient_db.PATIENT_QUERIES_SQL, ("P001",), "idx_queries_patient_timestamp"),
+    ("save_query_for_review duplicate lookup", patient_db.PENDING_DUPLICATE_SQL, ("P001", "h"), "idx_queries_pending_hash"),
+    ("/pending_queries/ ETag version", patient_db.QUERIES_VERSION_SQL, (), "idx_queries_row_version"),
+    ("/pending_queries/?since=", patient_db.CHANGED_QUERIES_SQL.format(columns="*"), (4990,), "idx_queries_row_version"),
+    ("/queries/by_patient/{id} ETag version", patient_db.PATIENT_QUERIES_VERSION_SQL, ("P001",),
+     "idx_queries_patient_version"),
+    ("/queries/by_patient/{id}?since=", patient_db.PATIENT_QUERIES_SINCE_SQL, ("P001", 4990), "idx_queries_patient_version"),
+]
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    """A migrated database with enough rows, and ANALYZE statistics, for the planner to prefer indexes realistically"""
+    conn = sqlite3.connect(str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    patient_db.init_schema(conn)
+    statuses = ("pending_review", "approved", "approved", "approved")
+    urgencies = ("high", "medium", "low")
+    with conn:
+        conn.executemany(
+            "INSERT INTO queries (id, timestamp, patient_id, original_query, status, urgency_level, row_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (f"q{i}", f"2024-01-01T00:00:{i % 60:02d}.{i:06d}", f"P{i % 500:03d}",
+                 f"question {i}", statuses[i % 4], urgencies[i % 3], i + 1)
+                for i in range(5000)
+            ]
+        )
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+@pytest.mark.parametrize("sql, params, index", [path[1:] for path in HOT_PATHS], ids=[path[0] for path in HOT_PATHS])
+def test_hot_query_uses_its_index(conn, sql, params, index):
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    assert "SCAN queries" not in plan, plan
+    assert any(index in step for step in plan), plan
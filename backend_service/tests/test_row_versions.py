@@ -0,0 +1,85 @@
+# backend_service/tests/test_row_versions.py
+
+import migrations
+import patient_db
+
+def submit(client, query, patient_id="P001"):
+    response = client.post("/simple_query/", json={"patient_id": patient_id, "query": query})
+    assert response.status_code == 200
+    return response.json()["query_id"]
+
+def approve(client, query_id):
+    response = client.post(f"/update_query/{query_id}", json={"new_status": "approved", "doctor_response": "Yes"})
+    assert response.status_code == 200
+
+def test_matching_etag_returns_304(client):
+    submit(client, "Is 7.5% a good HbA1c?")
+    for path in ("/pending_queries/", "/queries/by_patient/P001"):
+        first = client.get(path)
+        assert first.status_code == 200
+        again = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == first.headers["ETag"]
+        assert again.headers["X-Row-Version"] == first.headers["X-Row-Version"]
+
+def test_etag_changes_after_write(client):
+    query_id = submit(client, "Can I skip metformin?")
+    pending = client.get("/pending_queries/")
+    by_patient = client.get("/queries/by_patient/P001")
+    approve(client, query_id)
+
+    for path, before in (("/pending_queries/", pending), ("/queries/by_patient/P001", by_patient)):
+        after = client.get(path, headers={"If-None-Match": before.headers["ETag"]})
+        assert after.status_code == 200
+        assert after.headers["ETag"] != before.headers["ETag"]
+        assert int(after.headers["X-Row-Version"]) > int(before.headers["X-Row-Version"])
+    assert client.get("/pending_queries/").json() == []
+
+def test_since_returns_only_changed_rows(client):
+    unchanged = submit(client, "What is a normal fasting glucose?")
+    answered = submit(client, "Should I test before exercise?")
+    version = client.get("/pending_queries/").headers["X-Row-Version"]
+    approve(client, answered)
+    added = submit(client, "Is fruit juice okay during a low?", patient_id="P002")
+
+    delta = client.get("/pending_queries/", params={"since": version})
+    assert delta.headers["X-Sync"] == "delta"
+    # Oldest change first; the answered row is listed so clients drop it
+    assert [(row["id"], row["status"]) for row in delta.json()] == [
+        (answered, "approved"), (added, "pending_review")
+    ]
+    assert unchanged not in {row["id"] for row in delta.json()}
+
+    patient_delta = client.get("/queries/by_patient/P001", params={"since": version})
+    assert patient_delta.headers["X-Sync"] == "delta"
+    assert [row["id"] for row in patient_delta.json()] == [answered]
+
+    # No version: the whole list
+    full = client.get("/queries/by_patient/P001")
+    assert full.headers["X-Sync"] == "full"
+    assert {row["id"] for row in full.json()} == {unchanged, answered}
+
+def test_row_version_migration_on_populated_v7_database(database_at):
+    conn = database_at(7)
+    # Rows as a v7 server stored them, before row versions existed
+    with conn:
+        conn.executemany(
+            "INSERT INTO queries (id, timestamp, patient_id, original_query, query_hash, status) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (f"q{i}", f"2024-01-01T00:00:0{i}", f"P00{i % 2}", f"question {i}",
+                 patient_db.compute_query_hash(f"question {i}"), "approved" if i == 1 else "pending_review")
+                for i in range(5)
+            ]
+        )
+
+    assert migrations.apply_migrations(conn) == migrations.MIGRATIONS[-1][0]
+    versions = conn.execute("SELECT id, row_version FROM queries ORDER BY rowid").fetchall()
+    assert versions == [(f"q{i}", i + 1) for i in range(5)]
+    assert conn.execute("SELECT COUNT(*) FROM queries WHERE status = 'approved'").fetchone()[0] == 1
+
+    # New writes are numbered above the backfilled rows
+    with conn:
+        patient_db.insert_pending_query(conn, {"id": "new", "patient_id": "P001", "original_query": "question 5"})
+    assert conn.execute(patient_db.QUERIES_VERSION_SQL).fetchone()[0] == 6
@@ -0,0 +1,85 @@
+# backend_service/tests/test_single_flight.py
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+class Work:
+    """Counts calls and blocks each one until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, result="done"):
+        self.calls += 1
+        await self.release.wait()
+        return result
+
+def test_concurrent_calls_share_one_run():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        work.release = asyncio.Event()
+        callers = [asyncio.ensure_future(flights.run("key", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return await asyncio.gather(*callers), work.calls, flights.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["done"] * 5
+    assert calls == 1
+    assert stats == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        work.release = asyncio.Event()
+        first = asyncio.ensure_future(flights.run("a", lambda: work("a")))
+        second = asyncio.ensure_future(flights.run("b", lambda: work("b")))
+        await asyncio.sleep(0)
+        work.release.set()
+        return await asyncio.gather(first, second), work.calls
+
+    assert asyncio.run(scenario()) == (["a", "b"], 2)
+
+def test_finished_key_runs_again():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        work.release = asyncio.Event()
+        work.release.set()
+        await flights.run("key", work)
+        await flights.run("key", work)
+        return work.calls
+
+    assert asyncio.run(scenario()) == 2
+
+def test_error_reaches_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        flights = SingleFlight()
+        callers = [asyncio.ensure_future(flights.run("key", fail)) for _ in range(3)]
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["boom"] * 3
+
+def test_cancelled_caller_does_not_cancel_shared_run():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        work.release = asyncio.Event()
+        leader = asyncio.ensure_future(flights.run("key", work))
+        follower = asyncio.ensure_future(flights.run("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        work.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,160 @@
+# backend_service/tests/test_storage_backends.py
+# The SQLite and PostgreSQL storage backends must behave the same. PostgreSQL
+# runs on the in-process fake_asyncpg pool; set TEST_DATABASE_URL to an empty
+# database to also run against a real server (needs asyncpg; its queries and
+# patients tables are dropped before each test).
+
+import os
+import asyncio
+
+import pytest
+
+import storage
+import patient_db
+from migrations import seed_demo_patients
+from demo_patients import DEMO_PATIENTS
+import fake_asyncpg
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+COLUMNS = ["id", "timestamp", "patient_id", "urgency_level", "status", "urgency_rank"]
+
+def reset_sqlite():
+    patient_db.init_db()
+    conn = patient_db.get_db_connection()
+    with conn:
+        conn.execute("DELETE FROM queries")
+        conn.execute("DELETE FROM patients")
+        seed_demo_patients(conn)
+    for patient_id in DEMO_PATIENTS:
+        patient_db.patient_cache.invalidate(patient_id)
+
+async def reset_server(dsn):
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("DROP TABLE IF EXISTS queries, patients")
+    finally:
+        await conn.close()
+
+@pytest.fixture(params=[
+    "sqlite",
+    "postgres",
+    pytest.param("postgres-server", marks=pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")),
+])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        reset_sqlite()
+        return storage.SQLiteStorage()
+    if request.param == "postgres":
+        return storage.PostgresStorage(str(tmp_path / "fake_postgres.db"), 1, 1, pool_factory=fake_asyncpg.create_pool)
+    asyncio.run(reset_server(TEST_DATABASE_URL))
+    return storage.PostgresStorage(TEST_DATABASE_URL, 1, 4)
+
+def run(backend, check):
+    """Runs check(backend) in a fresh event loop with the backend open"""
+    async def main():
+        await backend.open()
+        try:
+            return await check(backend)
+        finally:
+            await backend.close()
+    return asyncio.run(main())
+
+def record(query_id, patient_id, query, urgency="low", second=0):
+    return {
+        "id": query_id, "timestamp": f"2024-01-01T00:00:{second:02d}",
+        "patient_id": patient_id, "original_query": query, "ai_response": "draft",
+        "urgency_level": urgency, "safety_score": 90, "confidence_score": 80,
+    }
+
+async def add_queue(backend):
+    for query_id, patient_id, urgency, second in (
+        ("q1", "P001", "medium", 1), ("q3", "P002", "high", 3), ("q4", "P001", "low", 4), ("q5", "P003", "high", 5)
+    ):
+        await backend.insert_pending_query(record(query_id, patient_id, f"question {query_id}", urgency, second))
+
+def test_patients(backend):
+    async def check(backend):
+        patient = await backend.get_patient("P001")
+        assert (patient["data"]["profile"]["name"], patient["version"]) == ("Sarah Johnson", 1)
+        assert await backend.get_patient("P999") is None
+        assert sorted(await backend.get_patients(["P002", "P999", "P001", "P002"])) == ["P001", "P002"]
+
+        data = patient_db.thaw(patient["data"])
+        data["current_status"]["hba1c"] = "6.9%"
+        await backend.upsert_patient("P001", data)
+        updated = await backend.get_patient("P001")
+        assert (updated["data"]["current_status"]["hba1c"], updated["version"]) == ("6.9%", 2)
+        assert await backend.list_patients(limit=2, offset=1) == [
+            {"id": "P002", "name": "Michael Thompson", "type": "Type 1"},
+            {"id": "P003", "name": "Carlos Rodriguez", "type": "Type 2"},
+        ]
+    run(backend, check)
+
+def test_pending_duplicate_returns_existing_row(backend):
+    async def check(backend):
+        assert await backend.insert_pending_query(record("q1", "P001", "Is 180 mg/dL high?")) == ("q1", True)
+        assert await backend.insert_pending_query(record("q2", "P001", "is 180 mg/dl  high")) == ("q1", False)
+        assert await backend.insert_pending_query(record("q3", "P002", "Is 180 mg/dL high?")) == ("q3", True)
+        # Answering the pending row frees its hash for a new submission
+        assert await backend.update_query("q1", "approved", "ok")
+        assert await backend.insert_pending_query(record("q4", "P001", "Is 180 mg/dL high?")) == ("q4", True)
+    run(backend, check)
+
+def test_pending_queue_pages_and_counts(backend):
+    async def check(backend):
+        await add_queue(backend)
+        first_page = await backend.list_pending_queries(COLUMNS, limit=2)
+        assert [row["id"] for row in first_page] == ["q3", "q5"]
+        assert first_page[0] == {
+            "id": "q3", "timestamp": "2024-01-01T00:00:03", "patient_id": "P002",
+            "urgency_level": "high", "status": "pending_review", "urgency_rank": 0,
+        }
+        last = first_page[-1]
+        next_page = await backend.list_pending_queries(
+            COLUMNS, after=[last["urgency_rank"], last["timestamp"], last["id"]], limit=10
+        )
+        assert [row["id"] for row in next_page] == ["q1", "q4"]
+        assert await backend.count_pending_by_rank() == {0: 2, 1: 1, 2: 1}
+    run(backend, check)
+
+def test_update_and_row_versions(backend):
+    async def check(backend):
+        await add_queue(backend)
+        # Raw row versions differ between backends (transaction IDs on
+        # PostgreSQL), so only what clients rely on is checked
+        version = await backend.get_queries_version()
+        patient_version = await backend.get_queries_version("P001")
+        assert await backend.update_query("q3", "approved", "Please call the clinic.")
+        assert not await backend.update_query("nope", "approved", None)
+
+        assert await backend.get_queries_version() > version
+        assert await backend.get_queries_version("P001") == patient_version
+        assert await backend.list_changed_queries(["id", "status"], version) == [{"id": "q3", "status": "approved"}]
+        assert await backend.list_changed_queries(["id"], await backend.get_queries_version()) == []
+        assert await backend.count_pending_by_rank() == {0: 1, 1: 1, 2: 1}
+
+        assert [(row["id"], row["status"]) for row in await backend.list_patient_queries("P001")] == [
+            ("q4", "pending_review"), ("q1", "pending_review")
+        ]
+        await backend.update_query("q1", "approved", "ok")
+        await backend.insert_pending_query(record("q6", "P001", "question q6", second=6))
+        assert [
+            (row["id"], row["status"]) for row in await backend.list_patient_queries("P001", since=patient_version)
+        ] == [("q1", "approved"), ("q6", "pending_review")]
+    run(backend, check)
+
+def test_import_and_counts(backend):
+    async def check(backend):
+        await add_queue(backend)
+        imported = await backend.import_queries([
+            {**record("s1", "P004", "old simple question", second=7), "status": "approved", "doctor_final_response": "done"},
+            {**record("s2", "P002", "new simple question", "high", 8), "status": "pending_review"},
+            {**record("s3", "P001", "question q4", second=9), "status": "pending_review"},  # duplicate of pending q4
+        ])
+        assert imported == 2
+        assert await backend.import_queries([{**record("s1", "P004", "x", second=7), "status": "approved"}]) == 0
+        assert await backend.count_queries("2024-01-01T00:00:04") == 4
+        assert await backend.count_queries("2024-01-01T00:00:00", status="approved") == 1
+    run(backend, check)
@@ -0,0 +1,79 @@
+# backend_service/tests/test_write_batcher.py
+
+import sqlite3
+import threading
+
+import pytest
+
+from write_batcher import WriteBatcher
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / "batcher.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (value TEXT UNIQUE)")
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+def insert(value):
+    return lambda conn: conn.execute("INSERT INTO items (value) VALUES (?)", (value,)).lastrowid
+
+def stored_values(connect):
+    return [row[0] for row in connect().execute("SELECT value FROM items ORDER BY rowid")]
+
+def test_operations_commit_in_submission_order(connect):
+    batcher = WriteBatcher(connect, max_rows=50, max_delay_ms=5)
+    futures = [batcher.submit(insert(f"v{i}")) for i in range(20)]
+    assert [future.result(timeout=5) for future in futures] == list(range(1, 21))
+    batcher.stop()
+    assert stored_values(connect) == [f"v{i}" for i in range(20)]
+
+def test_batch_closes_at_max_rows(connect):
+    batcher = WriteBatcher(connect, max_rows=3, max_delay_ms=1000)
+    futures = [batcher.submit(insert(f"v{i}")) for i in range(6)]
+    for future in futures:
+        future.result(timeout=5)
+    stats = batcher.stats()
+    batcher.stop()
+    assert stats["operations"] == 6
+    assert stats["largest_batch"] <= 3
+    assert stats["batches"] >= 2
+
+def test_single_write_is_flushed_after_max_delay(connect):
+    batcher = WriteBatcher(connect, max_rows=100, max_delay_ms=5)
+    assert batcher.run(insert("only")) == 1
+    # Answered only after the COMMIT, so another connection already sees it
+    assert stored_values(connect) == ["only"]
+    batcher.stop()
+
+def test_failed_operation_is_rolled_back_alone(connect):
+    batcher = WriteBatcher(connect, max_rows=10, max_delay_ms=50)
+    first = batcher.submit(insert("a"))
+    duplicate = batcher.submit(insert("a"))
+    last = batcher.submit(insert("b"))
+    assert first.result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    last.result(timeout=5)
+    batcher.stop()
+    assert stored_values(connect) == ["a", "b"]
+    assert batcher.stats()["failed_operations"] == 1
+
+def test_stop_commits_queued_operations(connect):
+    release = threading.Event()
+    batcher = WriteBatcher(connect, max_rows=100, max_delay_ms=1000)
+    # The first operation holds the writer until everything else is queued
+    blocked = batcher.submit(lambda conn: release.wait(5))
+    futures = [batcher.submit(insert(f"v{i}")) for i in range(5)]
+    release.set()
+    batcher.stop()
+    assert blocked.result(timeout=5) is True
+    assert all(future.done() for future in futures)
+    assert stored_values(connect) == [f"v{i}" for i in range(5)]
+
+def test_disabled_runs_in_caller(connect):
+    batcher = WriteBatcher(connect, max_rows=10, max_delay_ms=5, enabled=False)
+    assert batcher.run(insert("direct")) == 1
+    assert batcher.stats()["batches"] == 0
+    assert stored_values(connect) == ["direct"]
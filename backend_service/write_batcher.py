@@ -0,0 +1,147 @@
+# backend_service/write_batcher.py
+# Write-behind group commit: many small writes share one SQLite transaction
+
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+WRITE_BATCH_ENABLED = os.environ.get('WRITE_BATCH_ENABLED', '1').lower() not in ('0', 'false', 'no')
+WRITE_BATCH_MAX_ROWS = int(os.environ.get('WRITE_BATCH_MAX_ROWS', 200))
+WRITE_BATCH_MAX_DELAY_MS = float(os.environ.get('WRITE_BATCH_MAX_DELAY_MS', 2))
+
+_STOP = object()
+
+class WriteBatcher:
+    """Runs write operations on one writer thread, committing them in groups.
+
+    An operation is a function taking the connection; it must not commit.
+    A batch closes after max_rows operations or max_delay_ms after its
+    first one, whichever comes first, and is committed in one transaction.
+    Each operation runs inside a savepoint, so one that raises is rolled
+    back on its own. Callers are only answered after the COMMIT, so a
+    returned result is durable.
+
+    With enabled=False, run() executes the operation in the calling
+    thread in its own transaction instead.
+    """
+
+    def __init__(self, get_connection, max_rows: int, max_delay_ms: float, enabled: bool = True):
+        self._get_connection = get_connection
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.enabled = enabled
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"operations": 0, "batches": 0, "failed_operations": 0, "largest_batch": 0}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="write-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, operation) -> Future:
+        """Queues an operation; the future resolves with its result once committed"""
+        future = Future()
+        if not self.enabled:
+            try:
+                conn = self._get_connection()
+                with conn:
+                    future.set_result(operation(conn))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_started()
+        self._queue.put((operation, future))
+        return future
+
+    def run(self, operation):
+        """Blocking submit: returns the operation's result after it is committed"""
+        return self.submit(operation).result()
+
+    async def arun(self, operation):
+        """Async submit that does not block the event loop while waiting for the commit"""
+        return await asyncio.wrap_future(self.submit(operation))
+
+    def stop(self):
+        """Commits everything queued so far and stops the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _collect(self, first):
+        """Gathers a batch starting with first; returns (batch, stop_requested)"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_rows:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, _ in batch:
+                conn.execute("SAVEPOINT batch_operation")
+                try:
+                    outcomes.append((True, operation(conn)))
+                    conn.execute("RELEASE batch_operation")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO batch_operation")
+                    conn.execute("RELEASE batch_operation")
+                    outcomes.append((False, e))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            outcomes = [(False, e)] * len(batch)
+
+        failed = 0
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                failed += 1
+                future.set_exception(value)
+        with self._lock:
+            self._stats["operations"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["failed_operations"] += failed
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+    def _run(self):
+        conn = self._get_connection()
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._commit(conn, batch)
+            if stop:
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch"] = round(stats["operations"] / stats["batches"], 1) if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,66 @@
+# frontend/streamlit_app/backend_client.py
+# Shared HTTP client for the portals: pooled keep-alive connections, timeouts and retries
+
+import os
+import threading
+import streamlit as st
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds per call, so a hung backend fails the call instead of freezing the page
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", 3))
+BACKEND_READ_TIMEOUT = float(os.environ.get("BACKEND_READ_TIMEOUT", 10))
+# Retries after a failed connection (any method) or a failed GET (read error, 502/503/504)
+BACKEND_RETRIES = int(os.environ.get("BACKEND_RETRIES", 2))
+# Keep-alive connections kept open to the backend, shared by every session
+BACKEND_POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", 10))
+
+class BackendClient:
+    """requests.Session for one backend URL, shared by all sessions and threads.
+
+    Paths are relative to base_url. Calls get a default timeout (pass
+    timeout= to override, e.g. for streams). POSTs are retried only when
+    the connection failed, so a query is never submitted twice.
+    """
+
+    def __init__(self, base_url: str, retries: int = BACKEND_RETRIES, pool_size: int = BACKEND_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT)
+        retry = Retry(
+            total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="backend")
+        self._lock = threading.Lock()
+        self.requests_sent = 0   # shown in the data_cache debug panel
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self.requests_sent += 1
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def gather(self, *calls):
+        """Runs independent calls (zero-argument callables) concurrently and returns
+        their futures once all have finished; .result() re-raises a call's exception.
+        The calls run on worker threads, so they must not use st.* functions."""
+        futures = [self._executor.submit(call) for call in calls]
+        wait(futures)
+        return futures
+
+@st.cache_resource
+def get_backend_client(base_url: str) -> BackendClient:
+    """The client for base_url, created once per Streamlit server and kept across reruns"""
+    return BackendClient(base_url)
@@ -0,0 +1,136 @@
+# frontend/streamlit_app/data_cache.py
+# Cached backend reads shared by the portals (st.cache_data), with per-key invalidation
+
+import os
+import threading
+import functools
+import streamlit as st
+
+from backend_client import get_backend_client
+
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8001")
+backend = get_backend_client(BACKEND_URL)
+
+# Seconds a cached read is served before the backend is asked again. Writes
+# made through this server clear the affected entries straight away; the TTL
+# only bounds how long changes made elsewhere take to show.
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", 300))
+QUERIES_CACHE_TTL = int(os.environ.get("QUERIES_CACHE_TTL", 15))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1000))
+# Shows the cache debug panel in the sidebar (also enabled by ?debug=1)
+FRONTEND_DEBUG = os.environ.get("FRONTEND_DEBUG", "0") == "1"
+
+class CacheStats:
+    """Call, miss and invalidation counts per cached read, across all sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name: str, event: str, count: int = 1):
+        with self._lock:
+            counts = self._counts.setdefault(name, {"calls": 0, "misses": 0, "invalidations": 0})
+            counts[event] += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {name: dict(counts) for name, counts in self._counts.items()}
+        for counts in stats.values():
+            counts["hits"] = max(0, counts["calls"] - counts["misses"])
+            counts["hit_rate"] = round(counts["hits"] / counts["calls"], 3) if counts["calls"] else 0.0
+        return stats
+
+@st.cache_resource
+def get_cache_stats() -> CacheStats:
+    return CacheStats()
+
+def cached_read(name: str, ttl: int):
+    """st.cache_data for a backend read, counted under name in the debug panel.
+
+    The decorated function gains invalidate(*args), which drops only the
+    entry for those arguments (st.cache_data clear(*args), Streamlit 1.37+).
+    It must not call st.* so it can run on backend.gather worker threads.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def load(*args):
+            # Only runs on a miss
+            get_cache_stats().record(name, "misses")
+            return fn(*args)
+
+        cached = st.cache_data(ttl=ttl, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)(load)
+
+        @functools.wraps(fn)
+        def read(*args):
+            get_cache_stats().record(name, "calls")
+            return cached(*args)
+
+        def invalidate(*args):
+            get_cache_stats().record(name, "invalidations")
+            cached.clear(*args)
+
+        read.invalidate = invalidate
+        return read
+    return decorator
+
+# --- Patient reads ---
+@cached_read("patient_profile", PROFILE_CACHE_TTL)
+def load_patient_profile(patient_id):
+    """The patient's record from the backend, or None when it has none"""
+    response = backend.get(f"/patient/{patient_id}")
+    return response.json() if response.status_code == 200 else None
+
+def fetch_my_queries(patient_id, synced=None):
+    """Syncs the patient's query history and returns the new sync state.
+
+    synced is the previous state ({"patient_id", "etag", "version", "rows"}),
+    so an unchanged history costs a 304 and a changed one only the rows
+    written since.
+    """
+    if not synced or synced["patient_id"] != patient_id:
+        synced = {"patient_id": patient_id, "etag": None, "version": None, "rows": {}}
+    params, headers = {}, {}
+    if synced["version"] is not None:
+        params["since"] = synced["version"]
+        headers["If-None-Match"] = synced["etag"]
+    response = backend.get(f"/queries/by_patient/{patient_id}", params=params, headers=headers)
+    if response.status_code == 304:
+        return synced
+    response.raise_for_status()
+    # X-Sync: delta rows are upserted into what we have; anything else replaces it
+    rows = dict(synced["rows"]) if response.headers.get("X-Sync") == "delta" else {}
+    rows.update((query["id"], query) for query in response.json())
+    return {"patient_id": patient_id, "etag": response.headers.get("ETag"),
+            "version": response.headers.get("X-Row-Version"), "rows": rows}
+
+@st.cache_resource
+def get_query_syncs() -> dict:
+    """{patient_id: sync state} for every patient whose history this server has read.
+    st.cache_data runs at most one load per patient at a time, so entries are not
+    written concurrently."""
+    return {}
+
+@cached_read("patient_queries", QUERIES_CACHE_TTL)
+def load_patient_queries(patient_id):
+    """The patient's queries, newest first. A miss resyncs from the last state this
+    server saw, so it usually costs a 304 or a few changed rows."""
+    syncs = get_query_syncs()
+    syncs[patient_id] = synced = fetch_my_queries(patient_id, syncs.get(patient_id))
+    return sorted(synced["rows"].values(), key=lambda query: query.get("timestamp") or "", reverse=True)
+
+# --- Debug panel ---
+def debug_panel_enabled() -> bool:
+    return FRONTEND_DEBUG or st.query_params.get("debug") == "1"
+
+def show_cache_panel(requests_at_start: int):
+    """Sidebar panel with each cached read's hit rate and the backend requests made
+    during this run (approximate: other sessions' requests are counted too)"""
+    with st.sidebar.expander("🔧 Cache stats", expanded=False):
+        st.caption(f"Backend requests this run: {backend.requests_sent - requests_at_start} "
+                   f"(total {backend.requests_sent})")
+        stats = get_cache_stats().snapshot()
+        if not stats:
+            st.caption("No cached reads yet")
+        for name, counts in sorted(stats.items()):
+            st.markdown(f"**{name}**: {counts['hit_rate']:.0%} hits "
+                        f"({counts['hits']}/{counts['calls']}, {counts['invalidations']} invalidated)")
@@ -1,12 +1,24 @@
 # frontend/streamlit_app/doctor.py
 
 import streamlit as st
+import json
+import time
 import requests
+import threading
 import pandas as pd
+from collections import deque
 from datetime import datetime
 import os
 
+from backend_client import get_backend_client
+from data_cache import get_cache_stats, load_patient_queries
+
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8001")
+backend = get_backend_client(BACKEND_URL)
+PENDING_PAGE_SIZE = 25
+# How often an open dashboard checks for pushed changes (a local check, no request)
+CHANGES_CHECK_SECONDS = 2
+URGENCY_RANK = {"high": 0, "medium": 1, "low": 2}
 
 def get_urgency_badge(urgency_level):
     """Return colored emoji badge based on urgency"""
@@ -17,26 +29,223 @@ def get_urgency_badge(urgency_level):
     }
     return badges.get(urgency_level, "🔵 UNCLASSIFIED")
 
-def get_patient_info(patient_id):
-    """Fetch patient information from backend"""
-    try:
-        # In a real app, this would be an API call
-        # For demo, we'll make a simple API call to backend
-        response = requests.get(f"{BACKEND_URL}/patient/{patient_id}")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except:
-        # Fallback: hardcoded patient info for demo
-        patient_names = {
-            "P001": {"name": "Sarah Johnson", "diabetes_type": "Type 2", "current_hba1c": "6.9%", "complications": False},
-            "P002": {"name": "Michael Thompson", "diabetes_type": "Type 1", "current_hba1c": "7.8%", "complications": False},
-            "P003": {"name": "Carlos Rodriguez", "diabetes_type": "Type 2", "current_hba1c": "6.8%", "complications": True},
-            "P004": {"name": "Priya Patel", "diabetes_type": "Type 2 (post-GDM)", "current_hba1c": "6.2%", "complications": False},
-            "P005": {"name": "Eleanor Williams", "diabetes_type": "Type 2", "current_hba1c": "8.0%", "complications": True}
-        }
-        return patient_names.get(patient_id, None)
+# Fallback: hardcoded patient info for demo, shown when the backend is unreachable
+DEMO_PATIENT_SUMMARIES = {
+    "P001": {"name": "Sarah Johnson", "diabetes_type": "Type 2", "current_hba1c": "6.9%", "complications": False},
+    "P002": {"name": "Michael Thompson", "diabetes_type": "Type 1", "current_hba1c": "7.8%", "complications": False},
+    "P003": {"name": "Carlos Rodriguez", "diabetes_type": "Type 2", "current_hba1c": "6.8%", "complications": True},
+    "P004": {"name": "Priya Patel", "diabetes_type": "Type 2 (post-GDM)", "current_hba1c": "6.2%", "complications": False},
+    "P005": {"name": "Eleanor Williams", "diabetes_type": "Type 2", "current_hba1c": "8.0%", "complications": True}
+}
+
+# --- Patient summaries ---
+# Kept per session: pages of the queue bring their patients' summaries with
+# them (include=patient), and any others needed for a page are fetched in one
+# /patients/batch request. Refresh Now clears them.
+def remember_patient_summaries(queries):
+    """Moves the summaries embedded in queue rows into the session cache"""
+    summaries = st.session_state.setdefault("patient_summaries", {})
+    for query in queries:
+        if "patient" in query:
+            summaries[query["patient_id"]] = query.pop("patient")
+
+def load_patient_summaries(patient_ids):
+    """{patient_id: summary or None} for patient_ids, fetching the uncached ones in one request"""
+    summaries = st.session_state.setdefault("patient_summaries", {})
+    patient_ids = set(patient_ids)
+    missing = sorted(patient_id for patient_id in patient_ids if patient_id not in summaries)
+    get_cache_stats().record("patient_summaries (session)", "calls", len(patient_ids))
+    get_cache_stats().record("patient_summaries (session)", "misses", len(missing))
+    if missing:
+        try:
+            response = backend.post("/patients/batch", json={"patient_ids": missing})
+            response.raise_for_status()
+            found = response.json()["patients"]
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            # Not cached, so the next render asks again
+            return {**summaries, **{patient_id: DEMO_PATIENT_SUMMARIES.get(patient_id) for patient_id in missing}}
+        # Unknown patients are cached as None so they are not asked for again
+        summaries.update({patient_id: found.get(patient_id) for patient_id in missing})
+    return summaries
+
+def fetch_pending_page(cursor=None):
+    """Fetch one page of the pending queue, already sorted by urgency then age.
+
+    Returns (queries, total, urgency_counts, next_cursor).
+    """
+    params = {"limit": PENDING_PAGE_SIZE, "include": "patient"}
+    if cursor:
+        params["cursor"] = cursor
+    response = backend.get("/pending_queries/", params=params)
+    response.raise_for_status()
+    queries = response.json()
+    remember_patient_summaries(queries)
+    return parse_pending_headers(response, queries)
+
+def fetch_pending_counts():
+    """(total, urgency_counts) for the whole queue, from the headers of a one-row page"""
+    response = backend.get("/pending_queries/", params={"limit": 1, "fields": "id"})
+    response.raise_for_status()
+    _, total, urgency_counts, _ = parse_pending_headers(response, [])
+    return total, urgency_counts
+
+def parse_pending_headers(response, queries):
+    total = int(response.headers.get("X-Total-Count", len(queries)))
+    urgency_counts = {}
+    for item in response.headers.get("X-Urgency-Counts", "").split(","):
+        if "=" in item:
+            level, count = item.split("=", 1)
+            urgency_counts[level] = int(count)
+    return queries, total, urgency_counts, response.headers.get("X-Next-Cursor")
+
+# --- Pushed changes ---
+# The backend pushes every query insert and update on /changes/stream. One
+# listener thread per Streamlit server follows it and buffers the events;
+# each dashboard session applies the ones it has not seen to its cached copy
+# of the queue instead of refetching it.
+def iter_sse(response):
+    """Yields (event, data) from a server-sent events response"""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: ") and event:
+            yield event, json.loads(line[len("data: "):])
+            event = None
+
+class ChangeListener:
+    """Follows /changes/stream on a background thread, reconnecting after errors.
+
+    Events are numbered locally. A None event marks a gap (first connection,
+    or the backend restarted or dropped events): sessions must refetch.
+    """
+
+    def __init__(self, client, size: int = 1000):
+        self.client = client
+        self.connected = False
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="change-listener", daemon=True).start()
+
+    def position(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def since(self, seq: int):
+        """(events, reset) after the local position seq"""
+        with self._lock:
+            if self._events and self._events[0][0] > seq + 1:
+                return [], True
+            events = [event for number, event in self._events if number > seq]
+        if None in events:
+            return [], True
+        return events, False
+
+    def _append(self, event):
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, event))
+
+    def _run(self):
+        feed, last_seq = None, None
+        while True:
+            params = {} if last_seq is None else {"since": last_seq, "feed": feed}
+            try:
+                # The backend sends a keepalive every 15 seconds
+                with self.client.get("/changes/stream", params=params, stream=True, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    for event, data in iter_sse(response):
+                        if event == "hello" and last_seq is None:
+                            feed, last_seq = data["feed"], data["last_seq"]
+                            self._append(None)
+                        elif event == "reset":
+                            feed, last_seq = data["feed"], data["last_seq"]
+                            self._append(None)
+                        elif event == "change":
+                            last_seq = data["seq"]
+                            self._append(data)
+            except (requests.RequestException, ValueError):
+                pass
+            self.connected = False
+            time.sleep(2)
+
+@st.cache_resource
+def get_change_listener():
+    return ChangeListener(backend)
+
+def get_sort_key(query):
+    """Server-side queue order: urgency, then age"""
+    return (URGENCY_RANK.get(query.get("urgency_level"), 2), query.get("timestamp") or "", query["id"])
+
+def load_pending_queue():
+    """Fetches the first page of the queue into the session cache"""
+    st.session_state.change_position = get_change_listener().position()
+    st.session_state.patient_summaries = {}
+    queries, total, urgency_counts, next_cursor = fetch_pending_page()
+    st.session_state.pending_cache = {query["id"]: query for query in queries}
+    st.session_state.pending_total = total
+    st.session_state.urgency_counts = urgency_counts
+    st.session_state.pending_next_cursor = next_cursor
+    st.session_state.pending_loaded_at = datetime.now().strftime("%H:%M:%S")
+
+def load_pending_rows(count: int):
+    """Extends the cache with further pages until it holds count rows or the queue ends"""
+    while len(st.session_state.pending_cache) < count and st.session_state.pending_next_cursor:
+        queries, _, _, next_cursor = fetch_pending_page(st.session_state.pending_next_cursor)
+        for query in queries:
+            st.session_state.pending_cache.setdefault(query["id"], query)
+        st.session_state.pending_next_cursor = next_cursor
+
+def remove_pending(query_id):
+    """Drops a query that left the pending queue from the cache and the counts"""
+    query = st.session_state.pending_cache.pop(query_id, None)
+    if query is None:
+        return False
+    level = query.get("urgency_level", "low")
+    st.session_state.urgency_counts[level] = max(0, st.session_state.urgency_counts.get(level, 0) - 1)
+    st.session_state.pending_total = max(0, st.session_state.pending_total - 1)
+    return True
+
+def apply_changes(events):
+    """Applies pushed inserts and updates to the cached queue"""
+    cache = st.session_state.pending_cache
+    counts_stale = False
+    for event in events:
+        query = event["query"]
+        if event["type"] == "insert":
+            if query["id"] in cache:
+                continue
+            level = query.get("urgency_level", "low")
+            st.session_state.urgency_counts[level] = st.session_state.urgency_counts.get(level, 0) + 1
+            st.session_state.pending_total += 1
+            # Rows past the loaded range arrive with the next page instead
+            loaded_all = not st.session_state.pending_next_cursor
+            if loaded_all or (cache and get_sort_key(query) < max(map(get_sort_key, cache.values()))):
+                cache[query["id"]] = query
+        elif query["status"] == "pending_review":
+            if query["id"] in cache:
+                cache[query["id"]].update(query)
+        elif not remove_pending(query["id"]):
+            # Not loaded here (a later page, or already removed by this session)
+            counts_stale = True
+    if counts_stale:
+        st.session_state.pending_total, st.session_state.urgency_counts = fetch_pending_counts()
+
+@st.fragment(run_every=CHANGES_CHECK_SECONDS)
+def watch_pending_changes():
+    """Reruns the page when changes were pushed since the last check"""
+    listener = get_change_listener()
+    events, reset = listener.since(st.session_state.change_position)
+    if not events and not reset:
+        return
+    st.session_state.change_position = listener.position()
+    if reset or any(event["type"] == "reload" for event in events):
+        load_pending_queue()
+    else:
+        apply_changes(events)
+    st.rerun()
 
 def format_time_ago(timestamp_str):
     """Format timestamp as 'X hours ago'"""
@@ -73,53 +282,60 @@ def doctor_portal():
         with col1:
             st.subheader("Queries Awaiting Review")
         with col2:
-            auto_refresh = st.checkbox("Auto-refresh", value=False, help="Automatically refresh every 30 seconds")
+            live_updates = st.checkbox("Live updates", value=True, help="Show new and reviewed queries as they happen")
         with col3:
-            if st.button("🔄 Refresh Now", use_container_width=True):
-                st.rerun()
-
-        # Auto-refresh functionality
-        if auto_refresh:
-            import time
-            if "last_refresh" not in st.session_state:
-                st.session_state.last_refresh = time.time()
-            
-            # Only refresh every 30 seconds
-            if time.time() - st.session_state.last_refresh > 30:
-                st.session_state.last_refresh = time.time()
-                st.rerun()
+            refresh_now = st.button("🔄 Refresh Now", use_container_width=True)
 
-        # Fetch pending queries
+        # The queue is fetched once per session and then kept current with
+        # pushed changes; Refresh Now refetches it
+        if "pending_page" not in st.session_state:
+            st.session_state.pending_page = 0
+        pending_queries, total_pending, urgency_counts, patient_summaries = [], 0, {}, {}
         try:
-            response = requests.get(f"{BACKEND_URL}/pending_queries/")
-            response.raise_for_status()
-            pending_queries = response.json()
+            get_cache_stats().record("pending_queue (session)", "calls")
+            if refresh_now or "pending_cache" not in st.session_state:
+                get_cache_stats().record("pending_queue (session)", "misses")
+                load_pending_queue()
+            page_start = st.session_state.pending_page * PENDING_PAGE_SIZE
+            load_pending_rows(page_start + PENDING_PAGE_SIZE)
+            
+            ordered = sorted(st.session_state.pending_cache.values(), key=get_sort_key)
+            pending_queries = ordered[page_start:page_start + PENDING_PAGE_SIZE]
+            # Rows pushed by the change feed come without patient summaries
+            patient_summaries = load_patient_summaries(query.get("patient_id") for query in pending_queries)
+            total_pending = st.session_state.pending_total
+            urgency_counts = st.session_state.urgency_counts
+            has_next_page = (len(ordered) > page_start + PENDING_PAGE_SIZE
+                             or bool(st.session_state.pending_next_cursor))
             
             # Show last updated time and debug info
-            current_time = datetime.now().strftime("%H:%M:%S")
-            st.caption(f"Last updated: {current_time} | Backend: {BACKEND_URL} | Found: {len(pending_queries)} queries")
+            live = "live" if get_change_listener().connected else "not live"
+            st.caption(f"Loaded: {st.session_state.pending_loaded_at} ({live}) | Backend: {BACKEND_URL} | Found: {total_pending} queries")
             
         except requests.exceptions.RequestException as e:
             st.error(f"Could not fetch pending queries from {BACKEND_URL}. Error: {str(e)}")
-            pending_queries = []
+            has_next_page = False
         except Exception as e:
             st.error(f"Unexpected error: {str(e)}")
-            pending_queries = []
+            has_next_page = False
+
+        if live_updates and "change_position" in st.session_state:
+            watch_pending_changes()
+
+        if not pending_queries and st.session_state.pending_page > 0:
+            # The page we were on was emptied by approvals; go back to the first page
+            st.session_state.pending_page = 0
+            st.rerun()
 
         if not pending_queries:
             st.info("✨ All caught up! No queries are currently awaiting review.")
         else:
-            # Sort by urgency
-            urgency_order = {"high": 0, "medium": 1, "low": 2}
-            pending_queries.sort(key=lambda x: urgency_order.get(x.get('urgency_level', 'low'), 3))
-            
             # Show summary metrics
             col1, col2, col3 = st.columns(3)
             with col1:
-                high_priority = sum(1 for q in pending_queries if q.get('urgency_level') == 'high')
-                st.metric("High Priority", high_priority, delta_color="inverse")
+                st.metric("High Priority", urgency_counts.get("high", 0), delta_color="inverse")
             with col2:
-                st.metric("Total Pending", len(pending_queries))
+                st.metric("Total Pending", total_pending)
             with col3:
                 avg_wait = "2.5 hours"  # This would be calculated in production
                 st.metric("Avg Wait Time", avg_wait)
@@ -143,8 +359,7 @@ def doctor_portal():
                     patient_id = query.get('patient_id', 'Unknown')
                     st.markdown(f"**Patient ID:** `{patient_id}`")
                     
-                    # Try to get patient summary
-                    patient_summary = get_patient_info(patient_id)
+                    patient_summary = patient_summaries.get(patient_id)
                     if patient_summary:
                         cols = st.columns(4)
                         with cols[0]:
@@ -212,11 +427,14 @@ I will follow up with you after you receive emergency care."""
                                     "doctor_response": final_response_text
                                 }
                                 try:
-                                    update_response = requests.post(
-                                        f"{BACKEND_URL}/update_query/{query['id']}", 
+                                    update_response = backend.post(
+                                        f"/update_query/{query['id']}",
                                         json=payload
                                     )
                                     update_response.raise_for_status()
+                                    remove_pending(query['id'])
+                                    # The patient sees the answer on their next rerun
+                                    load_patient_queries.invalidate(query['patient_id'])
                                     st.success("✅ Response sent to patient!")
                                     st.balloons()
                                     st.rerun()
@@ -233,6 +451,21 @@ I will follow up with you after you receive emergency care."""
                     
                     st.markdown("---")
 
+            # Page navigation
+            page_number = st.session_state.pending_page + 1
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if page_number > 1 and st.button("⬅️ Previous", use_container_width=True):
+                    st.session_state.pending_page -= 1
+                    st.rerun()
+            with col2:
+                total_pages = max(1, -(-total_pending // PENDING_PAGE_SIZE))
+                st.caption(f"Page {page_number} of {total_pages}")
+            with col3:
+                if has_next_page and st.button("Next ➡️", use_container_width=True):
+                    st.session_state.pending_page += 1
+                    st.rerun()
+
     # --- Completed Reviews Tab ---
     with completed_tab:
         st.subheader("Your Reviewed Queries")
@@ -2,11 +2,13 @@
 # Simplified doctor portal for MVP demo
 
 import streamlit as st
-import requests
 from datetime import datetime
 import os
 
+from backend_client import get_backend_client
+
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8002")
+backend = get_backend_client(BACKEND_URL)
 
 def doctor_portal_simple():
     """Simplified doctor portal for MVP demo"""
@@ -21,9 +23,15 @@ def doctor_portal_simple():
         if st.button("🔄 Refresh", use_container_width=True):
             st.rerun()
     
+    # The questions and the sidebar stats are independent, so they are fetched together
+    pending_call, stats_call = backend.gather(
+        lambda: backend.get("/pending_questions/"),
+        lambda: backend.get("/doctor_stats/"),
+    )
+    
     try:
         # Get pending questions
-        response = requests.get(f"{BACKEND_URL}/pending_questions/")
+        response = pending_call.result()
         
         if response.status_code == 200:
             pending = response.json()
@@ -91,7 +99,7 @@ def doctor_portal_simple():
                                     }
                                     
                                     try:
-                                        send_response = requests.post(f"{BACKEND_URL}/send_response/", json=payload)
+                                        send_response = backend.post("/send_response/", json=payload)
                                         if send_response.status_code == 200:
                                             st.success("✅ Response sent to patient!")
                                             st.balloons()
@@ -120,7 +128,7 @@ def doctor_portal_simple():
     # Sidebar stats
     st.sidebar.markdown("### Today's Stats")
     try:
-        stats_response = requests.get(f"{BACKEND_URL}/doctor_stats/")
+        stats_response = stats_call.result()
         if stats_response.status_code == 200:
             stats = stats_response.json()
             st.sidebar.metric("Questions Today", stats.get('today', 0))
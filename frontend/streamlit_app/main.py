@@ -4,6 +4,7 @@ import streamlit as st
 import time
 from patient import patient_portal
 from doctor import doctor_portal
+from data_cache import backend, debug_panel_enabled, show_cache_panel
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -124,6 +125,7 @@ def show_landing():
         st.info("**For Doctors**: Review and respond to patient queries with AI assistance")
 
 # --- Main App ---
+requests_at_start = backend.requests_sent
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -199,4 +201,7 @@ else:
         show_landing()
     else:
         st.header("Welcome to Assist AI")
-        st.info("Please log in using the sidebar to continue.")
\ No newline at end of file
+        st.info("Please log in using the sidebar to continue.")
+
+if debug_panel_enabled():
+    show_cache_panel(requests_at_start)
\ No newline at end of file
@@ -1,12 +1,17 @@
 # frontend/streamlit_app/patient.py
 
 import streamlit as st
+import json
 import requests
 import pandas as pd
 from datetime import datetime
 import os
 
+from backend_client import get_backend_client
+from data_cache import load_patient_profile, load_patient_queries
+
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8001")
+backend = get_backend_client(BACKEND_URL)
 
 # Sample queries for easy demo
 SAMPLE_QUERIES = {
@@ -28,6 +33,45 @@ def get_status_icon(status):
     }
     return icons.get(status, "📄")
 
+def stream_query(payload):
+    """Posts a query to the streaming endpoint and yields (event, data) as they arrive"""
+    with backend.post("/process_query/stream", json=payload, stream=True, timeout=(5, 120)) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event:
+                yield event, json.loads(line[len("data: "):])
+                event = None
+
+def submit_query_with_progress(payload):
+    """Submits a query, showing each processing step as the backend reports it.
+    The AI draft is only a suggestion for the doctor, so its text is never shown here."""
+    progress = st.progress(0, text="Sending your query...")
+    result = {}
+    words = 0
+    for event, data in stream_query(payload):
+        if event == "patient":
+            progress.progress(20, text="Reviewing your health record...")
+        elif event == "token":
+            words += len(data.get("text", "").split())
+            progress.progress(min(20 + words // 4, 70), text=f"Preparing notes for your doctor... ({words} words)")
+        elif event == "draft":
+            progress.progress(75, text="Checking how urgent your question is...")
+        elif event == "evaluation":
+            result.update(data)
+            progress.progress(90, text="Sending to your doctor...")
+        elif event == "saved":
+            result.update(data)
+            progress.progress(100, text="Sent to your doctor")
+        elif event == "error":
+            progress.empty()
+            raise requests.exceptions.RequestException(data.get("detail"))
+    if "query_id" not in result:
+        raise requests.exceptions.RequestException("Query stream ended before the query was saved")
+    return result
+
 def patient_portal():
     """Enhanced patient portal with better UX"""
     # Get patient info from session
@@ -37,12 +81,18 @@ def patient_portal():
     # Header with personalized greeting
     st.header(f"Welcome back, {patient_name}! 👋")
     
+    # The profile and the query history are independent, so they are read together
+    # (usually both from the cache, see data_cache.py)
+    profile_call, queries_call = backend.gather(
+        lambda: load_patient_profile(patient_id),
+        lambda: load_patient_queries(patient_id),
+    )
+    
     # Fetch patient-specific metrics
     try:
         # Get patient data from backend
-        patient_response = requests.get(f"{BACKEND_URL}/patient/{patient_id}")
-        if patient_response.status_code == 200:
-            patient_data = patient_response.json()
+        patient_data = profile_call.result()
+        if patient_data:
             profile = patient_data.get('profile', {})
             status = patient_data.get('current_status', {})
         else:
@@ -62,12 +112,13 @@ def patient_portal():
         profile = {}
         status = {}
     
-    # Get active queries count
+    # One fetch serves both the Active Queries metric and the My Queries tab
     try:
-        queries_response = requests.get(f"{BACKEND_URL}/queries/by_patient/{patient_id}")
-        active_queries = len([q for q in queries_response.json() if q.get('status') == 'pending_review']) if queries_response.status_code == 200 else 0
-    except:
-        active_queries = 0
+        my_queries = queries_call.result()
+        queries_error = False
+    except (requests.exceptions.RequestException, ValueError):
+        my_queries, queries_error = [], True
+    active_queries = len([q for q in my_queries if q.get('status') == 'pending_review'])
     
     # Display patient-specific metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -165,57 +216,57 @@ def patient_portal():
 
         # Handle submission
         if submit_button and medical_question:
-            with st.spinner("Sending your query..."):
-                # Map urgency to backend format
-                urgency_map = {"Can wait": "low", "Soon": "medium", "Urgent": "high"}
+            # Map urgency to backend format
+            urgency_map = {"Can wait": "low", "Soon": "medium", "Urgent": "high"}
+            
+            payload = {
+                "patient_id": patient_id,
+                "query": medical_question,
+                "uploaded_file_name": uploaded_file.name if uploaded_file else None
+            }
+            
+            try:
+                response_data = submit_query_with_progress(payload)
+                # Only this patient's cached history is affected
+                load_patient_queries.invalidate(patient_id)
                 
-                payload = {
-                    "patient_id": patient_id,
-                    "query": medical_question,
-                    "uploaded_file_name": uploaded_file.name if uploaded_file else None
-                }
+                # Show appropriate response based on urgency
+                urgency_level = response_data.get("urgency_level", "low")
                 
-                try:
-                    api_response = requests.post(f"{BACKEND_URL}/process_query/", json=payload)
-                    api_response.raise_for_status()
-                    response_data = api_response.json()
-                    
-                    # Show appropriate response based on urgency
-                    urgency_level = response_data.get("urgency_level", "low")
-                    
-                    if urgency_level == "high":
-                        st.error("🚨 " + response_data.get("final_response_to_patient", "Query marked as urgent and sent to your doctor for immediate review!"))
-                    elif urgency_level == "medium":
-                        st.warning("⚡ " + response_data.get("final_response_to_patient", "Query submitted for priority review. You'll hear back within a few hours."))
-                    else:
-                        st.success("✅ " + response_data.get("final_response_to_patient", "Query submitted successfully! You'll receive a response within 24 hours."))
-                    
-                    # Show additional confirmation
-                    st.info("📧 Your query has been recorded and is now visible in your 'My Queries' tab.")
-                    
-                    # Show next steps
-                    with st.expander("What happens next?"):
-                        st.markdown("""
-                        1. **AI Analysis**: Our AI reviews your question for urgency ✅ Done
-                        2. **Doctor Review**: Your doctor reviews the AI suggestion ⏳ In Progress
-                        3. **Personalized Response**: You receive a verified response 📅 Soon
-                        4. **Follow-up**: Schedule appointments if needed 🔄 Available
-                        """)
-                    
-                    # Force a refresh of the page to show the new query in "My Queries"
-                    st.balloons()
-                    
-                    # Set flag to switch to queries tab and clear form
-                    st.session_state.query_submitted = True
-                    st.session_state.switch_to_queries_tab = True
+                if urgency_level == "high":
+                    st.error("🚨 " + response_data.get("final_response_to_patient", "Query marked as urgent and sent to your doctor for immediate review!"))
+                elif urgency_level == "medium":
+                    st.warning("⚡ " + response_data.get("final_response_to_patient", "Query submitted for priority review. You'll hear back within a few hours."))
+                else:
+                    st.success("✅ " + response_data.get("final_response_to_patient", "Query submitted successfully! You'll receive a response within 24 hours."))
+                
+                # Show additional confirmation
+                st.info("📧 Your query has been recorded and is now visible in your 'My Queries' tab.")
+                
+                # Show next steps
+                with st.expander("What happens next?"):
+                    st.markdown("""
+                    1. **AI Analysis**: Our AI reviews your question for urgency ✅ Done
+                    2. **Doctor Review**: Your doctor reviews the AI suggestion ⏳ In Progress
+                    3. **Personalized Response**: You receive a verified response 📅 Soon
+                    4. **Follow-up**: Schedule appointments if needed 🔄 Available
+                    """)
+                
+                # Force a refresh of the page to show the new query in "My Queries"
+                st.balloons()
+                
+                # Set flag to switch to queries tab and clear form
+                st.session_state.query_submitted = True
+                st.session_state.switch_to_queries_tab = True
+                
+                # Small delay to ensure backend processing is complete
+                import time
+                time.sleep(1)
+                st.rerun()
                     
-                    # Small delay to ensure backend processing is complete
-                    import time
-                    time.sleep(1)
-                    st.rerun()
-                        
-                except requests.exceptions.RequestException:
-                    st.error("😔 Could not submit your query. Please try again or contact support.")
+            except (requests.exceptions.RequestException, ValueError):
+                # ValueError: a malformed event in the progress stream
+                st.error("😔 Could not submit your query. Please try again or contact support.")
 
     # --- My Queries Tab ---
     with queries_tab:
@@ -236,62 +287,58 @@ def patient_portal():
             )
         with col3:
             if st.button("🔄 Refresh", use_container_width=True):
+                load_patient_queries.invalidate(patient_id)
                 st.rerun()
         
         # Show last refresh time
         current_time = datetime.now().strftime("%H:%M:%S")
         st.caption(f"Last updated: {current_time}")
         
-        # Fetch queries
-        try:
-            response = requests.get(f"{BACKEND_URL}/queries/by_patient/{patient_id}")
-            response.raise_for_status()
-            my_queries = response.json()
-            
-            if not my_queries:
-                st.info("📭 You haven't submitted any queries yet. Ask your first question above!")
-            else:
-                # Create interactive cards for each query
-                for idx, query in enumerate(my_queries):
-                    # Parse date
-                    try:
-                        query_date = datetime.fromisoformat(query.get("timestamp", ""))
-                        date_str = query_date.strftime('%B %d, %Y at %I:%M %p')
-                    except:
-                        date_str = "Recently"
-                    
-                    # Create expandable card
-                    status = query.get("status", "pending_review")
-                    status_text = status.replace("_", " ").title()
-                    icon = get_status_icon(status)
+        # Fetched once, at the top of the page
+        if queries_error:
+            st.error("Could not fetch your query history. Please try again later.")
+        elif not my_queries:
+            st.info("📭 You haven't submitted any queries yet. Ask your first question above!")
+        else:
+            # Create interactive cards for each query
+            for idx, query in enumerate(my_queries):
+                # Parse date
+                try:
+                    query_date = datetime.fromisoformat(query.get("timestamp", ""))
+                    date_str = query_date.strftime('%B %d, %Y at %I:%M %p')
+                except:
+                    date_str = "Recently"
+                
+                # Create expandable card
+                status = query.get("status", "pending_review")
+                status_text = status.replace("_", " ").title()
+                icon = get_status_icon(status)
+                
+                with st.expander(f"{icon} {date_str} - {status_text}", expanded=(idx == 0)):
+                    # Query content
+                    st.markdown("**Your Question:**")
+                    st.write(query.get("original_query", "N/A"))
                     
-                    with st.expander(f"{icon} {date_str} - {status_text}", expanded=(idx == 0)):
-                        # Query content
-                        st.markdown("**Your Question:**")
-                        st.write(query.get("original_query", "N/A"))
+                    # Response section
+                    if query.get("doctor_final_response"):
+                        st.markdown("**Doctor's Response:**")
+                        st.success(query.get("doctor_final_response"))
                         
-                        # Response section
-                        if query.get("doctor_final_response"):
-                            st.markdown("**Doctor's Response:**")
-                            st.success(query.get("doctor_final_response"))
-                            
-                            # Action buttons for answered queries
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                if st.button("👍 Helpful", key=f"helpful_{idx}"):
-                                    st.toast("Thank you for your feedback!")
-                            with col2:
-                                if st.button("❓ Follow-up", key=f"followup_{idx}"):
-                                    st.info("Start a new query above to ask a follow-up question")
-                            with col3:
-                                if st.button("📅 Book Appointment", key=f"book_{idx}"):
-                                    st.info("Feature coming soon!")
-                        else:
-                            st.info("⏳ Awaiting doctor's response...")
-                            st.caption("Expected response time: Within 24 hours")
-                
-        except requests.exceptions.RequestException:
-            st.error("Could not fetch your query history. Please try again later.")
+                        # Action buttons for answered queries
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            if st.button("👍 Helpful", key=f"helpful_{idx}"):
+                                st.toast("Thank you for your feedback!")
+                        with col2:
+                            if st.button("❓ Follow-up", key=f"followup_{idx}"):
+                                st.info("Start a new query above to ask a follow-up question")
+                        with col3:
+                            if st.button("📅 Book Appointment", key=f"book_{idx}"):
+                                st.info("Feature coming soon!")
+                    else:
+                        st.info("⏳ Awaiting doctor's response...")
+                        st.caption("Expected response time: Within 24 hours")
+            
 
     # --- Resources Tab ---
     with resources_tab:
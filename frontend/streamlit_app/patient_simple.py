@@ -2,11 +2,13 @@
 # Simplified patient portal for MVP demo
 
 import streamlit as st
-import requests
 from datetime import datetime
 import os
 
+from backend_client import get_backend_client
+
 BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:8002")
+backend = get_backend_client(BACKEND_URL)
 
 def patient_portal_simple():
     """Simplified patient portal for MVP demo"""
@@ -54,7 +56,7 @@ def patient_portal_simple():
             try:
                 with st.spinner("Sending your question..."):
                     # Direct database insert instead of complex processing
-                    response = requests.post(f"{BACKEND_URL}/simple_query/", json=payload)
+                    response = backend.post("/simple_query/", json=payload)
                     
                 if response.status_code == 200:
                     st.success("✅ Your question has been sent to your doctor!")
@@ -72,7 +74,7 @@ def patient_portal_simple():
     st.subheader("📋 My Questions")
     
     try:
-        response = requests.get(f"{BACKEND_URL}/patient_queries/{patient_id}")
+        response = backend.get(f"/patient_queries/{patient_id}")
         if response.status_code == 200:
             queries = response.json()
             